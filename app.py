@@ -7,7 +7,8 @@ logger = get_logger(__name__)
 
 def main():
     logger.info("Hello from 30daymapchallenge!")
-    scrape_all("nsmc_events.csv", "https://seismic.pmd.gov.pk/events.php")
+    # Only fetch the pages with events newer than the ones already in the CSV
+    scrape_all("nsmc_events.csv", "https://seismic.pmd.gov.pk/events.php", incremental=True)
     logger.info("Done — output written to nsmc_events.csv")
 
 
@@ -0,0 +1,80 @@
+"""
+Benchmark of folium point rendering: one CircleMarker per row (the old create_html loop)
+against add_point_layer (one GeoJSON FeatureCollection styled client side).
+
+Usage example:
+    python -m benchmarks.folium_points --points 100000 --marker_points 5000
+"""
+import os
+import time
+import argparse
+import tempfile
+import folium
+import numpy as np
+import geopandas as gpd
+
+from src.utils.folium_layers import add_point_layer
+
+
+def random_points(count: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """Random POIs around Karachi with a category and a name."""
+    rng = np.random.default_rng(seed)
+    categories = np.array(["school", "college", "university", "kindergarten", "hospital"])
+    return gpd.GeoDataFrame(
+        {"amenity": rng.choice(categories, count),
+         "name": [f"poi {i}" for i in range(count)],
+         "beds": rng.integers(0, 40, count)},
+        geometry=gpd.points_from_xy(rng.uniform(66.8, 67.4, count), rng.uniform(24.7, 25.2, count)),
+        crs="EPSG:4326",
+    )
+
+def circle_markers(basemap, dataset):
+    for _, row in dataset.iterrows():
+        folium.CircleMarker(
+            location=[row.geometry.y, row.geometry.x],
+            radius=4 + row["beds"] * 0.5,
+            color="red",
+            fill=True,
+            fill_opacity=0.6,
+            popup=folium.Popup(f"{row['name']} <br>Type: {row['amenity']}", max_width=300),
+        ).add_to(basemap)
+
+def point_layer(basemap, dataset):
+    add_point_layer(basemap, dataset, radius=(4 + dataset["beds"] * 0.5).to_numpy(), color="red",
+                    popup_fields=["name", "amenity"], popup_aliases=["Name:", "Type:"])
+
+def measure(add_points, dataset) -> dict:
+    """Build time, save time and size of the HTML map."""
+    start = time.perf_counter()
+    basemap = folium.Map(location=[24.9, 67.1], zoom_start=10, tiles=None)
+    add_points(basemap, dataset)
+    built = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "map.html")
+        basemap.save(path)
+        saved = time.perf_counter()
+        size = os.path.getsize(path)
+    return {"build_s": built - start, "save_s": saved - built, "size_mb": size / 1e6}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark folium point layers")
+    parser.add_argument("--points", type=int, default=100_000, help="Points for add_point_layer")
+    parser.add_argument("--marker_points", type=int, default=5_000,
+                        help="Points for the CircleMarker loop, scaled up linearly to --points")
+    args = parser.parse_args()
+
+    markers = measure(circle_markers, random_points(args.marker_points))
+    layer = measure(point_layer, random_points(args.points))
+    scale = args.points / args.marker_points
+
+    print(f"{'method':<34}{'build (s)':>10}{'save (s)':>10}{'HTML (MB)':>11}")
+    print(f"{f'CircleMarker x {args.marker_points}':<34}{markers['build_s']:>10.2f}"
+          f"{markers['save_s']:>10.2f}{markers['size_mb']:>11.1f}")
+    print(f"{f'CircleMarker x {args.points} (scaled)':<34}{markers['build_s'] * scale:>10.2f}"
+          f"{markers['save_s'] * scale:>10.2f}{markers['size_mb'] * scale:>11.1f}")
+    print(f"{f'add_point_layer x {args.points}':<34}{layer['build_s']:>10.2f}"
+          f"{layer['save_s']:>10.2f}{layer['size_mb']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
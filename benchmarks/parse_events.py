@@ -0,0 +1,72 @@
+"""
+Micro-benchmark of the NSMC events table parser backends on saved sample pages.
+
+Usage example:
+    python -m benchmarks.parse_events --save 5 --url https://seismic.pmd.gov.pk/events.php
+    python -m benchmarks.parse_events --repeat 50
+"""
+import time
+import argparse
+import requests
+
+from pathlib import Path
+
+from src.utils.scrape_webpage import PARSERS, USER_AGENT, parse_rows, parse_events
+
+
+def save_sample_pages(url: str, count: int, pages_dir: Path):
+    """Download the first `count` pages of the events table to '<pages_dir>/page_<n>.html'."""
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    with requests.Session() as session:
+        session.headers.update({"User-Agent": USER_AGENT})
+        for page in range(1, count + 1):
+            resp = session.get(url, params={"page": page}, timeout=20)
+            resp.raise_for_status()
+            (pages_dir / f"page_{page}.html").write_text(resp.text, encoding="utf-8")
+            time.sleep(0.5)
+
+def time_parser(pages: list, parse, repeat: int) -> float:
+    """Best of `repeat` runs over all pages, in milliseconds per page."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            parse(html)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the events table parser backends")
+    parser.add_argument("--pages_dir", type=str, default="data/nsmc_pages", help="Folder with saved *.html pages")
+    parser.add_argument("--save", type=int, default=0, help="Download this many sample pages first")
+    parser.add_argument("--url", type=str, default="https://seismic.pmd.gov.pk/events.php",
+                        help="Events page to download samples from")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per backend, the best one is reported")
+    args = parser.parse_args()
+
+    pages_dir = Path(args.pages_dir)
+    if args.save:
+        save_sample_pages(args.url, args.save, pages_dir)
+    pages = [p.read_text(encoding="utf-8") for p in sorted(pages_dir.glob("*.html"))]
+    if not pages:
+        raise SystemExit(f"No sample pages in {pages_dir}, download some with --save N")
+
+    # Every backend has to produce exactly the rows of the BeautifulSoup reference
+    reference = [parse_rows(html, "bs4") for html in pages]
+    rows = sum(len(r) for r in reference)
+    print(f"{len(pages)} pages, {rows} rows, best of {args.repeat} runs")
+
+    baseline = None
+    print(f"{'backend':<12}{'rows (ms/page)':>16}{'typed (ms/page)':>17}{'speedup':>9}")
+    for name in PARSERS:
+        if [parse_rows(html, name) for html in pages] != reference:
+            print(f"{name:<12} output differs from bs4, skipped")
+            continue
+        rows_ms = time_parser(pages, lambda html: parse_rows(html, name), args.repeat)
+        typed_ms = time_parser(pages, lambda html: parse_events(html, name), args.repeat)
+        baseline = baseline or rows_ms
+        print(f"{name:<12}{rows_ms:>16.2f}{typed_ms:>17.2f}{baseline / rows_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import argparse
+
+from src.utils.logger import get_logger
+from src.utils.day_runner import discover_days, select_days, stale_days, run_days, format_summary
+
+
+logger = get_logger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run 30DayMapChallenge day modules in parallel")
+    parser.add_argument("days", nargs="*",
+                        help="Days to run, e.g. '5', 'd05', 'd05_earth' or '1-10' (default all)")
+    parser.add_argument("--year", type=str, default="2025", help="Challenge year under src/years")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Maximum number of days running at once (default number of CPUs)")
+    parser.add_argument("--log_dir", type=str, default=None,
+                        help="Write each day's output to '<log_dir>/<day>.log' instead of the console")
+    parser.add_argument("--changed", action="store_true",
+                        help="Only run days whose inputs, code or outputs changed since their last successful run")
+    parser.add_argument("--list", action="store_true", help="Only list the selected days")
+    args = parser.parse_args()
+
+    days = select_days(discover_days(args.year), args.days)
+    reasons = {}
+    if args.changed:
+        reasons = stale_days(days)
+        days = {name: path for name, path in days.items() if name in reasons}
+        if not days:
+            logger.info("All selected days are up to date")
+            return 0
+
+    if args.list:
+        for name, path in days.items():
+            print(f"{name:<24}{path}  {reasons.get(name, '')}".rstrip())
+        return 0
+
+    for name, reason in reasons.items():
+        logger.info(f"Rebuilding {name} - {reason}")
+    logger.info(f"Running {len(days)} days with up to {args.jobs or os.cpu_count()} parallel jobs")
+    results = run_days(days, jobs=args.jobs, log_dir=args.log_dir)
+    print(format_summary(results))
+
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import os
+import geopandas as gpd
+
+from typing import Dict, List, Optional, Union
+from pathlib import Path
+
+from src.utils.logger import get_logger
+from src.utils.helpers import declare_input
+
+logger = get_logger(__name__)
+
+
+GADM_DIR = Path("data/pakistan_admin")
+GADM_SHP = "gadm41_PAK_{level}.shp"
+# Small row groups let parquet statistics skip most of the file when filtering on NAME_x
+ROW_GROUP_SIZE = 128
+
+
+def gadm_parquet_path(level: int, gadm_dir: Path = GADM_DIR) -> Path:
+    """
+    Get the GeoParquet copy of a GADM level, (re)building it if the shapefile is newer.
+
+    Parameters
+    ----------
+    level : int
+        GADM administrative level (0 = country, 1 = province, 2 = division, 3 = district).
+    gadm_dir : Path
+        Folder holding the gadm41_PAK_{level}.shp files.
+
+    Returns
+    -------
+    Path
+        Path to gadm41_PAK_{level}.parquet next to the shapefile.
+    """
+    shp_path = Path(gadm_dir) / GADM_SHP.format(level=level)
+    parquet_path = shp_path.with_suffix(".parquet")
+
+    # A shapefile is several files, the attributes live in .dbf and the geometries in .shp
+    sources = [p for p in (shp_path, shp_path.with_suffix(".dbf")) if p.exists()]
+    if not sources:
+        raise FileNotFoundError(f"GADM shapefile not found - {shp_path}")
+    source_mtime = max(p.stat().st_mtime for p in sources)
+    for p in sources:
+        declare_input(p)
+
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= source_mtime:
+        return parquet_path
+
+    logger.info(f"Converting {shp_path} to {parquet_path}")
+    admin_gdf = gpd.read_file(shp_path)
+    # Write to a temporary file first, days running in parallel may convert at the same time
+    tmp_path = parquet_path.with_suffix(f".{os.getpid()}.tmp")
+    admin_gdf.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+def load_admin_boundaries(level: int,
+                          columns: Optional[List[str]] = None,
+                          filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+                          gadm_dir: Path = GADM_DIR) -> gpd.GeoDataFrame:
+    """
+    Load GADM Pakistan admin boundaries from the cached GeoParquet copy, reading only the
+    requested columns and rows.
+
+    Parameters
+    ----------
+    level : int
+        GADM administrative level (0-3).
+    columns : List[str], optional
+        Attribute columns to keep, geometry is always included. None reads all columns.
+    filters : Dict[str, str | List[str]], optional
+        Attribute filter applied while reading, e.g. {'NAME_2': ['Karachi', 'Lahore']}
+        or {'NAME_3': 'Shikarpur'}. Multiple keys are combined with AND.
+    gadm_dir : Path
+        Folder holding the gadm41_PAK_{level}.shp files.
+
+    Returns
+    -------
+    gpd.GeoDataFrame
+        Admin boundaries in the CRS of the source shapefile (EPSG:4326).
+    """
+    parquet_path = gadm_parquet_path(level, gadm_dir)
+
+    if columns is not None:
+        columns = [c for c in columns if c != "geometry"] + ["geometry"]
+
+    row_filters = None
+    if filters:
+        row_filters = []
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                row_filters.append((column, "in", list(value)))
+            else:
+                row_filters.append((column, "==", value))
+
+    return gpd.read_parquet(parquet_path, columns=columns, filters=row_filters)
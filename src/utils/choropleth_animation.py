@@ -0,0 +1,136 @@
+import numpy as np
+import matplotlib
+import pandas as pd
+import shapely
+import geopandas as gpd
+
+from typing import Optional, Union
+from matplotlib import colors
+from matplotlib.path import Path
+from matplotlib.patches import PathPatch
+from matplotlib.collections import PatchCollection
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def project_geometries(geometries: gpd.GeoSeries, projection=None) -> gpd.GeoSeries:
+    """
+    Geometries in the coordinates of a cartopy projection, the data coordinates of its GeoAxes.
+
+    Geographic geometries go through projection.project_geometry, which cuts them at the
+    antimeridian like cartopy does when drawing with transform=PlateCarree(); projected ones
+    are reprojected with to_crs. Without a projection the geometries are returned as they are.
+    """
+    if projection is None:
+        return geometries
+    if geometries.crs is not None and not geometries.crs.is_geographic:
+        return geometries.to_crs(projection.proj4_init)
+    import cartopy.crs as ccrs
+
+    source = ccrs.PlateCarree()
+    if geometries.crs is not None:
+        geometries = geometries.to_crs(epsg=4326)
+    projected = [None if geom is None or geom.is_empty else projection.project_geometry(geom, source)
+                 for geom in geometries]
+    return gpd.GeoSeries(projected, index=geometries.index, crs=projection.proj4_init)
+
+def geometry_path(geometry) -> Path:
+    """One compound matplotlib Path for a (multi)polygon, holes included."""
+    vertices, codes = [], []
+    for polygon in getattr(geometry, "geoms", [geometry]):
+        if polygon is None or polygon.is_empty or polygon.geom_type != "Polygon":
+            continue
+        for ring in [polygon.exterior, *polygon.interiors]:
+            coords = shapely.get_coordinates(ring)
+            ring_codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+            ring_codes[0], ring_codes[-1] = Path.MOVETO, Path.CLOSEPOLY
+            vertices.append(coords)
+            codes.append(ring_codes)
+    if not vertices:
+        return Path(np.empty((0, 2)))
+    return Path(np.concatenate(vertices), np.concatenate(codes))
+
+class ChoroplethAnimator:
+    """
+    Polygons drawn once as a single PatchCollection and recoloured for every frame.
+
+    The geometries are projected and turned into paths once; a frame only maps its values
+    through the colormap and pushes them with set_facecolor, so frames of a world map render
+    in milliseconds instead of re-plotting and re-projecting every polygon.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes to draw on, usually a cartopy GeoAxes.
+    geometries : gpd.GeoSeries
+        One (multi)polygon per value, the order and index of the value arrays.
+    cmap : str | matplotlib.colors.Colormap
+        Colormap of the values.
+    norm : matplotlib.colors.Normalize
+        Value normalisation, by default 0-1.
+    projection : cartopy.crs.Projection, optional
+        Projection of the GeoAxes, by default ax.projection when there is one.
+    missing_color : color, optional
+        Face colour of polygons without a value, e.g. 'none' to hide them.
+    hide_missing_edges : bool, optional
+        Also hide the outline of polygons without a value.
+    edgecolor, linewidth, zorder
+        Style of the collection.
+    """
+    def __init__(self, ax, geometries: gpd.GeoSeries, cmap: Union[str, colors.Colormap] = "viridis",
+                 norm: Optional[colors.Normalize] = None, projection=None,
+                 missing_color=(0.9, 0.9, 0.9, 1.0), hide_missing_edges: bool = False,
+                 edgecolor="black", linewidth: float = 0.4, zorder: Optional[float] = None):
+        self.ax = ax
+        self.index = geometries.index
+        self.cmap = matplotlib.colormaps[cmap] if isinstance(cmap, str) else cmap
+        self.norm = norm or colors.Normalize(0, 1)
+        self.missing_color = np.array(colors.to_rgba(missing_color))
+        self.edgecolor = np.array(colors.to_rgba(edgecolor))
+        self.hide_missing_edges = hide_missing_edges
+
+        projected = project_geometries(geometries, projection or getattr(ax, "projection", None))
+        patches = [PathPatch(geometry_path(geom)) for geom in projected]
+        self.collection = PatchCollection(patches, edgecolor=edgecolor, linewidth=linewidth, zorder=zorder)
+        self.collection.set_facecolor(self.missing_color)
+        geo_axes = getattr(ax, "projection", None) is not None
+        ax.add_collection(self.collection, autolim=not geo_axes)
+        if not geo_axes:
+            ax.autoscale_view()
+        logger.debug(f"Choropleth collection of {len(patches)} polygons")
+
+    def colors_for(self, values) -> np.ndarray:
+        """RGBA face colours of a value per geometry, missing_color for NaN."""
+        values = np.asarray(values, dtype=float)
+        rgba = self.cmap(self.norm(np.ma.masked_invalid(values)))
+        rgba[np.isnan(values)] = self.missing_color
+        return rgba
+
+    def update(self, values: Union[np.ndarray, pd.Series]) -> PatchCollection:
+        """Recolour the polygons, a Series is aligned on the geometries' index (missing -> NaN)."""
+        if isinstance(values, pd.Series):
+            values = values.reindex(self.index)
+        values = np.asarray(values, dtype=float)
+        self.collection.set_facecolor(self.colors_for(values))
+        if self.hide_missing_edges:
+            edges = np.tile(self.edgecolor, (len(values), 1))
+            edges[np.isnan(values)] = 0.0
+            self.collection.set_edgecolor(edges)
+        return self.collection
+
+def frame_values(dataset: pd.DataFrame, key_column: str, frame_column: str, value_column: str,
+                 keys: pd.Index) -> dict:
+    """
+    Values of every frame aligned on `keys`, from a long table of (key, frame, value) rows.
+
+    Returns
+    -------
+    dict
+        Frame value (e.g. year) -> float array in the order of keys, NaN where missing.
+    """
+    table = (dataset.dropna(subset=[frame_column])
+             .pivot_table(index=frame_column, columns=key_column, values=value_column, aggfunc="mean")
+             .reindex(columns=keys))
+    return {frame: row.to_numpy(dtype=float) for frame, row in table.iterrows()}
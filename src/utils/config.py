@@ -1,4 +1,10 @@
 from decouple import config
 
 SECRET_KEY = config('SECRET_KEY')
-DEBUG_MODE = config('DEBUG_MODE', default=False, cast=bool)
\ No newline at end of file
+DEBUG_MODE = config('DEBUG_MODE', default=False, cast=bool)
+# Serve contextily basemaps only from the local MBTiles store (src/utils/tile_store.py)
+OFFLINE_TILES = config('OFFLINE_TILES', default=False, cast=bool)
+# Save folium layer data to compressed sidecar files loaded on demand (src/utils/folium_sidecars.py)
+FOLIUM_SIDECARS = config('FOLIUM_SIDECARS', default=False, cast=bool)
+# Processes rendering animation frames (src/utils/frame_pool.py), 0 uses every CPU
+FRAME_JOBS = config('FRAME_JOBS', default=0, cast=int)
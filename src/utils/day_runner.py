@@ -0,0 +1,465 @@
+import os
+import sys
+import json
+import time
+import runpy
+import hashlib
+import functools
+import traceback
+import multiprocessing as mp
+
+from typing import Dict, List, Optional
+from pathlib import Path
+from multiprocessing.connection import wait
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+from src.utils.logger import get_logger
+from src.utils.helpers import INPUT_AUDIT_EVENT
+
+logger = get_logger(__name__)
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+YEARS_DIR = PROJECT_ROOT / "src" / "years"
+TIMINGS_FILE = PROJECT_ROOT / ".cache" / "day_timings.json"
+MANIFESTS_FILE = PROJECT_ROOT / ".cache" / "day_manifests.json"
+# Manifests of running days, written by the day process and merged by the parent
+PENDING_MANIFESTS_DIR = PROJECT_ROOT / ".cache" / "day_manifests"
+# Folders whose files never count as day inputs, code is tracked through the imported modules
+IGNORED_INPUT_DIRS = (".cache", ".git", "src", ".venv", "venv")
+# Project code that can change what a day renders, virtual environments inside the project are not
+CODE_DIRS = ("src",)
+CODE_FILES = ("run_days.py",)
+# Changes to the runner itself do not change what a day renders
+RUNNER_FILES = ("run_days.py", "src/utils/day_runner.py")
+SHAPEFILE_SIDECARS = (".shp", ".dbf", ".shx", ".prj", ".cpg")
+
+
+def discover_days(year: str = "2025") -> Dict[str, Path]:
+    """
+    Find every day module of a challenge year.
+
+    Parameters
+    ----------
+    year : str
+        Sub folder of src/years to scan.
+
+    Returns
+    -------
+    Dict[str, Path]
+        Day folder name (e.g. 'd01_points') mapped to its main.py, sorted by day.
+    """
+    return {p.parent.name: p for p in sorted((YEARS_DIR / year).glob("d[0-9][0-9]_*/main.py"))}
+
+def select_days(days: Dict[str, Path], selection: Optional[List[str]] = None) -> Dict[str, Path]:
+    """
+    Filter discovered days by number ('5', '05', 'd05'), range ('1-10') or full name ('d05_earth').
+    An empty selection keeps all days.
+    """
+    if not selection:
+        return days
+
+    wanted = set()
+    for item in selection:
+        item = item.strip().lower().lstrip("d")
+        if "-" in item:
+            start, end = item.split("-", 1)
+            wanted.update(range(int(start.lstrip("d")), int(end.lstrip("d")) + 1))
+        elif item.isdigit():
+            wanted.add(int(item))
+        else:
+            wanted.update(int(name[1:3]) for name in days if name[1:].lower() == item)
+
+    selected = {name: path for name, path in days.items() if int(name[1:3]) in wanted}
+    if not selected:
+        raise ValueError(f"No day modules match selection {selection}")
+    return selected
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the current process in MB."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024**2
+    except (ImportError, AttributeError):
+        return None
+
+def _children_cpu_time() -> float:
+    """CPU time of finished child processes (e.g. ffmpeg), counted towards the day."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class _DependencyTracker:
+    """
+    Record the project files a day reads and writes while it runs.
+
+    Python level opens (pandas CSV, json, PIL, matplotlib, folium) are seen through the 'open'
+    audit event. Loaders that open files in C (GDAL, pyarrow, rasterio) are wrapped instead.
+    """
+    def __init__(self):
+        self.inputs = set()
+        self.outputs = set()
+
+    def _project_file(self, path) -> Optional[Path]:
+        """Project relative path of a file, None for anything outside the project."""
+        if isinstance(path, int):
+            return None
+        try:
+            return Path(os.fsdecode(path)).resolve().relative_to(PROJECT_ROOT)
+        except (TypeError, ValueError, OSError):
+            return None
+
+    def add_input(self, path):
+        relative = self._project_file(path)
+        if (relative and relative.parts[0] not in IGNORED_INPUT_DIRS
+                and "site-packages" not in relative.parts and (PROJECT_ROOT / relative).is_file()):
+            self.inputs.add(relative.as_posix())
+
+    def add_output(self, path):
+        relative = self._project_file(path)
+        if relative and relative.parts[0] not in (".cache", ".git"):
+            self.outputs.add(relative.as_posix())
+
+    def audit_hook(self, event: str, args: tuple):
+        # An exception in an audit hook would abort the open itself, so never raise
+        try:
+            if event == INPUT_AUDIT_EVENT:
+                self.add_input(args[0])
+            elif event == "open" and args[0] is not None:
+                path, mode, flags = args
+                if isinstance(mode, str):
+                    writing = any(c in mode for c in "wax+")
+                else:
+                    writing = bool(flags & (os.O_WRONLY | os.O_RDWR))
+                (self.add_output if writing else self.add_input)(path)
+        except Exception:
+            pass
+
+    def _wrap(self, module, attr: str, has_mode: bool):
+        original = getattr(module, attr)
+
+        @functools.wraps(original)
+        def wrapper(path, *args, **kwargs):
+            if isinstance(path, (str, bytes, os.PathLike)):
+                mode = "r"
+                if has_mode:
+                    mode = kwargs.get("mode", args[0] if args and isinstance(args[0], str) else "r")
+                (self.add_input if mode.startswith("r") else self.add_output)(path)
+            return original(path, *args, **kwargs)
+
+        setattr(module, attr, wrapper)
+
+    def install(self):
+        """Start recording, lasts for the rest of the process (audit hooks cannot be removed)."""
+        sys.addaudithook(self.audit_hook)
+        loaders = (("geopandas", "read_file", False),
+                   ("geopandas", "read_parquet", False),
+                   ("pandas", "read_parquet", False),
+                   ("rasterio", "open", True))
+        for module_name, attr, has_mode in loaders:
+            try:
+                module = __import__(module_name)
+            except ImportError:
+                continue
+            self._wrap(module, attr, has_mode)
+
+    def code_files(self, main_path: str) -> List[str]:
+        """The day's main.py and every project module it imported (e.g. src/utils/*)."""
+        files = {Path(main_path).resolve()}
+        for module in list(sys.modules.values()):
+            module_file = getattr(module, "__file__", None)
+            if module_file:
+                files.add(Path(module_file).resolve())
+        code = set()
+        for f in files:
+            if not f.is_relative_to(PROJECT_ROOT) or f.suffix != ".py":
+                continue
+            relative = f.relative_to(PROJECT_ROOT)
+            if (relative.parts[0] in CODE_DIRS and "site-packages" not in relative.parts
+                    or relative.as_posix() in CODE_FILES):
+                code.add(relative.as_posix())
+        return sorted(code - set(RUNNER_FILES))
+
+def _expand_sidecars(relative: str) -> List[str]:
+    """A shapefile is several files, depend on all of them when one is read."""
+    path = PROJECT_ROOT / relative
+    if path.suffix.lower() not in SHAPEFILE_SIDECARS:
+        return [relative]
+    return sorted(p.relative_to(PROJECT_ROOT).as_posix() for p in path.parent.glob(f"{path.stem}.*")
+                  if p.suffix.lower() in SHAPEFILE_SIDECARS)
+
+def fingerprint(relative: str, content: bool = False) -> Optional[str]:
+    """
+    Fingerprint a project file, size and mtime for data or a content hash for code.
+    None if the file does not exist.
+    """
+    path = PROJECT_ROOT / relative
+    if not path.is_file():
+        return None
+    if content:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def build_manifest(tracker: _DependencyTracker, main_path: str) -> Dict:
+    """Fingerprint everything a finished day read, imported and wrote."""
+    outputs = tracker.outputs - tracker.inputs
+    inputs = sorted({f for i in tracker.inputs for f in _expand_sidecars(i)} - outputs)
+    return {
+        "inputs": {f: fingerprint(f) for f in inputs},
+        "code": {f: fingerprint(f, content=True) for f in tracker.code_files(main_path)},
+        "outputs": sorted(f for f in outputs if (PROJECT_ROOT / f).is_file()),
+    }
+
+def load_manifests() -> Dict[str, Dict]:
+    """Dependency manifests of the last successful run per day."""
+    if not MANIFESTS_FILE.exists():
+        return {}
+    with open(MANIFESTS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifests(results: List[Dict]):
+    """Merge the manifests of successful days into the manifests file."""
+    manifests = load_manifests()
+    manifests.update({r["name"]: r["manifest"] for r in results
+                      if r["status"] == "ok" and r.get("manifest")})
+    MANIFESTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(MANIFESTS_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifests, f, indent=2, sort_keys=True)
+
+def stale_reason(name: str, manifests: Dict[str, Dict]) -> Optional[str]:
+    """
+    Why a day has to be rebuilt, or None if its inputs, code and outputs are unchanged
+    since its last successful run.
+    """
+    manifest = manifests.get(name)
+    if manifest is None:
+        return "no previous successful run"
+    for kind, content in (("code", True), ("inputs", False)):
+        for relative, previous in manifest[kind].items():
+            current = fingerprint(relative, content=content)
+            if current is None:
+                return f"{relative} removed"
+            if current != previous:
+                return f"{relative} changed"
+    for relative in manifest["outputs"]:
+        if not (PROJECT_ROOT / relative).is_file():
+            return f"output {relative} missing"
+    return None
+
+def stale_days(days: Dict[str, Path]) -> Dict[str, str]:
+    """Subset of days that need a rebuild, mapped to the reason."""
+    manifests = load_manifests()
+    reasons = {name: stale_reason(name, manifests) for name in days}
+    return {name: reason for name, reason in reasons.items() if reason}
+
+def run_day(name: str, main_path: str, log_dir: Optional[str] = None,
+            track_dependencies: bool = False) -> Dict:
+    """
+    Run a single day module as if called with `python main.py` and measure it.
+
+    Parameters
+    ----------
+    name : str
+        Day folder name, used for reporting.
+    main_path : str
+        Path to the day's main.py.
+    log_dir : str, optional
+        If given, stdout/stderr of the day are written to '<log_dir>/<name>.log'.
+    track_dependencies : bool, optional
+        Record the files the day reads/writes and the modules it imports into 'manifest'.
+        Meant for a dedicated process, the tracking hooks stay installed afterwards.
+
+    Returns
+    -------
+    Dict
+        name, status ('ok' or 'failed'), wall_s, cpu_s, peak_rss_mb, error (traceback or '')
+        and manifest (None unless tracked, see build_manifest).
+    """
+    # Day modules read 'data/...' relative to the project root and must not open GUI windows
+    os.chdir(PROJECT_ROOT)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        log_fd = os.open(os.path.join(log_dir, f"{name}.log"), os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log_fd, 1)
+        os.dup2(log_fd, 2)
+        os.close(log_fd)
+
+    tracker = None
+    if track_dependencies:
+        tracker = _DependencyTracker()
+        tracker.install()
+
+    status, error = "ok", ""
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        runpy.run_path(main_path, run_name="__main__")
+    except SystemExit as e:
+        # sys.exit() / sys.exit(0) is a normal end of the script, any other code is a failure
+        if e.code not in (None, 0):
+            status = "failed"
+            error = f"Exited with code {e.code!r}"
+    except Exception:
+        status = "failed"
+        error = traceback.format_exc()
+        traceback.print_exc()
+
+    return {
+        "name": name,
+        "status": status,
+        "wall_s": time.perf_counter() - start_wall,
+        "cpu_s": time.process_time() - start_cpu + _children_cpu_time(),
+        "peak_rss_mb": _peak_rss_mb(),
+        "error": error,
+        "manifest": build_manifest(tracker, main_path) if tracker else None,
+    }
+
+def _day_worker(conn, name: str, main_path: str, log_dir: Optional[str]):
+    """
+    Process entry point, sends the result of run_day back to the parent.
+
+    The manifest (every input and code fingerprint) is written to PENDING_MANIFESTS_DIR and only
+    its path goes through the pipe, see _collect_manifest.
+    """
+    result = run_day(name, main_path, log_dir, track_dependencies=True)
+    manifest = result.pop("manifest")
+    result["manifest_path"] = None
+    if manifest is not None:
+        path = PENDING_MANIFESTS_DIR / f"{name}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        result["manifest_path"] = str(path)
+    conn.send(result)
+    conn.close()
+
+def _collect_manifest(result: Dict) -> Dict:
+    """Replace the manifest_path sent by _day_worker with the manifest itself."""
+    path = result.pop("manifest_path", None)
+    result["manifest"] = None
+    if path is not None:
+        with open(path, "r", encoding="utf-8") as f:
+            result["manifest"] = json.load(f)
+        os.remove(path)
+    return result
+
+def load_timings() -> Dict[str, float]:
+    """Wall times of the last successful run per day, used to schedule the slowest days first."""
+    if not TIMINGS_FILE.exists():
+        return {}
+    with open(TIMINGS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_timings(results: List[Dict]):
+    """Merge the wall times of successful days into the timings file."""
+    timings = load_timings()
+    timings.update({r["name"]: r["wall_s"] for r in results if r["status"] == "ok"})
+    TIMINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(TIMINGS_FILE, "w", encoding="utf-8") as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+
+def run_days(days: Dict[str, Path], jobs: Optional[int] = None, log_dir: Optional[str] = None) -> List[Dict]:
+    """
+    Run day modules in parallel, each in its own fresh process.
+
+    A day that raises, segfaults or gets killed is reported as failed without affecting the others.
+    The dependency manifest of every successful day is stored for incremental rebuilds (stale_days).
+    Days are started longest-first (based on the previous run) so the total time is bound by the
+    slowest single day rather than by an unlucky ordering.
+
+    Parameters
+    ----------
+    days : Dict[str, Path]
+        Day name mapped to its main.py, see discover_days/select_days.
+    jobs : int, optional
+        Maximum number of days running at once, defaults to the number of CPUs.
+    log_dir : str, optional
+        Directory for per-day log files, by default output goes to the console.
+
+    Returns
+    -------
+    List[Dict]
+        One result per day (see run_day), in day order.
+    """
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    timings = load_timings()
+    pending = sorted(days, key=lambda name: timings.get(name, float("inf")), reverse=True)
+    # spawn gives every day a clean interpreter (no inherited matplotlib/GDAL state)
+    ctx = mp.get_context("spawn")
+
+    running = {}
+    results = {}
+    while pending or running:
+        while pending and len(running) < jobs:
+            name = pending.pop(0)
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_day_worker, args=(child_conn, name, str(days[name]), log_dir),
+                               name=name, daemon=False)
+            proc.start()
+            child_conn.close()
+            running[parent_conn] = (name, proc, time.perf_counter())
+            logger.info(f"Started {name} (pid {proc.pid})")
+
+        # Wait on the pipes, not the processes: a child blocks in send() until its result is read,
+        # and a child that dies without reporting closes its end, which wakes recv() with EOFError
+        for conn in wait(list(running)):
+            name, proc, start = running.pop(conn)
+            try:
+                result = _collect_manifest(conn.recv())
+            except EOFError:
+                # The process died (crash, OOM kill, os._exit) before reporting back
+                result = {
+                    "name": name,
+                    "status": "failed",
+                    "wall_s": time.perf_counter() - start,
+                    "cpu_s": None,
+                    "peak_rss_mb": None,
+                    "error": f"Process exited with code {proc.exitcode} without reporting a result",
+                    "manifest": None,
+                }
+            conn.close()
+            proc.join()
+            results[name] = result
+            logger.info(f"Finished {name} - {result['status']} in {result['wall_s']:.1f}s")
+
+    ordered = [results[name] for name in days]
+    save_timings(ordered)
+    save_manifests(ordered)
+    return ordered
+
+def format_summary(results: List[Dict]) -> str:
+    """Render results as a plain text table with wall time, CPU time and peak RSS per day."""
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    header = f"{'day':<24}{'status':<8}{'wall (s)':>10}{'cpu (s)':>10}{'peak RSS (MB)':>15}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['name']:<24}{r['status']:<8}{fmt(r['wall_s'], '.1f'):>10}"
+            f"{fmt(r['cpu_s'], '.1f'):>10}{fmt(r['peak_rss_mb'], '.0f'):>15}"
+        )
+    lines.append("-" * len(header))
+    failed = [r["name"] for r in results if r["status"] != "ok"]
+    total_wall = sum(r["wall_s"] for r in results)
+    lines.append(f"{len(results) - len(failed)}/{len(results)} days ok, "
+                 f"summed wall time {total_wall:.1f}s")
+    if failed:
+        lines.append(f"Failed: {', '.join(failed)}")
+    return "\n".join(lines)
@@ -3,25 +3,34 @@
 """
 Module to fetch historical weather data from the Open-Meteo Historical Weather API
 (https://open-meteo.com/en/docs/historical-weather-api) for a given latitude/longitude
-and date range. Data is retrieved in batches to manage memory/time, and saved to CSV.
+and date range. Data is retrieved in batches to manage memory/time, and saved to CSV or
+Parquet (one file per daily/hourly section).
+Batches are fetched concurrently under a shared rate limit, and a checkpoint file next to
+the output lets an interrupted download resume from the last completed batch.
 
 Usage example:
     python open_meteo_historical.py \
       --lat 33.625 --lon 72.998 \
       --start_date 2019-01-01 --end_date 2025-11-08 \
-      --output_file weather_history.csv
+      --output_file weather_history.csv --workers 4
 """
 
 import argparse
 import datetime
 import json
 import os
+import random
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional
 
+import numpy as np
 import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # Constants
 API_BASE_URL = "https://archive-api.open-meteo.com/v1/archive"
@@ -38,6 +47,34 @@ DEFAULT_HOURLY_VARS = [
     "temperature_2m",
     "precipitation"
 ]
+# Free API tier allows 600 calls/minute, stay well below it
+DEFAULT_RATE_PER_SEC = 5.0
+DEFAULT_WORKERS = 4
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter, `rate` requests per second with bursts up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
 
 def build_request_url(
@@ -70,56 +107,156 @@ def build_request_url(
     return url
 
 
-def fetch_data(url: str, retry: int = 3, pause_sec: float = 1.0) -> Dict:
+def fetch_data(
+    url: str,
+    retry: int = 3,
+    pause_sec: float = 1.0,
+    rate_limiter: Optional[TokenBucket] = None,
+    session: Optional[requests.Session] = None
+) -> Dict:
     """
-    Fetches the JSON from given URL. Retries on errors.
+    Fetches the JSON from given URL. Retries on errors with jittered exponential backoff
+    (pause_sec, 2*pause_sec, 4*pause_sec, ... each scaled by a random 0.5-1.5 factor),
+    honouring a Retry-After header when the API rate limits us.
     """
     for attempt in range(1, retry + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         try:
-            resp = requests.get(url, timeout=60)
+            resp = (session or requests).get(url, timeout=60)
             resp.raise_for_status()
             return resp.json()
         except Exception as e:
             print(f"Warning: attempt {attempt} failed fetching {url}: {e}", file=sys.stderr)
             if attempt < retry:
-                time.sleep(pause_sec)
+                backoff = pause_sec * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                retry_after = getattr(getattr(e, "response", None), "headers", {}).get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    backoff = max(backoff, float(retry_after))
+                time.sleep(backoff)
             else:
                 raise
     # Should not reach here
     return {}
 
 
-def process_json_to_dataframe(
+def process_json_to_dataframes(
     json_data: Dict,
     daily_vars: Optional[List[str]] = None,
     hourly_vars: Optional[List[str]] = None
-) -> pd.DataFrame:
+) -> Dict[str, pd.DataFrame]:
     """
-    Converts the returned JSON into a pandas DataFrame. It handles both daily and hourly values.
+    Converts the returned JSON into one DataFrame per section ('daily', 'hourly').
+    Columns are built directly from the response arrays: 'time' as datetime64, 'timezone' and
+    one float64 column per variable (null values and variables missing from the response are NaN).
     """
-    records = []
     timezone = json_data.get("timezone", "")
-    # Process daily
-    if daily_vars and "daily" in json_data:
-        times = json_data["daily"].get("time", [])
-        for idx, t in enumerate(times):
-            row = {"time": t, "timezone": timezone}
-            for var in daily_vars:
-                row[var] = json_data["daily"].get(var, [None]*len(times))[idx]
-            records.append(row)
-    # Process hourly if present (optional)
-    if hourly_vars and "hourly" in json_data:
-        times = json_data["hourly"].get("time", [])
-        for idx, t in enumerate(times):
-            row = {"time": t, "timezone": timezone}
-            for var in hourly_vars:
-                row[var] = json_data["hourly"].get(var, [None]*len(times))[idx]
-            records.append(row)
-
-    df = pd.DataFrame.from_records(records)
-    # Convert time column to datetime
-    df["time"] = pd.to_datetime(df["time"])
-    return df
+    frames = {}
+    for section, variables in (("daily", daily_vars), ("hourly", hourly_vars)):
+        if not variables or section not in json_data:
+            continue
+        values = json_data[section]
+        times = pd.to_datetime(np.asarray(values.get("time", []), dtype=str))
+        columns = {"time": times, "timezone": np.full(len(times), timezone, dtype=object)}
+        for var in variables:
+            column = values.get(var)
+            # dtype=float turns JSON nulls into NaN without a Python loop
+            columns[var] = np.full(len(times), np.nan) if column is None else np.asarray(column, dtype=float)
+        frames[section] = pd.DataFrame(columns)
+    return frames
+
+
+class CsvSink:
+    """Appends DataFrames to a CSV file, resumable by truncating to a recorded byte size."""
+    def __init__(self, path: str):
+        self.path = path
+        self.started = False
+
+    def restore(self, progress: Optional[Dict]) -> bool:
+        """Continue the file as it was at `progress`, False if that's not possible."""
+        if not progress:
+            return False
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < progress["bytes"]:
+            return False
+        with open(self.path, "r+b") as f:
+            f.truncate(progress["bytes"])
+        self.started = progress["bytes"] > 0
+        return True
+
+    def write(self, df: pd.DataFrame):
+        df.to_csv(self.path, index=False, mode="a" if self.started else "w", header=not self.started)
+        self.started = True
+
+    def progress(self) -> Dict:
+        return {"bytes": os.path.getsize(self.path) if self.started else 0}
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    """
+    Appends DataFrames to a Parquet file, one row group per DataFrame.
+
+    Data is written to '<path>.partial' and moved to `path` on close, which also happens when
+    the download fails, so completed row groups can be carried over by a resumed download.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.writer = None
+        self.row_groups = 0
+
+    def _open(self, schema: pa.Schema):
+        self.writer = pq.ParquetWriter(self.partial_path, schema, compression="zstd")
+
+    def restore(self, progress: Optional[Dict]) -> bool:
+        """Copy the first recorded row groups of the existing file, False if that's not possible."""
+        if not progress:
+            return False
+        if progress["row_groups"] == 0:
+            return True
+        try:
+            existing = pq.ParquetFile(self.path)
+        except (OSError, pa.ArrowException):
+            return False
+        if existing.num_row_groups < progress["row_groups"]:
+            return False
+        self._open(existing.schema_arrow)
+        for i in range(progress["row_groups"]):
+            self.writer.write_table(existing.read_row_group(i))
+        self.row_groups = progress["row_groups"]
+        return True
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self._open(table.schema)
+        self.writer.write_table(table.cast(self.writer.schema), row_group_size=max(1, len(df)))
+        self.row_groups += 1
+
+    def progress(self) -> Dict:
+        return {"row_groups": self.row_groups}
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.partial_path, self.path)
+            self.writer = None
+
+
+SINKS = {"csv": CsvSink, "parquet": ParquetSink}
+
+
+def section_output_path(output_file: str, section: str, sections: List[str]) -> str:
+    """
+    Output file of a section: `output_file` itself when only one section is downloaded,
+    otherwise '<name>_<section><ext>' (e.g. weather_daily.csv, weather_hourly.csv).
+    """
+    if len(sections) == 1:
+        return output_file
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{section}{ext}"
 
 
 def chunk_date_range(
@@ -140,19 +277,144 @@ def chunk_date_range(
     return chunks
 
 
+def _load_checkpoint(checkpoint_file: str, params: Dict) -> Optional[Dict]:
+    """Returns the saved progress if it belongs to a download with these parameters."""
+    if not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("params") != params:
+        print("Checkpoint does not match this download, starting over", file=sys.stderr)
+        return None
+    return state
+
+
+def _save_checkpoint(checkpoint_file: str, state: Dict):
+    tmp_file = f"{checkpoint_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def download_range(
+    latitude: float,
+    longitude: float,
+    start_date: datetime.date,
+    end_date: datetime.date,
+    output_file: str,
+    daily_vars: Optional[List[str]] = None,
+    hourly_vars: Optional[List[str]] = None,
+    chunk_days: int = 365,
+    workers: int = DEFAULT_WORKERS,
+    rate_per_sec: float = DEFAULT_RATE_PER_SEC,
+    resume: bool = True,
+    output_format: str = "csv"
+) -> Dict[str, str]:
+    """
+    Downloads a date range chunk by chunk into one CSV or Parquet file per section.
+
+    Up to `workers` chunks are requested at once, all requests share a token bucket of
+    `rate_per_sec`. Chunks are appended in date order as soon as all earlier chunks are written
+    (a row group per chunk for Parquet), and after each append the progress is saved to
+    '<output_file>.checkpoint.json'. Running the same download again resumes after the last
+    appended chunk, the checkpoint is removed once the download is complete.
+
+    Returns the output file per section, see section_output_path.
+    """
+    chunks = chunk_date_range(start_date, end_date, max_days=chunk_days)
+    sections = [name for name, variables in (("daily", daily_vars), ("hourly", hourly_vars)) if variables]
+    if not sections:
+        raise ValueError("Request at least one daily or hourly variable")
+    outputs = {section: section_output_path(output_file, section, sections) for section in sections}
+    sinks = {section: SINKS[output_format](path) for section, path in outputs.items()}
+
+    checkpoint_file = f"{output_file}.checkpoint.json"
+    params = {
+        "latitude": latitude, "longitude": longitude,
+        "start_date": start_date.isoformat(), "end_date": end_date.isoformat(),
+        "daily_vars": daily_vars, "hourly_vars": hourly_vars, "chunk_days": chunk_days,
+        "output_format": output_format,
+    }
+    state = _load_checkpoint(checkpoint_file, params) if resume else None
+    if state and all(sink.restore(state["sinks"].get(section)) for section, sink in sinks.items()):
+        print(f"  -- Resuming after {state['completed']}/{len(chunks)} chunks")
+    else:
+        for sink in sinks.values():
+            sink.close()
+        sinks = {section: SINKS[output_format](path) for section, path in outputs.items()}
+        state = {"params": params, "completed": 0, "sinks": {}}
+
+    rate_limiter = TokenBucket(rate_per_sec)
+    pending = {}
+    next_index = state["completed"]
+
+    def fetch_chunk(chunk: Dict[str, datetime.date]) -> Dict[str, pd.DataFrame]:
+        s = chunk["start"].isoformat()
+        e = chunk["end"].isoformat()
+        url = build_request_url(latitude=latitude,
+                                longitude=longitude,
+                                start_date=s,
+                                end_date=e,
+                                daily_vars=daily_vars,
+                                hourly_vars=hourly_vars)
+        print(f"  -- Fetching chunk {s} to {e}")
+        json_data = fetch_data(url, rate_limiter=rate_limiter, session=session)
+        return process_json_to_dataframes(json_data, daily_vars=daily_vars, hourly_vars=hourly_vars)
+
+    try:
+        with requests.Session() as session, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(1, workers))
+            session.mount("https://", adapter)
+            futures = {executor.submit(fetch_chunk, chunks[i]): i for i in range(next_index, len(chunks))}
+            for future in as_completed(futures):
+                try:
+                    pending[futures[future]] = future.result()
+                except BaseException:
+                    # Don't wait for the queued chunks, the checkpoint keeps what is written so far
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+                # Append every chunk whose predecessors are written, keeps the output in date order
+                while next_index in pending:
+                    frames = pending.pop(next_index)
+                    for section, sink in sinks.items():
+                        if section in frames:
+                            sink.write(frames[section])
+                    next_index += 1
+                    state.update(completed=next_index,
+                                 sinks={section: sink.progress() for section, sink in sinks.items()})
+                    _save_checkpoint(checkpoint_file, state)
+    finally:
+        for sink in sinks.values():
+            sink.close()
+
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    return outputs
+
+
 def main():
     parser = argparse.ArgumentParser(description="Fetch historical weather from Open-Meteo")
     parser.add_argument("--lat", type=float, required=True, help="Latitude of location")
     parser.add_argument("--lon", type=float, required=True, help="Longitude of location")
     parser.add_argument("--start_date", type=str, required=True, help="Start date YYYY-MM-DD")
     parser.add_argument("--end_date", type=str, required=True, help="End date YYYY-MM-DD")
-    parser.add_argument("--output_file", type=str, required=True, help="CSV output file")
+    parser.add_argument("--output_file", type=str, required=True,
+                        help="Output file, suffixed with _daily/_hourly when both are requested")
+    parser.add_argument("--format", type=str, choices=sorted(SINKS), default="csv",
+                        help="Output format, parquet writes a row group per chunk (default csv)")
     parser.add_argument("--daily_vars", type=str,
                         default=",".join(DEFAULT_DAILY_VARS),
                         help=f"Comma-separated daily variables (default {DEFAULT_DAILY_VARS})")
     parser.add_argument("--hourly_vars", type=str,
                         default="",
                         help=f"Comma-separated hourly variables (optional, default none)")
+    parser.add_argument("--chunk_days", type=int, default=365, help="Days per request (default 365)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Maximum requests in flight (default {DEFAULT_WORKERS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_SEC,
+                        help=f"Maximum requests per second (default {DEFAULT_RATE_PER_SEC})")
+    parser.add_argument("--no_resume", action="store_true",
+                        help="Ignore an existing checkpoint and download everything again")
 
     args = parser.parse_args()
 
@@ -167,35 +429,16 @@ def main():
     print(f"Fetching historical weather for lat={latitude}, lon={longitude}, "
           f"from {start_date} to {end_date} …")
 
-    # Create chunked ranges
-    chunks = chunk_date_range(start_date, end_date, max_days=365)
+    outputs = download_range(latitude, longitude, start_date, end_date, output_file,
+                   daily_vars=daily_vars_list,
+                   hourly_vars=hourly_vars_list,
+                   chunk_days=args.chunk_days,
+                   workers=args.workers,
+                   rate_per_sec=args.rate,
+                   resume=not args.no_resume,
+                   output_format=args.format)
 
-    # For memory/time efficiency: process chunk by chunk and append to CSV
-    first_chunk = True
-    for chunk in chunks:
-        s = chunk["start"].isoformat()
-        e = chunk["end"].isoformat()
-        url = build_request_url(latitude=latitude,
-                                longitude=longitude,
-                                start_date=s,
-                                end_date=e,
-                                daily_vars=daily_vars_list,
-                                hourly_vars=hourly_vars_list)
-        print(f"  -- Fetching chunk {s} to {e}")
-        json_data = fetch_data(url)
-        df = process_json_to_dataframe(json_data,
-                                      daily_vars=daily_vars_list,
-                                      hourly_vars=hourly_vars_list)
-        # Write/append to CSV
-        if first_chunk:
-            df.to_csv(output_file, index=False, mode="w", header=True)
-            first_chunk = False
-        else:
-            df.to_csv(output_file, index=False, mode="a", header=False)
-        # Pause briefly to avoid hammering the service
-        time.sleep(1.0)
-
-    print(f"Done. Saved to {output_file}")
+    print(f"Done. Saved to {', '.join(outputs.values())}")
 
 if __name__ == "__main__":
     main()
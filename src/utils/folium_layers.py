@@ -0,0 +1,951 @@
+import re
+import json
+import folium
+import shapely
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from typing import List, Optional, Union
+from pathlib import Path
+from folium.map import Layer
+from folium.elements import JSCSSMixin
+from folium.plugins import TimestampedGeoJson
+from folium.utilities import parse_options
+from branca.element import Template
+
+from src.utils.logger import get_logger
+from src.utils.raster_tiles import read_tile_metadata
+from src.utils.topology import TILE_SIZE, TOPOLOGY_OBJECT, to_topojson, topojson_to_geodataframe
+
+logger = get_logger(__name__)
+
+
+class PointLayer(Layer):
+    """
+    All points of a GeoDataFrame as one GeoJSON FeatureCollection drawn on a canvas.
+
+    Instead of a CircleMarker (Python object + JS snippet) per point, radius, colour and popup
+    fields travel as feature properties and a single pointToLayer callback styles every point,
+    the same idea as FastMarkerCluster. Popups and tooltips are only built when opened.
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var fields = {{ this.popup_fields|tojson }};
+                var aliases = {{ this.popup_aliases|tojson }};
+                var tooltipFields = {{ this.tooltip_fields|tojson }};
+                var tooltipAliases = {{ this.tooltip_aliases|tojson }};
+                function escape(value) {
+                    return String(value === null || value === undefined ? "" : value)
+                        .replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+                }
+                function describe(props, keys, labels) {
+                    return keys.map(function (key, i) {
+                        return "<b>" + escape(labels[i]) + "</b> " + escape(props[key]);
+                    }).join("<br>");
+                }
+                var renderer = L.canvas({padding: 0.5});
+                return L.geoJSON({{ this.data_json }}, {
+                    pointToLayer: function (feature, latlng) {
+                        var p = feature.properties;
+                        return L.circleMarker(latlng, {
+                            renderer: renderer,
+                            radius: p._radius,
+                            color: p._color,
+                            fillColor: p._color,
+                            weight: {{ this.weight }},
+                            fillOpacity: {{ this.fill_opacity }}
+                        });
+                    },
+                    onEachFeature: function (feature, layer) {
+                        if (fields.length) {
+                            layer.bindPopup(function () {
+                                return describe(feature.properties, fields, aliases);
+                            }, {maxWidth: {{ this.popup_max_width }}});
+                        }
+                        if (tooltipFields.length) {
+                            layer.bindTooltip(function () {
+                                return describe(feature.properties, tooltipFields, tooltipAliases);
+                            });
+                        }
+                    }
+                });
+            })();
+            {% if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {% endif %}
+        {% endmacro %}
+        """)
+
+    def __init__(self, data: str, name: Optional[str] = None,
+                 popup_fields: Optional[List[str]] = None, popup_aliases: Optional[List[str]] = None,
+                 tooltip_fields: Optional[List[str]] = None, tooltip_aliases: Optional[List[str]] = None,
+                 fill_opacity: float = 0.6, weight: float = 1,
+                 popup_max_width: int = 300, overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "PointLayer"
+        self.data_json = data
+        self.popup_fields = popup_fields or []
+        self.popup_aliases = popup_aliases or self.popup_fields
+        self.tooltip_fields = tooltip_fields or []
+        self.tooltip_aliases = tooltip_aliases or self.tooltip_fields
+        self.fill_opacity = fill_opacity
+        self.weight = weight
+        self.popup_max_width = popup_max_width
+
+class VectorTileLayer(JSCSSMixin, Layer):
+    """
+    Vector tiles from a PMTiles archive drawn with protomaps-leaflet.
+
+    The browser reads the archive with HTTP range requests and only fetches the tiles in view,
+    so the page has to be served over HTTP by a server supporting ranges (not opened as file://).
+    Features are styled by paint rules, optionally one rule per value of a property.
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = protomapsL.leafletLayer({
+                url: {{ this.url|tojson }},
+                maxDataZoom: {{ this.max_data_zoom }},
+                paintRules: [
+                {%- for rule in this.rules %}
+                    {
+                        dataLayer: {{ this.data_layer|tojson }},
+                        {%- if rule.value is defined %}
+                        filter: function (zoom, feature) {
+                            return feature.props[{{ this.property|tojson }}] === {{ rule.value|tojson }};
+                        },
+                        {%- elif rule.others is defined %}
+                        filter: function (zoom, feature) {
+                            return {{ rule.others|tojson }}.indexOf(feature.props[{{ this.property|tojson }}]) < 0;
+                        },
+                        {%- endif %}
+                        symbolizer: new protomapsL.{{ this.symbolizer }}({{ rule.style|tojson }})
+                    },
+                {%- endfor %}
+                ],
+                labelRules: []
+            });
+            {% if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {% endif %}
+        {% endmacro %}
+        """)
+
+    default_js = [
+        ("protomaps-leaflet", "https://unpkg.com/protomaps-leaflet@4.0.1/dist/protomaps-leaflet.js"),
+    ]
+
+    def __init__(self, url: str, data_layer: str, symbolizer: str, rules: List[dict],
+                 property: Optional[str] = None, max_data_zoom: int = 12, name: Optional[str] = None,
+                 overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "VectorTileLayer"
+        self.url = url
+        self.data_layer = data_layer
+        self.symbolizer = symbolizer
+        self.rules = rules
+        self.property = property
+        self.max_data_zoom = max_data_zoom
+
+class ClusterLayer(JSCSSMixin, Layer):
+    """
+    Points clustered in Python, one cluster level per zoom, drawn for the current view only.
+
+    The page gets the cluster centres and counts of every zoom level, the point coordinates,
+    the zoom each point stops being clustered at and a column table of attributes. On every
+    move the layer draws the clusters and single points in view; popups and tooltips are
+    built from the attribute table when opened.
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var group = L.layerGroup();
+                var map = {{ this._parent.get_name() }};
+                var data = null;
+                var popupFields = {{ this.popup_fields|tojson }};
+                var popupAliases = {{ this.popup_aliases|tojson }};
+                var tooltipTemplate = {{ this.tooltip_template|tojson }};
+                function escape(value) {
+                    return String(value === null || value === undefined ? "" : value)
+                        .replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;");
+                }
+                function popup(i) {
+                    return popupFields.map(function (key, k) {
+                        return "<b>" + escape(popupAliases[k]) + "</b> " + escape(data.props[key][i]);
+                    }).join("<br>");
+                }
+                function tooltip(i) {
+                    return tooltipTemplate.replace(/\\{(\\w+)\\}/g, function (_, key) {
+                        return escape(data.props[key] ? data.props[key][i] : "");
+                    });
+                }
+                function clusterIcon(count) {
+                    var size = count < 10 ? "small" : count < 100 ? "medium" : "large";
+                    return L.divIcon({html: "<div><span>" + count + "</span></div>",
+                                      className: "marker-cluster marker-cluster-" + size,
+                                      iconSize: L.point(40, 40)});
+                }
+                function pointMarker(i, latlng) {
+                    {%- if this.icon %}
+                    var marker = L.marker(latlng, {icon: L.AwesomeMarkers.icon({{ this.icon|tojson }})});
+                    {%- else %}
+                    var marker = L.circleMarker(latlng, {radius: 5, color: {{ this.color|tojson }}, weight: 1});
+                    {%- endif %}
+                    if (popupFields.length) {
+                        marker.bindPopup(function () { return popup(i); }, {maxWidth: {{ this.popup_max_width }}});
+                    }
+                    if (tooltipTemplate) {
+                        marker.bindTooltip(function () { return tooltip(i); }, {sticky: true});
+                    }
+                    return marker;
+                }
+                function render() {
+                    if (!data || !map.hasLayer(group)) { return; }
+                    group.clearLayers();
+                    var zoom = Math.max(Math.round(map.getZoom()), data.min_zoom);
+                    var bounds = map.getBounds().pad(0.25);
+                    var clusters = data.clusters[zoom];
+                    if (clusters) {
+                        for (var c = 0; c < clusters.count.length; c++) {
+                            var latlng = L.latLng(clusters.lat[c], clusters.lon[c]);
+                            if (!bounds.contains(latlng)) { continue; }
+                            L.marker(latlng, {icon: clusterIcon(clusters.count[c])})
+                                .on("click", function (e) { map.setView(e.latlng, zoom + 2); })
+                                .addTo(group);
+                        }
+                    }
+                    var points = data.points;
+                    for (var i = 0; i < points.single.length; i++) {
+                        if (points.single[i] > zoom) { continue; }
+                        var point = L.latLng(points.lat[i], points.lon[i]);
+                        if (bounds.contains(point)) { pointMarker(i, point).addTo(group); }
+                    }
+                }
+                group.setData = function (value) {
+                    data = value;
+                    render();
+                };
+                group.on("add", function () { map.on("moveend", render); render(); });
+                group.on("remove", function () { map.off("moveend", render); });
+                data = {{ this.data_json }};
+                return group;
+            })();
+            {% if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {% endif %}
+        {% endmacro %}
+        """)
+
+    default_css = [
+        ("markerclustercss", "https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.css"),
+        ("markerclusterdefaultcss",
+         "https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.Default.css"),
+    ]
+
+    def __init__(self, data: str, name: Optional[str] = None,
+                 popup_fields: Optional[List[str]] = None, popup_aliases: Optional[List[str]] = None,
+                 tooltip_template: str = "", icon: Optional[dict] = None, color: str = "black",
+                 popup_max_width: int = 300, overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "ClusterLayer"
+        self.data_json = data
+        self.popup_fields = popup_fields or []
+        self.popup_aliases = popup_aliases or self.popup_fields
+        self.tooltip_template = tooltip_template
+        self.icon = icon
+        self.color = color
+        self.popup_max_width = popup_max_width
+
+class TimeChoroplethLayer(JSCSSMixin, Layer):
+    """
+    A choropleth over time: every geometry once, one value per geometry and time step.
+
+    The page gets the distinct geometries as GeoJSON, the time steps, a flat value table
+    (time-major) and a colour ramp. A leaflet-timedimension slider, the one used by
+    TimestampedGeoJson, drives the layer and each step only restyles the polygons, so the
+    page grows with time steps x geometries instead of time steps x vertices.
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var map = {{ this._parent.get_name() }};
+                var data = null;
+                if (!map.timeDimension) {
+                    map.timeDimension = L.timeDimension({period: {{ this.period|tojson }}});
+                    var TimeControl = L.Control.TimeDimension.extend({
+                        _getDisplayDateFormat: function (date) {
+                            return moment(date).format({{ this.date_options|tojson }});
+                        }
+                    });
+                    map.addControl(new TimeControl({{ this.options|tojson }}));
+                }
+                function value(f) {
+                    var t = map.timeDimension.getCurrentTimeIndex();
+                    return t < 0 ? null : data.values[t * data.count + f];
+                }
+                function style(feature) {
+                    var v = data ? value(feature.properties.i) : null;
+                    if (v === null) { return {fillOpacity: 0}; }
+                    var ramp = data.ramp;
+                    var k = Math.round((v - data.vmin) / ((data.vmax - data.vmin) || 1) * (ramp.length - 1));
+                    return {fillColor: ramp[Math.min(Math.max(k, 0), ramp.length - 1)],
+                            fillOpacity: {{ this.fill_opacity }}};
+                }
+                var geometries = L.geoJson(null, {
+                    style: function (feature) {
+                        return L.extend({color: {{ this.color|tojson }}, weight: {{ this.weight }}}, style(feature));
+                    },
+                    onEachFeature: function (feature, layer) {
+                        layer.bindPopup(function () {
+                            var v = value(feature.properties.i);
+                            return {{ this.label|tojson }} + ": " + (v === null ? "no data" : v);
+                        });
+                    }
+                });
+                var TimeLayer = L.TimeDimension.Layer.extend({
+                    onAdd: function (m) {
+                        L.TimeDimension.Layer.prototype.onAdd.call(this, m);
+                        m.addLayer(geometries);
+                    },
+                    _update: function () {
+                        if (this._map && data) { geometries.setStyle(style); }
+                    }
+                });
+                var layer = new TimeLayer(geometries, {timeDimension: map.timeDimension});
+                layer.setData = function (value) {
+                    data = value;
+                    geometries.clearLayers();
+                    geometries.addData(data.geometries);
+                    var times = data.times.map(function (s) { return s * 1000; });
+                    map.timeDimension.setAvailableTimes(times, "replace");
+                    if (map.timeDimension.getCurrentTimeIndex() < 0) {
+                        map.timeDimension.setCurrentTime(times[0]);
+                    }
+                    layer._update();
+                };
+                data = {{ this.data_json }};
+                if (data) { layer.setData(data); }
+                return layer;
+            })();
+            {% if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {% endif %}
+        {% endmacro %}
+        """)
+
+    default_js = TimestampedGeoJson.default_js
+    default_css = TimestampedGeoJson.default_css
+
+    def __init__(self, data: str, label: str = "value", period: str = "P1D",
+                 date_options: str = "YYYY-MM-DD", color: str = "black", weight: float = 1,
+                 fill_opacity: float = 0.7, transition_time: int = 200, loop: bool = False,
+                 auto_play: bool = True, min_speed: float = 0.1, max_speed: float = 10,
+                 loop_button: bool = False, time_slider_drag_update: bool = False,
+                 speed_slider: bool = True, name: Optional[str] = None, overlay: bool = True,
+                 control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "TimeChoroplethLayer"
+        self.data_json = data
+        self.label = label
+        self.period = period
+        self.date_options = date_options
+        self.color = color
+        self.weight = weight
+        self.fill_opacity = fill_opacity
+        self.options = parse_options(
+            position="bottomleft",
+            min_speed=min_speed,
+            max_speed=max_speed,
+            auto_play=auto_play,
+            loop_button=loop_button,
+            time_slider_drag_update=time_slider_drag_update,
+            speed_slider=speed_slider,
+            player_options={"transitionTime": int(transition_time), "loop": loop, "startOver": True},
+        )
+
+class TimeSliderOverlay(Layer):
+    """
+    Raster sheets (one per year or period) shown one at a time with a slider.
+
+    Sheets are referenced by URL, XYZ tile directories or image files next to the page; only
+    the sheet on the slider is on the map. Once it has loaded, the tiles in view (or the
+    image) of the previous and next sheets are requested so the browser has them cached when
+    the slider moves.
+    """
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var map = {{ this._parent.get_name() }};
+                var sheets = {{ this.sheets|tojson }};
+                var group = L.layerGroup();
+                var current = null, index = 0, label = null;
+                function sheetLayer(sheet) {
+                    var options = {opacity: {{ this.opacity }}, zIndex: {{ this.z_index }}};
+                    if (sheet.type === "image") {
+                        return L.imageOverlay(sheet.url, sheet.bounds, options);
+                    }
+                    return L.tileLayer(sheet.url, L.extend(options, {
+                        bounds: sheet.bounds, minNativeZoom: sheet.min_zoom,
+                        maxNativeZoom: sheet.max_zoom, maxZoom: {{ this.max_zoom }}}));
+                }
+                function tileUrls(sheet) {
+                    var bounds = L.latLngBounds(sheet.bounds);
+                    var view = map.getBounds();
+                    if (!view.intersects(bounds)) { return []; }
+                    var zoom = Math.min(Math.max(Math.round(map.getZoom()), sheet.min_zoom), sheet.max_zoom);
+                    var south = Math.max(view.getSouth(), bounds.getSouth()), north = Math.min(view.getNorth(), bounds.getNorth());
+                    var west = Math.max(view.getWest(), bounds.getWest()), east = Math.min(view.getEast(), bounds.getEast());
+                    var nw = map.project([north, west], zoom).divideBy(256).floor();
+                    var se = map.project([south, east], zoom).divideBy(256).floor();
+                    var urls = [];
+                    for (var x = nw.x; x <= se.x; x++) {
+                        for (var y = nw.y; y <= se.y && urls.length < {{ this.prefetch_tiles }}; y++) {
+                            urls.push(L.Util.template(sheet.url, {z: zoom, x: x, y: y}));
+                        }
+                    }
+                    return urls;
+                }
+                function prefetch(i) {
+                    if (i < 0 || i >= sheets.length) { return; }
+                    var urls = sheets[i].type === "image" ? [sheets[i].url] : tileUrls(sheets[i]);
+                    urls.forEach(function (url) { new Image().src = url; });
+                }
+                function prefetchNeighbours() {
+                    prefetch(index - 1);
+                    prefetch(index + 1);
+                }
+                function show(i) {
+                    index = i;
+                    if (current) { group.removeLayer(current); }
+                    current = sheetLayer(sheets[i]);
+                    current.once("load", prefetchNeighbours);
+                    group.addLayer(current);
+                    if (label) { label.innerHTML = sheets[i].label; }
+                }
+                var Slider = L.Control.extend({
+                    onAdd: function () {
+                        var div = L.DomUtil.create("div", "leaflet-bar");
+                        div.style.cssText = "background: white; padding: 6px 10px; width: 260px;";
+                        div.innerHTML = {{ this.title|tojson }} + ": <b></b>"
+                            + "<input type='range' min='0' step='1' style='width: 100%;'>";
+                        label = div.querySelector("b");
+                        label.innerHTML = sheets[index].label;
+                        var input = div.querySelector("input");
+                        input.max = sheets.length - 1;
+                        input.value = index;
+                        input.oninput = function () { show(+this.value); };
+                        L.DomEvent.disableClickPropagation(div);
+                        return div;
+                    }
+                });
+                var slider = new Slider({position: {{ this.position|tojson }}});
+                function moved() { if (current) { prefetchNeighbours(); } }
+                group.on("add", function () {
+                    slider.addTo(map);
+                    map.on("moveend", moved);
+                    show(index);
+                });
+                group.on("remove", function () {
+                    slider.remove();
+                    map.off("moveend", moved);
+                    group.clearLayers();
+                    current = null;
+                });
+                return group;
+            })();
+            {% if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {% endif %}
+        {% endmacro %}
+        """)
+
+    def __init__(self, sheets: List[dict], title: str = "Year", opacity: float = 0.6, z_index: int = 1,
+                 max_zoom: int = 18, prefetch_tiles: int = 64, position: str = "bottomleft",
+                 name: Optional[str] = None, overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "TimeSliderOverlay"
+        self.sheets = sheets
+        self.title = title
+        self.opacity = opacity
+        self.z_index = z_index
+        self.max_zoom = max_zoom
+        self.prefetch_tiles = prefetch_tiles
+        self.position = position
+
+def _per_point(value, dataset: gpd.GeoDataFrame) -> np.ndarray:
+    """Column name, array-like or scalar as one value per point."""
+    if isinstance(value, str) and value in dataset.columns:
+        return dataset[value].to_numpy()
+    if np.ndim(value) == 0:
+        return np.full(len(dataset), value, dtype=object)
+    return np.asarray(value)
+
+def points_to_geojson(dataset: gpd.GeoDataFrame, properties: dict, precision: int = 6) -> str:
+    """
+    Serialise points with the given per-point properties as a compact FeatureCollection string,
+    safe to embed in a <script> tag.
+    """
+    lon = np.round(dataset.geometry.x.to_numpy(), precision).tolist()
+    lat = np.round(dataset.geometry.y.to_numpy(), precision).tolist()
+    # Through pandas like add_cluster_layer: missing values become null, dates ISO strings
+    columns = {key: json.loads(pd.Series(values).to_json(orient="values", date_format="iso"))
+               for key, values in properties.items()}
+    keys = list(columns)
+    features = [
+        {"type": "Feature",
+         "geometry": {"type": "Point", "coordinates": [x, y]},
+         "properties": dict(zip(keys, values))}
+        for x, y, *values in zip(lon, lat, *columns.values())
+    ]
+    text = json.dumps({"type": "FeatureCollection", "features": features}, separators=(",", ":"))
+    return text.replace("</", "<\\/")
+
+def add_point_layer(basemap, dataset: gpd.GeoDataFrame,
+                    radius: Union[str, float, np.ndarray] = 4,
+                    color: Union[str, np.ndarray] = "blue",
+                    popup_fields: Optional[List[str]] = None,
+                    popup_aliases: Optional[List[str]] = None,
+                    tooltip_fields: Optional[List[str]] = None,
+                    tooltip_aliases: Optional[List[str]] = None,
+                    name: Optional[str] = None,
+                    fill_opacity: float = 0.6,
+                    precision: int = 6) -> PointLayer:
+    """
+    Add a point GeoDataFrame to a folium map as a single canvas-rendered layer.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map (or feature group) to add the layer to.
+    dataset : gpd.GeoDataFrame
+        Point geometries, reprojected to EPSG:4326 if needed.
+    radius : str | float | np.ndarray, optional
+        Marker radius in pixels, a column name, one value per point or a scalar.
+    color : str | np.ndarray, optional
+        Marker colour, a column name, one value per point or a single colour.
+    popup_fields : List[str], optional
+        Columns shown in the popup on click.
+    popup_aliases : List[str], optional
+        Labels for popup_fields, by default the field names.
+    tooltip_fields : List[str], optional
+        Columns shown in a tooltip on hover.
+    tooltip_aliases : List[str], optional
+        Labels for tooltip_fields, by default the field names.
+    name : str, optional
+        Layer name in the LayerControl.
+    fill_opacity : float, optional
+        Marker fill opacity.
+    precision : int, optional
+        Decimals kept for coordinates, 6 is about 10 cm.
+
+    Returns
+    -------
+    PointLayer
+        The added layer.
+    """
+    if dataset.crs is not None and dataset.crs.to_epsg() != 4326:
+        dataset = dataset.to_crs(epsg=4326)
+
+    properties = {"_radius": _per_point(radius, dataset), "_color": _per_point(color, dataset)}
+    for field in dict.fromkeys((popup_fields or []) + (tooltip_fields or [])):
+        properties[field] = dataset[field].to_numpy()
+
+    layer = PointLayer(points_to_geojson(dataset, properties, precision), name=name,
+                       popup_fields=popup_fields, popup_aliases=popup_aliases,
+                       tooltip_fields=tooltip_fields, tooltip_aliases=tooltip_aliases,
+                       fill_opacity=fill_opacity)
+    layer.add_to(basemap)
+    logger.debug(f"Point layer {name} with {len(dataset)} points, {len(layer.data_json) / 1e6:.1f} MB")
+    return layer
+
+def add_geojson_layer(basemap, dataset: gpd.GeoDataFrame, encoding: str = "topojson",
+                      max_zoom: float = 10, pixel_tolerance: float = 1.0,
+                      properties: Optional[List[str]] = None,
+                      name: Optional[str] = None, style_function=None, tooltip=None, **kwargs):
+    """
+    Add polygons or lines to a folium map, simplified for the zoom range of the map.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map (or feature group) to add the layer to.
+    dataset : gpd.GeoDataFrame
+        Geometries with the attributes used by style_function and tooltip.
+    encoding : str, optional
+        'topojson' embeds shared arcs with quantized coordinates (smallest page),
+        'geojson' embeds the same simplified geometries as plain GeoJSON,
+        'raw' embeds the full resolution geometries like folium.GeoJson.
+    max_zoom : float, optional
+        Deepest zoom level the layer should look exact at, see topology.to_topojson.
+    pixel_tolerance : float, optional
+        Simplification tolerance in screen pixels at max_zoom.
+    properties : List[str], optional
+        Attribute columns to embed, by default all columns. Ignored for 'raw'.
+    name : str, optional
+        Layer name in the LayerControl.
+    style_function : callable, optional
+        Feature to style dict, as for folium.GeoJson.
+    tooltip : folium.GeoJsonTooltip | str, optional
+        Tooltip shown on hover.
+    **kwargs
+        Passed on to folium.GeoJson / folium.TopoJson (e.g. show, overlay, control).
+
+    Returns
+    -------
+    folium.GeoJson | folium.TopoJson
+        The added layer.
+    """
+    if encoding == "raw":
+        layer = folium.GeoJson(dataset, name=name, style_function=style_function, tooltip=tooltip, **kwargs)
+        return layer.add_to(basemap)
+    if encoding not in ("topojson", "geojson"):
+        raise ValueError(f"Unknown encoding {encoding!r}, use 'topojson', 'geojson' or 'raw'")
+
+    topology = to_topojson(dataset, max_zoom=max_zoom, pixel_tolerance=pixel_tolerance, properties=properties)
+    if encoding == "geojson":
+        layer = folium.GeoJson(topojson_to_geodataframe(topology), name=name,
+                               style_function=style_function, tooltip=tooltip, **kwargs)
+    else:
+        layer = folium.TopoJson(topology, f"objects.{TOPOLOGY_OBJECT}", name=name,
+                                style_function=style_function, tooltip=tooltip, **kwargs)
+    return layer.add_to(basemap)
+
+def add_vector_tile_layer(basemap, url: str, data_layer: str, geometry_type: str = "polygon",
+                          color: str = "blue", color_property: Optional[str] = None,
+                          color_map: Optional[dict] = None, weight: float = 1, opacity: float = 1.0,
+                          fill_opacity: float = 0.5, radius: float = 3, max_data_zoom: int = 12,
+                          name: Optional[str] = None, show: bool = True) -> VectorTileLayer:
+    """
+    Add a vector tile layer written by vector_tiles.export_vector_tiles to a folium map.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map (or feature group) to add the layer to.
+    url : str
+        URL of the .pmtiles file, relative to the HTML page (e.g. the file name when the
+        archive is saved next to the map).
+    data_layer : str
+        Tile layer name given at export.
+    geometry_type : str, optional
+        'polygon', 'line' or 'point'.
+    color : str, optional
+        Colour of all features, or of the features missing from color_map.
+    color_property, color_map : str, dict, optional
+        Colour features by the value of a property, e.g. 'type', {'rail': 'purple', 'road': 'red'}.
+    weight, opacity, fill_opacity, radius : float, optional
+        Outline width, outline opacity, polygon fill opacity and point radius in pixels.
+    max_data_zoom : int, optional
+        Deepest zoom level of the tiles, deeper zooms scale those tiles up.
+    name : str, optional
+        Layer name in the LayerControl.
+    show : bool, optional
+        Whether the layer is shown on opening.
+
+    Returns
+    -------
+    VectorTileLayer
+        The added layer.
+    """
+    def style(value_color):
+        if geometry_type == "polygon":
+            return {"fill": value_color, "opacity": fill_opacity, "stroke": value_color, "width": weight}
+        if geometry_type == "line":
+            return {"color": value_color, "width": weight, "opacity": opacity}
+        if geometry_type == "point":
+            return {"fill": value_color, "radius": radius, "stroke": value_color, "opacity": opacity}
+        raise ValueError(f"Unknown geometry type {geometry_type!r}, use 'polygon', 'line' or 'point'")
+
+    symbolizers = {"polygon": "PolygonSymbolizer", "line": "LineSymbolizer", "point": "CircleSymbolizer"}
+    rules = [{"style": style(color)}] if not color_map else \
+        [{"value": value, "style": style(value_color)} for value, value_color in color_map.items()] + \
+        [{"others": list(color_map), "style": style(color)}]
+    layer = VectorTileLayer(url, data_layer, symbolizers.get(geometry_type), rules,
+                            property=color_property, max_data_zoom=max_data_zoom, name=name, show=show)
+    layer.add_to(basemap)
+    return layer
+
+def add_raster_tile_layer(basemap, tile_dir: Union[str, Path], url: Optional[str] = None,
+                          name: Optional[str] = None, opacity: float = 0.7, max_zoom: int = 18,
+                          show: bool = True, **kwargs) -> folium.TileLayer:
+    """
+    Add an XYZ tile directory written by raster_tiles.export_raster_tiles to a folium map.
+
+    Leaflet only requests the tiles in view at the current zoom and upsamples the deepest
+    level past it, instead of loading the whole image up front like an ImageOverlay.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map (or feature group) to add the layer to.
+    tile_dir : str | Path
+        Tile directory with its metadata.json.
+    url : str, optional
+        URL of the tile directory seen from the HTML page, by default its name (the page saved
+        in the directory holding the tiles).
+    name : str, optional
+        Layer name in the LayerControl.
+    opacity : float, optional
+        Layer opacity.
+    max_zoom : int, optional
+        Deepest zoom the layer is shown at.
+    show : bool, optional
+        Show the layer when the page opens.
+    **kwargs
+        Other folium.TileLayer options, e.g. z_index.
+
+    Returns
+    -------
+    folium.TileLayer
+        The added layer.
+    """
+    metadata = read_tile_metadata(tile_dir)
+    west, south, east, north = metadata["bounds"]
+    layer = folium.TileLayer(
+        tiles=f"{url or Path(tile_dir).name}/{{z}}/{{x}}/{{y}}.{metadata['format']}",
+        attr=name or Path(tile_dir).name,
+        name=name,
+        overlay=True,
+        show=show,
+        opacity=opacity,
+        min_native_zoom=metadata["min_zoom"],
+        max_native_zoom=metadata["max_zoom"],
+        max_zoom=max(max_zoom, metadata["max_zoom"]),
+        bounds=[[south, west], [north, east]],
+        **kwargs,
+    )
+    layer.add_to(basemap)
+    return layer
+
+def tile_sheet(label: str, tile_dir: Union[str, Path], url: Optional[str] = None) -> dict:
+    """TimeSliderOverlay sheet of a tile directory written by raster_tiles.export_raster_tiles."""
+    metadata = read_tile_metadata(tile_dir)
+    west, south, east, north = metadata["bounds"]
+    return {"label": str(label), "type": "tiles", "bounds": [[south, west], [north, east]],
+            "url": f"{url or Path(tile_dir).name}/{{z}}/{{x}}/{{y}}.{metadata['format']}",
+            "min_zoom": metadata["min_zoom"], "max_zoom": metadata["max_zoom"]}
+
+def image_sheet(label: str, url: str, bounds: List[float]) -> dict:
+    """TimeSliderOverlay sheet of an image file, bounds as [min_lon, min_lat, max_lon, max_lat]."""
+    return {"label": str(label), "type": "image", "url": url,
+            "bounds": [[bounds[1], bounds[0]], [bounds[3], bounds[2]]]}
+
+def add_time_slider_overlay(basemap, sheets: List[dict], title: str = "Year", opacity: float = 0.6,
+                            name: Optional[str] = None, **kwargs) -> TimeSliderOverlay:
+    """
+    Add raster sheets to a folium map, shown one at a time with a slider control.
+
+    Only the current sheet is loaded; its neighbours on the slider are prefetched in the
+    background, so the page does not grow with the number of sheets.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map to add the layer to.
+    sheets : List[dict]
+        Sheets in slider order, see tile_sheet and image_sheet.
+    title : str, optional
+        Slider caption, e.g. 'Year'.
+    opacity : float, optional
+        Opacity of the sheets.
+    name : str, optional
+        Layer name in the LayerControl.
+    **kwargs
+        Other TimeSliderOverlay options (z_index, max_zoom, prefetch_tiles, position, show).
+
+    Returns
+    -------
+    TimeSliderOverlay
+        The added layer.
+    """
+    layer = TimeSliderOverlay(sheets, title=title, opacity=opacity, name=name, **kwargs)
+    layer.add_to(basemap)
+    return layer
+
+def cluster_points(lon: np.ndarray, lat: np.ndarray, min_zoom: int = 0, max_zoom: int = 12,
+                   radius: int = 60) -> tuple:
+    """
+    Grid clustering of points for every zoom level, cells of `radius` screen pixels.
+
+    The cells of a zoom level split into four cells at the next level, so the levels form a
+    hierarchy and a point alone in its cell stays alone at every deeper zoom.
+
+    Parameters
+    ----------
+    lon, lat : np.ndarray
+        Point coordinates in degrees.
+    min_zoom, max_zoom : int, optional
+        Zoom levels to cluster, points are all shown unclustered beyond max_zoom.
+    radius : int, optional
+        Cell size in screen pixels.
+
+    Returns
+    -------
+    tuple
+        Dict zoom -> (lon, lat, count) arrays of the clusters holding more than one point and,
+        for every point, the first zoom level it is drawn on its own.
+    """
+    x = (lon + 180) / 360
+    sin_lat = np.clip(np.sin(np.radians(lat)), -0.9999, 0.9999)
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    single_zoom = np.full(len(lon), max_zoom + 1)
+    clusters = {}
+    for z in range(min_zoom, max_zoom + 1):
+        cells = TILE_SIZE * 2 ** z / radius
+        cell_x = np.floor(x * cells).astype(np.int64)
+        cell_y = np.floor(y * cells).astype(np.int64)
+        _, inverse, counts = np.unique(cell_x * (int(cells) + 1) + cell_y, return_inverse=True, return_counts=True)
+        alone = counts[inverse] == 1
+        single_zoom[alone & (single_zoom > z)] = z
+        grouped = counts > 1
+        clusters[z] = (np.bincount(inverse, weights=lon)[grouped] / counts[grouped],
+                       np.bincount(inverse, weights=lat)[grouped] / counts[grouped],
+                       counts[grouped])
+    return clusters, single_zoom
+
+def add_cluster_layer(basemap, dataset: gpd.GeoDataFrame,
+                      popup_fields: Optional[List[str]] = None,
+                      popup_aliases: Optional[List[str]] = None,
+                      tooltip_template: str = "",
+                      icon: Optional[dict] = None,
+                      color: str = "black",
+                      name: Optional[str] = None,
+                      min_zoom: int = 0,
+                      max_zoom: int = 12,
+                      radius: int = 60,
+                      precision: int = 5) -> ClusterLayer:
+    """
+    Add a point GeoDataFrame to a folium map as pre-clustered markers, a lighter MarkerCluster.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map (or feature group) to add the layer to.
+    dataset : gpd.GeoDataFrame
+        Point geometries, reprojected to EPSG:4326 if needed.
+    popup_fields : List[str], optional
+        Columns shown in the popup on click.
+    popup_aliases : List[str], optional
+        Labels for popup_fields, by default the field names.
+    tooltip_template : str, optional
+        Tooltip text with {column} placeholders, e.g. '{name} ({year})'. Empty for no tooltip.
+    icon : dict, optional
+        Font Awesome marker options for single points, e.g. {'icon': 'meteor', 'prefix': 'fa',
+        'markerColor': 'black'}. Circle markers of `color` without it.
+    color : str, optional
+        Circle marker colour when no icon is given.
+    name : str, optional
+        Layer name in the LayerControl.
+    min_zoom, max_zoom, radius : int, optional
+        Clustering zoom range and cell size in pixels, see cluster_points.
+    precision : int, optional
+        Decimals kept for coordinates.
+
+    Returns
+    -------
+    ClusterLayer
+        The added layer.
+    """
+    if dataset.crs is not None and dataset.crs.to_epsg() != 4326:
+        dataset = dataset.to_crs(epsg=4326)
+    lon, lat = dataset.geometry.x.to_numpy(), dataset.geometry.y.to_numpy()
+    clusters, single_zoom = cluster_points(lon, lat, min_zoom, max_zoom, radius)
+
+    fields = list(dict.fromkeys((popup_fields or []) + re.findall(r"\{(\w+)\}", tooltip_template)))
+    data = {
+        "min_zoom": min_zoom,
+        "clusters": {z: {"lon": np.round(c_lon, precision).tolist(), "lat": np.round(c_lat, precision).tolist(),
+                         "count": counts.tolist()} for z, (c_lon, c_lat, counts) in clusters.items()},
+        "points": {"lon": np.round(lon, precision).tolist(), "lat": np.round(lat, precision).tolist(),
+                   "single": single_zoom.tolist()},
+        # column -> values in point order
+        "props": {field: json.loads(dataset[field].to_json(orient="values", date_format="iso"))
+                  for field in fields},
+    }
+    text = json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
+
+    layer = ClusterLayer(text, name=name, popup_fields=popup_fields, popup_aliases=popup_aliases,
+                         tooltip_template=tooltip_template, icon=icon, color=color)
+    layer.add_to(basemap)
+    logger.debug(f"Cluster layer {name} with {len(dataset)} points, {len(text) / 1e6:.1f} MB")
+    return layer
+
+def add_time_choropleth(basemap, dataset: gpd.GeoDataFrame, time_column: str, value_column: str,
+                        colormap, key_column: Optional[str] = None, label: Optional[str] = None,
+                        ramp_steps: int = 64, decimals: int = 1, precision: int = 5,
+                        name: Optional[str] = None, **kwargs) -> TimeChoroplethLayer:
+    """
+    Add a long table of (geometry, time, value) rows to a folium map as a time-slider choropleth.
+
+    Each distinct geometry is written once; values are pivoted to a time x geometry table and
+    coloured in the browser from a ramp sampled from `colormap`, replacing a TimestampedGeoJson
+    with one feature per row.
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        Map to add the layer to.
+    dataset : gpd.GeoDataFrame
+        One row per geometry and time step, reprojected to EPSG:4326 if needed.
+    time_column : str
+        Datetime column (or parseable by pd.to_datetime).
+    value_column : str
+        Numeric column to colour by. Steps without a value for a geometry leave it unfilled.
+    colormap : branca.colormap.ColorMap
+        Colour scale, also the legend; its vmin / vmax bound the ramp.
+    key_column : str, optional
+        Column identifying the geometry of a row, by default the geometry itself (WKB).
+    label : str, optional
+        Popup label of the value, by default value_column.
+    ramp_steps : int, optional
+        Colours sampled from the colormap.
+    decimals : int, optional
+        Decimals kept for values.
+    precision : int, optional
+        Decimals kept for coordinates.
+    name : str, optional
+        Layer name in the LayerControl.
+    **kwargs
+        Slider options of TimeChoroplethLayer (period, date_options, auto_play, loop, ...).
+
+    Returns
+    -------
+    TimeChoroplethLayer
+        The added layer.
+    """
+    if dataset.crs is not None and dataset.crs.to_epsg() != 4326:
+        dataset = dataset.to_crs(epsg=4326)
+    keys = dataset[key_column] if key_column else dataset.geometry.to_wkb()
+    codes, unique_keys = pd.factorize(keys)
+    first_rows = pd.Series(np.arange(len(dataset))).groupby(codes).first().to_numpy()
+    geometries = gpd.GeoDataFrame(
+        {"i": np.arange(len(unique_keys))},
+        geometry=shapely.set_precision(dataset.geometry.iloc[first_rows].to_numpy(), 10 ** -precision),
+        crs="EPSG:4326")
+
+    times = pd.to_datetime(dataset[time_column])
+    table = (pd.DataFrame({"time": times.to_numpy(), "key": codes, "value": dataset[value_column].to_numpy()})
+             .pivot_table(index="time", columns="key", values="value", aggfunc="mean")
+             .reindex(columns=range(len(unique_keys))).round(decimals))
+    values = table.to_numpy(dtype=float).ravel()
+
+    data = {
+        "geometries": json.loads(geometries.to_json(drop_id=True)),
+        # epoch seconds of the time steps
+        "times": (table.index.to_numpy(dtype="datetime64[s]").astype(np.int64)).tolist(),
+        "count": len(unique_keys),
+        # values[t * count + i] is geometry i at time step t, null where missing
+        "values": [None if np.isnan(v) else (int(v) if decimals <= 0 else float(v)) for v in values],
+        "vmin": float(colormap.vmin),
+        "vmax": float(colormap.vmax),
+        "ramp": [colormap.rgb_hex_str(colormap.vmin + (colormap.vmax - colormap.vmin) * k / (ramp_steps - 1))
+                 for k in range(ramp_steps)],
+    }
+    text = json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
+
+    layer = TimeChoroplethLayer(text, label=label or value_column, name=name, **kwargs)
+    layer.add_to(basemap)
+    logger.debug(f"Time choropleth {name} with {len(unique_keys)} geometries x {len(table)} steps, "
+                 f"{len(text) / 1e6:.2f} MB")
+    return layer
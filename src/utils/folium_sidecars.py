@@ -0,0 +1,195 @@
+import re
+import gzip
+import json
+import base64
+import hashlib
+import folium
+
+from typing import Optional, Union
+from pathlib import Path
+from jinja2.utils import htmlsafe_json_dumps
+from folium.plugins import TimestampedGeoJson
+
+from src.utils.logger import get_logger
+from src.utils.config import FOLIUM_SIDECARS
+from src.utils.folium_layers import ClusterLayer, PointLayer, TimeChoroplethLayer
+
+# brotli is optional, gzip sidecars work without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = get_logger(__name__)
+
+
+SIDECAR_DIR_SUFFIX = "_files"
+# Sidecars are named '<layer>.<hash>.<ext>', the hash keeps unchanged layers cached by the browser
+HASH_LENGTH = 12
+# fetch() a sidecar once its layer is on the map, .gz files are inflated in the browser unless the
+# server already sent them with a Content-Encoding; .br files need a server that does so
+_LOADER_JS = """
+function loadSidecar(layer, map, url, lazy, onLoad) {
+    var loaded = false;
+    function load() {
+        if (loaded) { return; }
+        loaded = true;
+        fetch(url).then(function (response) {
+            if (!response.ok) { throw new Error(url + ": HTTP " + response.status); }
+            var encoding = response.headers.get("Content-Encoding") || "";
+            if (!/\\.gz$/.test(url) || /gzip/.test(encoding)) { return response.json(); }
+            return new Response(response.body.pipeThrough(new DecompressionStream("gzip"))).json();
+        }).then(onLoad).catch(function (error) {
+            loaded = false;
+            console.error("Could not load layer data", error);
+        });
+    }
+    if (!lazy || map.hasLayer(layer)) { load(); } else { layer.on("add", load); }
+}
+"""
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:40] or "layer"
+
+def _compress(data: bytes, compression: str) -> tuple:
+    if compression == "br":
+        if brotli is None:
+            raise ImportError("brotli sidecars need the 'brotli' package, use compression='gzip'")
+        return brotli.compress(data, quality=9), ".json.br"
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0), ".json.gz"
+    raise ValueError(f"Unknown compression {compression!r}, use 'gzip' or 'br'")
+
+def _layer_data(element) -> Optional[dict]:
+    """
+    How an element embeds its data: the exact text in the page, what replaces it, the sidecar
+    payload and the script run once the payload is loaded (`layer` and `data` in scope).
+    None for elements kept inline.
+    """
+    if isinstance(element, folium.GeoJson) and element.embed:
+        restyle = "" if element.style else "layer.setStyle(function (f) { return f.properties.style; });"
+        return {"inline": str(htmlsafe_json_dumps(element.data, sort_keys=True)),
+                "placeholder": '{"features": [], "type": "FeatureCollection"}',
+                "payload": json.dumps(element.data, separators=(",", ":")),
+                "on_load": "layer.addData(data);" + restyle, "lazy": True}
+    if isinstance(element, folium.TopoJson) and element.embed:
+        path = element._safe_object_path
+        return {"inline": str(htmlsafe_json_dumps(element.data, sort_keys=True)),
+                "placeholder": json.dumps({"type": "Topology", "arcs": [], "objects": {
+                    element.object_path.split(".")[-1]: {"type": "GeometryCollection", "geometries": []}}}),
+                "payload": json.dumps(element.data, separators=(",", ":")),
+                "on_load": f"layer.addData(topojson.feature(data, data{path}));"
+                           "layer.setStyle(function (f) { return f.properties.style; });", "lazy": True}
+    if isinstance(element, PointLayer):
+        return {"inline": element.data_json, "placeholder": "null",
+                "payload": element.data_json,
+                "on_load": "layer.addData(data);", "lazy": True}
+    if isinstance(element, (ClusterLayer, TimeChoroplethLayer)):
+        return {"inline": element.data_json, "placeholder": "null",
+                "payload": element.data_json,
+                "on_load": "layer.setData(data);", "lazy": True}
+    if isinstance(element, TimestampedGeoJson):
+        # not in the LayerControl, loaded right away; the time dimension reads the feature times
+        # once its base layer fires 'ready'
+        return {"inline": element.data, "placeholder": "null", "payload": element.data,
+                "on_load": "layer._baseLayer.addData(data); layer._baseLayer.fire('ready');", "lazy": False}
+    return None
+
+def _walk(element):
+    """All elements below a map, layers can sit in feature groups."""
+    for child in list(element._children.values()):
+        yield child
+        yield from _walk(child)
+
+def save_map(basemap: folium.Map, html_path: Union[str, Path], sidecars: bool = FOLIUM_SIDECARS,
+             compression: str = "gzip") -> Path:
+    """
+    Save a folium map, optionally with the layer data in external sidecar files.
+
+    With sidecars, the data of every GeoJson, TopoJson, PointLayer, ClusterLayer,
+    TimeChoroplethLayer and TimestampedGeoJson layer is written compressed to '<html stem>_files/<layer>.<hash>.json.gz'
+    and fetched by the page when the layer is switched on in the LayerControl. ImageOverlay images are written there as image
+    files, which Leaflet only loads once the overlay is shown. Sidecars whose content did not
+    change are not rewritten (same hash, same name), so the browser keeps them cached; sidecars
+    no longer used by the map are deleted.
+
+    Pages with sidecars cannot be opened from the file system, serve the folder over HTTP
+    (python -m src.utils.preview_server).
+
+    Parameters
+    ----------
+    basemap : folium.Map
+        The map to save.
+    html_path : str | Path
+        Output HTML file.
+    sidecars : bool, optional
+        Write layer data to sidecar files, by default the FOLIUM_SIDECARS setting. False is the
+        same as basemap.save.
+    compression : str, optional
+        'gzip' or 'br' (brotli, needs the brotli package and a server sending
+        'Content-Encoding: br' for .br files).
+
+    Returns
+    -------
+    Path
+        The HTML file.
+    """
+    html_path = Path(html_path)
+    if not sidecars:
+        basemap.save(str(html_path))
+        return html_path
+
+    html = basemap.get_root().render()
+    sidecar_dir = html_path.with_name(f"{html_path.stem}{SIDECAR_DIR_SUFFIX}")
+    sidecar_dir.mkdir(parents=True, exist_ok=True)
+    used, loaders, written = set(), [], 0
+
+    def write(name: str, content: bytes, suffix: str) -> str:
+        nonlocal written
+        filename = f"{_slug(name)}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{suffix}"
+        target = sidecar_dir / filename
+        if not target.exists():
+            target.write_bytes(content)
+            written += 1
+        used.add(filename)
+        return f"{sidecar_dir.name}/{filename}"
+
+    for element in _walk(basemap):
+        name = getattr(element, "layer_name", None) or element._name
+        if isinstance(element, folium.raster_layers.ImageOverlay):
+            url = element.url
+            match = re.match(r"data:image/(\w+);base64,", url) if isinstance(url, str) else None
+            inline = str(htmlsafe_json_dumps(url))
+            if match and inline in html:
+                src = write(name, base64.b64decode(url[match.end():]), f".{match.group(1)}")
+                html = html.replace(inline, json.dumps(src), 1)
+            continue
+
+        layer = _layer_data(element)
+        if layer is None:
+            continue
+        if layer["inline"] not in html:
+            logger.warning(f"Data of layer '{name}' not found in the page, kept inline")
+            continue
+        content, suffix = _compress(layer["payload"].encode("utf-8"), compression)
+        src = write(name, content, suffix)
+        html = html.replace(layer["inline"], layer["placeholder"], 1)
+        loaders.append(f"loadSidecar({element.get_name()}, {basemap.get_name()}, {json.dumps(src)}, "
+                       f"{json.dumps(layer['lazy'])}, function (data) {{ var layer = {element.get_name()}; "
+                       f"{layer['on_load']} }});")
+
+    if loaders:
+        script = "<script>" + _LOADER_JS + "\n".join(loaders) + "\n</script>\n"
+        index = html.rfind("</html>")
+        html = html[:index] + script + html[index:] if index >= 0 else html + script
+
+    for stale in sidecar_dir.iterdir():
+        if stale.is_file() and stale.name not in used:
+            stale.unlink()
+    if not used:
+        sidecar_dir.rmdir()
+
+    html_path.write_text(html, encoding="utf-8")
+    logger.info(f"Saved {html_path} ({len(html) / 1e3:.0f} kB) with {len(used)} sidecars, {written} rewritten")
+    return html_path
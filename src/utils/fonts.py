@@ -0,0 +1,104 @@
+import os
+import json
+import hashlib
+import functools
+import requests
+
+from pathlib import Path
+from matplotlib import font_manager
+from matplotlib.font_manager import FontProperties
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+FONT_CACHE_DIR = Path(".cache/fonts")
+FONT_INDEX = "index.json"
+# Fonts used by the day maps, pass the name to load_font instead of the URL
+FONTS = {
+    "MarkaziText-Regular": "https://raw.githubusercontent.com/BornaIz/markazitext/master/fonts/ttf/MarkaziText-Regular.ttf",
+    "DynaPuff-Regular": "https://raw.githubusercontent.com/googlefonts/dynapuff/main/fonts/ttf/DynaPuff-Regular.ttf",
+    "DynaPuff-Bold": "https://raw.githubusercontent.com/googlefonts/dynapuff/main/fonts/ttf/DynaPuff-Bold.ttf",
+    "Urbanist-Medium": "https://raw.githubusercontent.com/coreyhu/Urbanist/main/fonts/ttf/Urbanist-Medium.ttf",
+    "Urbanist-ExtraBold": "https://raw.githubusercontent.com/coreyhu/Urbanist/main/fonts/ttf/Urbanist-ExtraBold.ttf",
+}
+
+
+def _read_index(cache_dir: Path) -> dict:
+    index_path = cache_dir / FONT_INDEX
+    if not index_path.exists():
+        return {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def font_path(font: str, cache_dir: Path = FONT_CACHE_DIR) -> Path:
+    """
+    Local copy of a font, downloaded on first use.
+
+    Font files are stored under their content hash ('<sha256>.ttf') and an index maps each
+    URL to its hash, so the same font reached through different URLs is kept once.
+
+    Parameters
+    ----------
+    font : str
+        Name from FONTS (e.g. 'DynaPuff-Bold') or URL of a .ttf/.otf file.
+    cache_dir : Path, optional
+        Folder of the font cache. Copy it to run without network access.
+
+    Returns
+    -------
+    Path
+        Path of the cached font file.
+    """
+    url = FONTS.get(font, font)
+    cache_dir = Path(cache_dir)
+    suffix = Path(url.split("?")[0]).suffix or ".ttf"
+
+    digest = _read_index(cache_dir).get(url)
+    if digest:
+        cached = cache_dir / f"{digest}{suffix}"
+        if cached.exists():
+            return cached
+
+    logger.info(f"Downloading font {url}")
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    digest = hashlib.sha256(response.content).hexdigest()
+    cached = cache_dir / f"{digest}{suffix}"
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = cached.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(response.content)
+    os.replace(tmp_path, cached)
+
+    # Re-read right before writing, another day may have added fonts meanwhile
+    index = _read_index(cache_dir)
+    index[url] = digest
+    tmp_index = cache_dir / f"{FONT_INDEX}.{os.getpid()}.tmp"
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_index, cache_dir / FONT_INDEX)
+    return cached
+
+@functools.lru_cache(maxsize=None)
+def load_font(font: str) -> FontProperties:
+    """
+    Drop-in replacement for pyfonts.load_font backed by the local font cache.
+
+    The font is registered with matplotlib's font manager once per process, so it can also be
+    used by family name (e.g. rcParams['font.family']).
+
+    Parameters
+    ----------
+    font : str
+        Name from FONTS (e.g. 'DynaPuff-Bold') or URL of a .ttf/.otf file.
+
+    Returns
+    -------
+    FontProperties
+        Font properties to pass as `font=`/`fontproperties=` to matplotlib text.
+    """
+    path = font_path(font)
+    font_manager.fontManager.addfont(str(path))
+    return FontProperties(fname=str(path))
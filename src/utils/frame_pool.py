@@ -0,0 +1,135 @@
+import os
+import sys
+import importlib
+import importlib.util
+import multiprocessing as mp
+import numpy as np
+
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils.logger import get_logger
+from src.utils.config import FRAME_JOBS
+
+logger = get_logger(__name__)
+
+
+# Below this many frames starting the workers costs more than it saves
+MIN_PARALLEL_FRAMES = 4
+# Frames rendered ahead of the one being written, per worker
+FRAMES_AHEAD = 2
+
+# Worker state: the draw function and what its setup returned (the warm figure)
+_worker = {}
+
+
+def render_frame(fig) -> np.ndarray:
+    """Draw a figure and return its pixels as an RGB array."""
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+
+def frame_jobs(jobs: Optional[int] = None) -> int:
+    """Number of frame workers, `jobs` or FRAME_JOBS from the environment, 0 meaning all CPUs."""
+    jobs = FRAME_JOBS if jobs is None else jobs
+    return max(1, jobs or os.cpu_count() or 1)
+
+def _reference(func: Callable) -> Tuple[str, Optional[str], str]:
+    """
+    Module, source file and name of a module level function, sent to the workers instead of the function.
+
+    Day scripts run as '__main__' (directly or through runpy in the day runner), their functions
+    cannot be pickled by reference, so the workers load them again from the file.
+    """
+    module = sys.modules.get(func.__module__)
+    if "<locals>" in func.__qualname__:
+        raise ValueError(f"{func.__qualname__} must be defined at module level to be used by the frame workers")
+    return func.__module__, getattr(module, "__file__", None), func.__qualname__
+
+def _resolve(reference: Tuple[str, Optional[str], str]) -> Callable:
+    module_name, path, qualname = reference
+    if module_name == "__main__" and path:
+        # Load the script under another name, its `if __name__ == "__main__"` block stays idle
+        spec = importlib.util.spec_from_file_location("__frame_source__", path)
+        module = sys.modules.get(spec.name)
+        if module is None:
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    func = module
+    for name in qualname.split("."):
+        func = getattr(func, name)
+    return func
+
+def _init_worker(setup_ref, draw_ref, setup_args: tuple):
+    import matplotlib
+    matplotlib.use("Agg")
+    _worker["draw"] = _resolve(draw_ref)
+    _worker["state"] = _resolve(setup_ref)(*setup_args)
+
+def _draw(frame) -> Any:
+    return _worker["draw"](_worker["state"], frame)
+
+def render_frames(setup: Callable, draw: Callable, frames: Sequence, setup_args: tuple = (),
+                  jobs: Optional[int] = None) -> Iterator[Any]:
+    """
+    Render animation frames on a pool of processes and yield them in order.
+
+    Every worker calls `setup(*setup_args)` once to build its figure (axes, static layers,
+    colorbar, ...) and then `draw(state, frame)` for each frame it is given, so a frame only pays
+    for what changes. Frames are handed out as workers free up and yielded in their original
+    order, with at most a couple of frames per worker waiting in memory, so the caller can
+    write them straight to the GIF/MP4 writer. Workers use the Agg backend and the spawn start
+    method, like the day runner. With one job (or very few frames) everything runs in this process
+    and the figures opened by setup are closed once the frames are rendered.
+
+    Parameters
+    ----------
+    setup : Callable
+        Module level function building the per-worker state, usually (fig, artists...).
+    draw : Callable
+        Module level function `draw(state, frame)` returning the rendered frame, e.g. render_frame(fig).
+    frames : Sequence
+        One picklable item per frame (year, month index, (year, values)...).
+    setup_args : tuple, optional
+        Arguments of setup, pickled once per worker.
+    jobs : int, optional
+        Number of worker processes, by default FRAME_JOBS (0 = number of CPUs).
+
+    Yields
+    ------
+    Any
+        What draw returned, one per frame in the order of `frames`.
+    """
+    frames = list(frames)
+    jobs = min(frame_jobs(jobs), len(frames))
+    if jobs <= 1 or len(frames) < MIN_PARALLEL_FRAMES:
+        import matplotlib.pyplot as plt
+        figures = set(plt.get_fignums())
+        try:
+            state = setup(*setup_args)
+            for frame in frames:
+                yield draw(state, frame)
+        finally:
+            # The workers' figures go away with their process, close the ones setup opened here
+            for number in set(plt.get_fignums()) - figures:
+                plt.close(number)
+        return
+
+    logger.info(f"Rendering {len(frames)} frames on {jobs} processes")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context("spawn"), initializer=_init_worker,
+                             initargs=(_reference(setup), _reference(draw), setup_args)) as pool:
+        pending = deque()
+        try:
+            for frame in frames:
+                pending.append(pool.submit(_draw, frame))
+                if len(pending) >= jobs * FRAMES_AHEAD:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Stopped early (error or closed generator), do not render the frames left
+            for future in pending:
+                future.cancel()
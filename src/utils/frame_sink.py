@@ -0,0 +1,214 @@
+import os
+import shutil
+import subprocess
+import numpy as np
+
+from typing import Optional, Union
+from pathlib import Path
+from PIL import Image, GifImagePlugin
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import imageio_ffmpeg
+except ImportError:  # optional, falls back to an ffmpeg on the PATH
+    imageio_ffmpeg = None
+
+
+# Mean colour error (0-255, per channel) up to which a frame reuses the running GIF palette
+PALETTE_TOLERANCE = 2.0
+# Pixel stride used to measure that error, a sample is enough and keeps it cheap on large frames
+PALETTE_SAMPLE_STEP = 4
+PALETTE_SIZE = 256
+
+
+def ffmpeg_executable() -> str:
+    """Path of the ffmpeg binary, the one bundled with imageio-ffmpeg or else the one on the PATH."""
+    if imageio_ffmpeg is not None:
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    executable = shutil.which("ffmpeg")
+    if executable is None:
+        raise RuntimeError("ffmpeg not found, install imageio-ffmpeg or put ffmpeg on the PATH")
+    return executable
+
+def _palette_image(colors: list) -> Image.Image:
+    """P image carrying a palette of RGB tuples, as expected by Image.quantize(palette=...)."""
+    palette = Image.new("P", (1, 1))
+    palette.putpalette([channel for color in colors for channel in color])
+    return palette
+
+class GifPalette:
+    """
+    GIF palette built up frame after frame.
+
+    Frames with few colours (flat choropleths) are mapped exactly, their new colours are added to
+    the palette while it has room. Other frames reuse the palette as long as it represents them
+    within PALETTE_TOLERANCE, otherwise a new adaptive palette is computed from the frame. Colours
+    stay stable across frames (no flicker) and most frames share the palette of the GIF header.
+    """
+    def __init__(self):
+        self.colors = []
+        self.image = None
+
+    def quantize(self, image: Image.Image) -> Image.Image:
+        """Frame as a P image on the current palette, updated when needed."""
+        frame_colors = image.getcolors(PALETTE_SIZE)
+        if frame_colors is not None:
+            known = set(self.colors)
+            new = [color for _, color in frame_colors if color not in known]
+            if len(self.colors) + len(new) <= PALETTE_SIZE:
+                if new:
+                    self.colors = self.colors + new
+                    self.image = _palette_image(self.colors)
+                return image.quantize(palette=self.image, dither=Image.Dither.NONE)
+
+        if self.image is not None:
+            quantized = image.quantize(palette=self.image, dither=Image.Dither.NONE)
+            step = PALETTE_SAMPLE_STEP
+            sample = np.asarray(image)[::step, ::step].astype(np.int16)
+            error = np.abs(np.asarray(quantized.convert("RGB"))[::step, ::step] - sample).mean()
+            if error <= PALETTE_TOLERANCE:
+                return quantized
+        quantized = image.quantize(PALETTE_SIZE, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        palette = quantized.getpalette()[:3 * PALETTE_SIZE]
+        self.colors = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+        self.image = _palette_image(self.colors)
+        return quantized
+
+class FrameSink:
+    """
+    Animation writer encoding every frame as soon as it arrives, to a GIF and/or an MP4.
+
+    Frames are not kept: the GIF is written frame by frame with an incrementally built palette
+    (GifPalette) and the MP4 is fed to ffmpeg through a pipe, so memory holds about one frame
+    however long the animation. Frames of another size than the first are padded / cropped to it.
+    Outputs are written next to their final path and moved in place when the sink is closed
+    without error.
+
+    Parameters
+    ----------
+    gif_path : str | Path, optional
+        GIF to write.
+    mp4_path : str | Path, optional
+        MP4 (H.264) to write, needs ffmpeg.
+    duration : float, optional
+        Seconds each frame is shown in the GIF.
+    loop : int, optional
+        GIF loop count, 0 loops forever.
+    fps : float, optional
+        Frame rate of the MP4, by default 1 / duration.
+    crf : int, optional
+        H.264 quality, lower is better.
+    background : color, optional
+        Fill of the padding added to frames smaller than the first one.
+
+    Examples
+    --------
+    >>> with FrameSink(gif_path="out.gif", mp4_path="out.mp4", duration=0.5) as sink:
+    ...     for frame in render_frames(setup, draw, years):
+    ...         sink.write(frame)
+    """
+    def __init__(self, gif_path: Optional[Union[str, Path]] = None, mp4_path: Optional[Union[str, Path]] = None,
+                 duration: float = 1.0, loop: int = 0, fps: Optional[float] = None, crf: int = 23,
+                 background="white"):
+        if gif_path is None and mp4_path is None:
+            raise ValueError("FrameSink needs a gif_path and/or an mp4_path")
+        self.gif_path = Path(gif_path) if gif_path is not None else None
+        self.mp4_path = Path(mp4_path) if mp4_path is not None else None
+        self.duration = duration
+        self.loop = loop
+        self.fps = fps or 1.0 / duration
+        self.crf = crf
+        self.background = background
+        self.size = None
+        self.count = 0
+        self._gif = None
+        self._gif_palette = None
+        self._palette = GifPalette()
+        self._ffmpeg = None
+
+    def __enter__(self) -> "FrameSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(discard=exc_type is not None)
+
+    @staticmethod
+    def _partial(path: Path) -> Path:
+        return path.with_name(f"{path.name}.part")
+
+    def _fit(self, frame: Union[np.ndarray, Image.Image]) -> Image.Image:
+        image = frame if isinstance(frame, Image.Image) else Image.fromarray(np.asarray(frame))
+        image = image.convert("RGB")
+        if self.size is None:
+            self.size = image.size
+        elif image.size != self.size:
+            canvas = Image.new("RGB", self.size, self.background)
+            canvas.paste(image, (0, 0))
+            image = canvas
+        return image
+
+    def _open_mp4(self):
+        width, height = self.size
+        self.mp4_path.parent.mkdir(parents=True, exist_ok=True)
+        command = [
+            ffmpeg_executable(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", f"{self.fps}", "-i", "-",
+            # H.264 with yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", str(self.crf), "-movflags", "+faststart",
+            "-f", "mp4", str(self._partial(self.mp4_path)),
+        ]
+        self._ffmpeg = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _write_gif(self, image: Image.Image):
+        frame = self._palette.quantize(image)
+        palette = frame.palette.tobytes()
+        if self._gif is None:
+            self.gif_path.parent.mkdir(parents=True, exist_ok=True)
+            self._gif = open(self._partial(self.gif_path), "wb")
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": self.loop, "duration": self.duration})
+            self._gif.write(b"".join(header))
+            self._gif_palette = palette
+        # Frames whose palette differs from the header's carry their own colour table
+        for chunk in GifImagePlugin.getdata(frame, duration=int(round(self.duration * 1000)),
+                                            include_color_table=palette != self._gif_palette):
+            self._gif.write(chunk)
+
+    def write(self, frame: Union[np.ndarray, Image.Image]):
+        """Encode one RGB(A) frame, an array (rows x cols x channels) or a PIL image."""
+        image = self._fit(frame)
+        if self.gif_path is not None:
+            self._write_gif(image)
+        if self.mp4_path is not None:
+            if self._ffmpeg is None:
+                self._open_mp4()
+            try:
+                self._ffmpeg.stdin.write(image.tobytes())
+            except BrokenPipeError:
+                raise RuntimeError(f"ffmpeg stopped: {self._ffmpeg.stderr.read().decode(errors='replace')}")
+        self.count += 1
+
+    def close(self, discard: bool = False):
+        """Finish the files, `discard` drops them (e.g. after an error while rendering)."""
+        outputs = []
+        if self._gif is not None:
+            self._gif.write(b";")
+            self._gif.close()
+            self._gif = None
+            outputs.append(self.gif_path)
+        if self._ffmpeg is not None:
+            _, stderr = self._ffmpeg.communicate()
+            if self._ffmpeg.returncode != 0 and not discard:
+                raise RuntimeError(f"ffmpeg failed ({self._ffmpeg.returncode}): {stderr.decode(errors='replace')}")
+            self._ffmpeg = None
+            outputs.append(self.mp4_path)
+
+        for path in outputs:
+            if discard:
+                self._partial(path).unlink(missing_ok=True)
+            else:
+                os.replace(self._partial(path), path)
+                logger.info(f"Wrote {self.count} frames to {path}")
@@ -1,4 +1,5 @@
 import os
+import shutil
 import folium
 import imageio
 import numpy as np
@@ -6,12 +7,16 @@ import contextily as ctx
 import matplotlib.pyplot as plt
 
 from PIL import Image
-from folium import raster_layers
+from pathlib import Path
+from pyproj import Transformer
 from rasterio.plot import reshape_as_image
-from branca.element import Template, MacroElement
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.tile_store import basemap_source, fetch_basemap, draw_basemap
+from src.utils.folium_sidecars import save_map
+from src.utils.folium_layers import add_time_slider_overlay, image_sheet, tile_sheet
+from src.utils.raster_tiles import export_raster_tiles
 
 logger = get_logger(__name__)
 
@@ -47,7 +52,7 @@ def overlay_image_matplotlib(image_path, bounds, zoom=6, figsize=(10, 10)):
 
     # Plot
     fig, ax = plt.subplots(figsize=figsize)
-    ctx.add_basemap(ax, source=ctx.providers.OpenStreetMap.Mapnik, zoom=zoom)
+    ctx.add_basemap(ax, source=basemap_source(ctx.providers.OpenStreetMap.Mapnik), zoom=zoom)
 
     # Overlay image
     ax.imshow(img_arr, extent=[x_min, x_max, y_min, y_max], origin='upper', alpha=0.6)
@@ -97,13 +102,17 @@ def overlay_image_folium(image_path, bounds, file_html,
     folium.LayerControl().add_to(basemap)
     
     # Save the map to an HTML file
-    basemap.save(file_html)
+    save_map(basemap, file_html)
     logger.info(f"Map created – open '{file_html}.html' to view.")
 
-def create_time_slider_map(maps_info, file_html, map_center=None, zoom_start=5, map_tiles='OpenStreetMap', opacity=0.6):
+def create_time_slider_map(maps_info, file_html, map_center=None, zoom_start=5, map_tiles='OpenStreetMap', opacity=0.6,
+                           mode='tiles'):
     """
     Create a Folium map overlaying multiple analog maps with a time slider.
 
+    Only the map of the selected year is loaded, the previous and next years are prefetched in
+    the background; the maps are referenced by URL, not embedded in the page.
+
     Parameters
     ----------
     maps_info : list of dicts
@@ -118,6 +127,9 @@ def create_time_slider_map(maps_info, file_html, map_center=None, zoom_start=5,
         Basemap tiles to be used for display.
     opacity : float
         Transparency of the overlays.
+    mode : str
+        'tiles' cuts every map into an XYZ tile directory next to the html, 'image' copies the
+        image files there as they are.
     """
     if map_center is None:
         min_lon, min_lat, max_lon, max_lat = maps_info[0]["bounds"]
@@ -125,69 +137,36 @@ def create_time_slider_map(maps_info, file_html, map_center=None, zoom_start=5,
 
     basemap = folium.Map(location=map_center, zoom_start=zoom_start, tiles=map_tiles, control_scale=True)
 
-    # Create FeatureGroups for each map
-    fg_dict = {}
+    # One sheet per year, written next to the html and loaded by the slider when selected
+    sheets_root = Path(file_html).with_name(f"{Path(file_html).stem}_{mode}")
+    sheets = []
     for info in maps_info:
-        fg = folium.FeatureGroup(name=str(info["year"]), show=(info["year"] == maps_info[0]["year"]))
-        raster_layers.ImageOverlay(
-            image=info["path"],
-            bounds=[[info["bounds"][1], info["bounds"][0]], [info["bounds"][3], info["bounds"][2]]],
-            opacity=opacity,
-            interactive=True,
-            cross_origin=False,
-            zindex=1
-        ).add_to(fg)
-        fg.add_to(basemap)
-        fg_dict[info["year"]] = fg
+        if mode == 'tiles':
+            tile_dir = export_raster_tiles(info["path"], sheets_root / str(info["year"]), bounds=info["bounds"],
+                                           min_zoom=max(zoom_start - 2, 0), stretch=False)
+            sheets.append(tile_sheet(info["year"], tile_dir, url=f"{sheets_root.name}/{tile_dir.name}"))
+        elif mode == 'image':
+            sheets_root.mkdir(parents=True, exist_ok=True)
+            image = sheets_root / f"{info['year']}{Path(info['path']).suffix}"
+            if not image.exists() or image.stat().st_mtime < Path(info["path"]).stat().st_mtime:
+                shutil.copy2(info["path"], image)
+            sheets.append(image_sheet(info["year"], f"{sheets_root.name}/{image.name}", info["bounds"]))
+        else:
+            raise ValueError(f"Unknown mode {mode!r}, use 'tiles' or 'image'")
+
+    add_time_slider_overlay(basemap, sheets, title="Year", opacity=opacity, name="Analog maps")
 
     # Add LayerControl (optional)
     folium.LayerControl().add_to(basemap)
-
-    # Add custom slider
-    years = [str(info["year"]) for info in maps_info]
-    slider_template = """
-    {% macro html(this, kwargs) %}
-    <div id="slider-container" style="position: fixed; bottom: 50px; left: 50px; width: 300px; z-index:9999; background-color:white; padding:10px; border-radius:5px;">
-        <label for="yearSlider">Year: <span id="yearLabel">{{years[0]}}</span></label>
-        <input type="range" min="0" max="{{max_idx}}" value="0" step="1" id="yearSlider" style="width:100%;">
-    </div>
-    <script>
-        var years = {{years}};
-        var layers = {};
-        {% for y in years %}
-            layers["{{y}}"] = {{this.get_name()}}.layerManager.getLayer('{{y}}');
-        {% endfor %}
-
-        var slider = document.getElementById('yearSlider');
-        var label = document.getElementById('yearLabel');
-
-        slider.oninput = function() {
-            var year = years[this.value];
-            label.innerHTML = year;
-
-            for (var i=0; i<years.length; i++){
-                var y = years[i];
-                if(y === year){
-                    layers[y].addTo({{this._parent.get_name()}});
-                } else {
-                    {{this._parent.get_name()}}.removeLayer(layers[y]);
-                }
-            }
-        };
-    </script>
-    {% endmacro %}
-    """
-    macro = MacroElement()
-    macro._template = Template(slider_template).render(years=years, max_idx=len(years)-1)
-    basemap.get_root().add_child(macro)
     
     # Save the map to an HTML file
-    basemap.save(file_html)
+    save_map(basemap, file_html)
     logger.info(f"Map created – open '{file_html}.html' to view.")
     
 def create_static_map_animation(maps_info, out_path="india_animation.gif", figsize=(10, 10), zoom=6, alpha=0.6):
     """
     Create a GIF animation from multiple analog maps overlayed on basemap.
+    The basemap tiles are fetched once for the area of all maps and drawn on every frame.
 
     Parameters
     ----------
@@ -204,23 +183,29 @@ def create_static_map_animation(maps_info, out_path="india_animation.gif", figsi
     """
     frames = []
 
+    # Convert bounds to Web Mercator
+    transformer = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+    extents = []
     for info in maps_info:
-        fig, ax = plt.subplots(figsize=figsize)
-        ctx.add_basemap(ax, source=ctx.providers.OpenStreetMap.Mapnik, zoom=zoom)
-
-        # Convert bounds to Web Mercator
-        import pyproj
-        from pyproj import Transformer
-
-        transformer = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
         x_min, y_min = transformer.transform(info["bounds"][0], info["bounds"][1])
         x_max, y_max = transformer.transform(info["bounds"][2], info["bounds"][3])
+        extents.append((x_min, x_max, y_min, y_max))
+
+    # Fetch the basemap once for the area of all maps, every frame draws the same mosaic
+    basemap = fetch_basemap((min(e[0] for e in extents), max(e[1] for e in extents),
+                             min(e[2] for e in extents), max(e[3] for e in extents)),
+                            zoom=zoom, source=basemap_source(ctx.providers.OpenStreetMap.Mapnik))
+
+    for info, extent in zip(maps_info, extents):
+        fig, ax = plt.subplots(figsize=figsize)
+        ax.axis(extent)
+        draw_basemap(ax, basemap)
 
         # Load image
         img = Image.open(info["path"])
         img_arr = np.array(img)
 
-        ax.imshow(img_arr, extent=[x_min, x_max, y_min, y_max], origin='upper', alpha=alpha)
+        ax.imshow(img_arr, extent=list(extent), origin='upper', alpha=alpha)
         ax.set_axis_off()
         ax.set_title(f"Year: {info['year']}", fontsize=14)
 
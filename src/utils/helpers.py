@@ -1,8 +1,15 @@
+import os
+import sys
 import json
+import pickle
+import hashlib
+import inspect
+import functools
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 
-from typing import List
+from typing import Callable, Iterable, List, Optional
 from pathlib import Path
 
 from src.utils.logger import get_logger
@@ -10,6 +17,14 @@ from src.utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+# Audit event announcing a file dependency that is not opened (e.g. on a cache hit),
+# the day runner listens to it to build each day's dependency manifest
+INPUT_AUDIT_EVENT = "mapchallenge.input"
+ARTIFACT_CACHE_DIR = Path(".cache/artifacts")
+# Total size of the artifact cache before the least recently used entries are evicted
+ARTIFACT_CACHE_MAX_BYTES = 2 * 1024**3
+
+
 def get_relative_path(filename: str) -> Path:
     """Get the relative path of the current file from the project root."""
 
@@ -80,4 +95,175 @@ def load_and_flatten(json_path: str, data_column: str = 'data', meta: List = [])
         meta_prefix="meta_"                 # optional prefix to avoid collisions
     )
 
-    return flat
\ No newline at end of file
+    return flat
+
+def declare_input(path):
+    """Tell the day runner a file is an input of the running day even though it is not read."""
+    sys.audit(INPUT_AUDIT_EVENT, os.fspath(path))
+
+def _file_fingerprint(path: Path, hash_files: bool) -> str:
+    """Fingerprint a file (and its shapefile sidecars) by content hash or by size and mtime."""
+    # A shapefile is several files, the attributes live in .dbf next to the .shp
+    if path.suffix.lower() == ".shp":
+        files = sorted(p for p in path.parent.glob(f"{path.stem}.*")
+                       if p.suffix.lower() in (".shp", ".dbf", ".shx", ".prj", ".cpg"))
+    else:
+        files = [path]
+
+    parts = []
+    for f in files:
+        declare_input(f)
+        stat = f.stat()
+        if hash_files:
+            digest = hashlib.sha256()
+            with open(f, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    digest.update(chunk)
+            parts.append(f"{f.name}:{digest.hexdigest()}")
+        else:
+            parts.append(f"{f.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+def _update_key(digest, value, hash_files: bool):
+    """Feed a stable representation of a function argument into the cache key."""
+    if isinstance(value, (gpd.GeoDataFrame, gpd.GeoSeries)):
+        digest.update(f"crs:{value.crs.to_string() if value.crs else None}".encode())
+        value = value.to_wkb()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(f"{type(value).__name__}:{value.shape}:{labels}".encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        except TypeError:
+            # unhashable cells such as lists or dicts
+            digest.update(pickle.dumps(value))
+    elif isinstance(value, np.ndarray):
+        digest.update(f"ndarray:{value.dtype}:{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (str, Path)) and Path(value).is_file():
+        digest.update(f"file:{value}:{_file_fingerprint(Path(value), hash_files)}".encode())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            _update_key(digest, item, hash_files)
+    elif isinstance(value, dict):
+        digest.update(f"dict:{len(value)}".encode())
+        for k in sorted(value, key=repr):
+            _update_key(digest, k, hash_files)
+            _update_key(digest, value[k], hash_files)
+    else:
+        digest.update(repr(value).encode())
+
+def _evict_artifacts(cache_dir: Path, max_bytes: int):
+    """Delete the least recently used artifacts until the cache fits in max_bytes."""
+    entries = [(p.stat(), p) for p in cache_dir.iterdir() if p.suffix in (".parquet", ".npz")]
+    total = sum(stat.st_size for stat, _ in entries)
+    # Artifacts are touched on every hit, so the oldest mtime is the least recently used
+    for stat, path in sorted(entries, key=lambda e: e[0].st_mtime):
+        if total <= max_bytes:
+            break
+        logger.debug(f"Evicting cached artifact {path.name}")
+        path.unlink(missing_ok=True)
+        total -= stat.st_size
+
+def _write_artifact(result, path_stem: Path) -> Optional[Path]:
+    """Store a result as GeoParquet/Parquet or NPZ, written to a temporary file first."""
+    if isinstance(result, pd.DataFrame):
+        artifact = path_stem.with_suffix(".parquet")
+        tmp_path = path_stem.with_suffix(f".{os.getpid()}.tmp")
+        result.to_parquet(tmp_path)
+    elif isinstance(result, (np.ndarray, dict)):
+        artifact = path_stem.with_suffix(".npz")
+        tmp_path = path_stem.with_suffix(f".{os.getpid()}.tmp.npz")
+        arrays = result if isinstance(result, dict) else {"result": result}
+        np.savez_compressed(tmp_path, **arrays)
+    else:
+        logger.warning(f"Cannot cache result of type {type(result).__name__}, not stored")
+        return None
+    os.replace(tmp_path, artifact)
+    return artifact
+
+def _read_artifact(artifact: Path):
+    """Load a result written by _write_artifact."""
+    if artifact.suffix == ".npz":
+        with np.load(artifact, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        return arrays["result"] if list(arrays) == ["result"] else arrays
+    try:
+        return gpd.read_parquet(artifact)
+    except ValueError:
+        # plain DataFrame without geo metadata
+        return pd.read_parquet(artifact)
+
+def cache_artifact(inputs: Iterable[str] = (),
+                   hash_files: bool = False,
+                   cache_dir: Path = ARTIFACT_CACHE_DIR,
+                   max_bytes: int = ARTIFACT_CACHE_MAX_BYTES) -> Callable:
+    """
+    Memoize an expensive preprocessing step on disk.
+
+    The cache key combines the function's source code, its arguments and a fingerprint of its
+    input files, so a result is recomputed when any of them changes. Arguments that are paths to
+    existing files and the files listed in `inputs` are fingerprinted by size and mtime (or by
+    content hash). GeoDataFrame/DataFrame results are stored as (Geo)Parquet, numpy arrays or dicts
+    of arrays as NPZ. Side effects of the function (e.g. files it writes) only happen on a miss.
+
+    Parameters
+    ----------
+    inputs : Iterable[str], optional
+        Files read inside the function that are not passed as arguments.
+    hash_files : bool, optional
+        Hash file contents instead of using size and mtime, slower but survives copies/checkouts.
+    cache_dir : Path, optional
+        Folder for the cached artifacts, by default .cache/artifacts.
+    max_bytes : int, optional
+        Total size of the cache folder, least recently used artifacts are evicted beyond it.
+
+    Returns
+    -------
+    Callable
+        Decorator for the function to cache.
+
+    Examples
+    --------
+    >>> @cache_artifact(inputs=["data/effis_layer/modis.ba.poly.shp"])
+    ... def repivot(fire_class='FireSeason'): ...
+    """
+    def decorator(func):
+        try:
+            source = inspect.getsource(func)
+        except (OSError, TypeError):
+            source = func.__qualname__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            digest = hashlib.sha256(f"{func.__module__}.{func.__qualname__}\n{source}".encode())
+            _update_key(digest, dict(bound.arguments), hash_files)
+            for path in inputs:
+                digest.update(f"input:{path}:{_file_fingerprint(Path(path), hash_files)}".encode())
+            key = f"{func.__name__}-{digest.hexdigest()[:24]}"
+
+            directory = Path(cache_dir)
+            for suffix in (".parquet", ".npz"):
+                artifact = directory / f"{key}{suffix}"
+                if artifact.exists():
+                    logger.info(f"Using cached {func.__name__} result {artifact}")
+                    result = _read_artifact(artifact)
+                    os.utime(artifact)
+                    return result
+
+            result = func(*args, **kwargs)
+
+            directory.mkdir(parents=True, exist_ok=True)
+            _write_artifact(result, directory / key)
+            _evict_artifacts(directory, max_bytes)
+            return result
+
+        wrapper.cache_dir = Path(cache_dir)
+        return wrapper
+
+    return decorator
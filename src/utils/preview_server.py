@@ -0,0 +1,327 @@
+import io
+import re
+import json
+import gzip
+import time
+import argparse
+import functools
+import threading
+
+from typing import Optional, Tuple
+from pathlib import Path
+from datetime import datetime, timezone
+from collections import OrderedDict, defaultdict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlsplit
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.logger import get_logger
+from src.utils.day_runner import PROJECT_ROOT, YEARS_DIR
+
+# brotli is optional, responses fall back to gzip without it
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = get_logger(__name__)
+
+
+REQUEST_LOG = PROJECT_ROOT / ".cache" / "preview_requests.jsonl"
+# Sidecars and other content-addressed files ('<name>.<12+ hex>.<ext>') never change
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12,}\.")
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/geo+json", "application/javascript",
+                      "image/svg+xml", "application/xml")
+MIN_COMPRESS_BYTES = 1024
+# Compressed responses kept in memory, by file version and encoding
+COMPRESSED_CACHE_BYTES = 64 * 1024**2
+PRECOMPRESSED = {".gz": "gzip", ".br": "br"}
+
+
+class PreviewServer(ThreadingHTTPServer):
+    """HTTP server for the map outputs, with a compressed-response cache and a request log."""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], root: Path, log_path: Optional[Path] = REQUEST_LOG,
+                 max_age: int = 0):
+        super().__init__(address, functools.partial(PreviewHandler, directory=str(root)))
+        self.root = root
+        self.max_age = max_age
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.compressed = OrderedDict()
+        self.compressed_bytes = 0
+        self.stats = defaultdict(lambda: {"requests": 0, "bytes": 0, "ms": 0.0})
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def compress(self, path: Path, etag: str, encoding: str) -> bytes:
+        """Compressed content of a file version, from the cache when possible."""
+        key = (str(path), etag, encoding)
+        with self.lock:
+            if key in self.compressed:
+                self.compressed.move_to_end(key)
+                return self.compressed[key]
+        data = path.read_bytes()
+        body = brotli.compress(data, quality=5) if encoding == "br" else gzip.compress(data, compresslevel=6, mtime=0)
+        with self.lock:
+            self.compressed[key] = body
+            self.compressed_bytes += len(body)
+            while self.compressed_bytes > COMPRESSED_CACHE_BYTES and len(self.compressed) > 1:
+                _, dropped = self.compressed.popitem(last=False)
+                self.compressed_bytes -= len(dropped)
+        return body
+
+    def record(self, entry: dict):
+        """Append a request to the log and to the per-page totals."""
+        with self.lock:
+            stats = self.stats[entry["page"]]
+            stats["requests"] += 1
+            stats["bytes"] += entry["bytes"]
+            stats["ms"] += entry["ms"]
+            if self.log_path is not None:
+                with open(self.log_path, "a", encoding="utf-8") as log:
+                    log.write(json.dumps(entry) + "\n")
+
+    def summary(self) -> str:
+        """Requests, bytes and summed response times per page (the page and what it loaded)."""
+        lines = [f"{'page':<60}{'requests':>10}{'MB':>10}{'ms':>10}"]
+        for page, stats in sorted(self.stats.items(), key=lambda item: -item[1]["bytes"]):
+            lines.append(f"{page[-60:]:<60}{stats['requests']:>10}{stats['bytes'] / 1e6:>10.2f}{stats['ms']:>10.0f}")
+        return "\n".join(lines)
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """
+    Static files with validators (ETag, Last-Modified), cache headers, on the fly gzip / brotli
+    and single byte ranges (PMTiles). Every response is timed and logged by the server.
+    """
+    server_version = "MapPreview/1.0"
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".js": "application/javascript",
+        ".json": "application/json",
+        ".geojson": "application/geo+json",
+        ".topojson": "application/json",
+        ".pmtiles": "application/octet-stream",
+        ".mbtiles": "application/octet-stream",
+        ".pbf": "application/x-protobuf",
+        ".webp": "image/webp",
+    }
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "content-length":
+            self._length = int(value)
+        elif keyword.lower() == "content-encoding":
+            self._encoding = value
+        super().send_header(keyword, value)
+
+    def end_headers(self):
+        self._first_byte = time.perf_counter()
+        super().end_headers()
+
+    def log_request(self, code="-", size="-"):
+        # replaced by the server request log
+        pass
+
+    def _serve(self, head: bool):
+        start = time.perf_counter()
+        self._status, self._length, self._encoding, self._range, self._first_byte = None, 0, "", "", None
+        try:
+            path = Path(self.translate_path(self.path))
+            if path.is_file():
+                self._serve_file(path, head)
+            else:
+                # directory listings, index.html redirects and 404s
+                source = self.send_head()
+                if source:
+                    try:
+                        if not head:
+                            self.copyfile(source, self.wfile)
+                    finally:
+                        source.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            end = time.perf_counter()
+            target = urlsplit(self.path).path
+            referer = urlsplit(self.headers.get("Referer", "")).path
+            self.server.record({
+                "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "method": self.command, "path": target, "status": self._status,
+                "bytes": 0 if head or self._status == 304 else self._length,
+                "encoding": self._encoding, "range": self._range,
+                "ttfb_ms": round(((self._first_byte or end) - start) * 1e3, 2),
+                "ms": round((end - start) * 1e3, 2),
+                "page": referer or target,
+            })
+
+    def _content_type(self, path: Path) -> Tuple[str, str]:
+        """Content type and Content-Encoding of a file, '.json.gz' sidecars are JSON sent gzip encoded."""
+        encoding = PRECOMPRESSED.get(path.suffix, "")
+        if encoding and encoding in self.headers.get("Accept-Encoding", ""):
+            return self.guess_type(path.with_suffix("")), encoding
+        return self.guess_type(path), ""
+
+    def _cache_control(self, path: Path) -> str:
+        if HASHED_NAME.search(path.name):
+            return "public, max-age=31536000, immutable"
+        if path.suffix == ".html" or not self.server.max_age:
+            return "no-cache"
+        return f"public, max-age={self.server.max_age}"
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        if "If-None-Match" in self.headers:
+            tags = [tag.strip() for tag in self.headers["If-None-Match"].split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if "If-Modified-Since" in self.headers:
+            try:
+                return int(mtime) <= parsedate_to_datetime(self.headers["If-Modified-Since"]).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _byte_range(self, size: int, etag: str) -> Optional[Tuple[int, int]]:
+        """First and last byte of a single 'bytes=' range, None to send the whole file."""
+        header = self.headers.get("Range")
+        if not header or self.headers.get("If-Range", etag) != etag:
+            return None
+        match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+        if not match or match.group(1) == match.group(2) == "":
+            return None
+        if match.group(1) == "":
+            return max(size - int(match.group(2)), 0), size - 1
+        first = int(match.group(1))
+        if not match.group(2):
+            return first, size - 1
+        if int(match.group(2)) < first:
+            # Invalid range (e.g. bytes=500-100), ignored like any malformed Range header
+            return None
+        return first, min(int(match.group(2)), size - 1)
+
+    def _serve_file(self, path: Path, head: bool):
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        content_type, encoding = self._content_type(path)
+        byte_range = self._byte_range(stat.st_size, etag) if not encoding else None
+        accept = self.headers.get("Accept-Encoding", "")
+        if (not encoding and byte_range is None and stat.st_size >= MIN_COMPRESS_BYTES
+                and content_type.startswith(COMPRESSIBLE_TYPES)):
+            encoding = "br" if brotli is not None and "br" in accept else "gzip" if "gzip" in accept else ""
+            compress = bool(encoding)
+        else:
+            compress = False
+
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+        elif byte_range is not None and byte_range[0] >= stat.st_size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{stat.st_size}")
+            self.send_header("Content-Length", "0")
+            byte_range = None
+        elif byte_range is not None:
+            self.send_response(206)
+            self._range = f"{byte_range[0]}-{byte_range[1]}"
+            self.send_header("Content-Range", f"bytes {self._range}/{stat.st_size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+        self.send_header("Cache-Control", self._cache_control(path))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Expose-Headers", "ETag, Content-Range, Content-Length, Content-Encoding")
+        if self._status in (304, 416):
+            self.end_headers()
+            return
+
+        if compress:
+            body = self.server.compress(path, etag, encoding)
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+            return
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        first, last = byte_range if byte_range is not None else (0, stat.st_size - 1)
+        self.send_header("Content-Length", str(last - first + 1))
+        self.end_headers()
+        if not head:
+            with open(path, "rb") as source:
+                source.seek(first)
+                self.copyfile(io.BufferedReader(_Limited(source, last - first + 1)), self.wfile)
+
+class _Limited(io.RawIOBase):
+    """The next `length` bytes of a file."""
+    def __init__(self, source, length: int):
+        self.source = source
+        self.remaining = length
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.source.read(min(len(buffer), self.remaining))
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+def serve(root: Path = YEARS_DIR / "2025", host: str = "127.0.0.1", port: int = 8000,
+          log_path: Optional[Path] = REQUEST_LOG, max_age: int = 0):
+    """
+    Serve a folder of generated maps until interrupted, then print the per-page totals.
+
+    Parameters
+    ----------
+    root : Path
+        Folder served, by default the 2025 outputs.
+    host, port : str, int
+        Address to listen on.
+    log_path : Path, optional
+        JSON lines request log (path, status, bytes, encoding, range, time to first byte and
+        total time in ms, page that requested it). None to disable.
+    max_age : int
+        Cache lifetime in seconds for files that are neither HTML nor content hashed, 0 to have
+        browsers revalidate them (ETag / Last-Modified) on every load.
+    """
+    server = PreviewServer((host, port), Path(root), log_path=log_path, max_age=max_age)
+    logger.info(f"Serving {root} on http://{host}:{server.server_address[1]}/"
+                + (f", request log {log_path}" if log_path else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.summary())
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the generated maps locally, with caching, "
+                                                 "compression, byte ranges and a request log")
+    parser.add_argument("--year", type=str, default="2025", help="Challenge year under src/years")
+    parser.add_argument("--root", type=str, default=None, help="Folder to serve instead of the year")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port, 0 for any free port")
+    parser.add_argument("--log", type=str, default=str(REQUEST_LOG), help="JSON lines request log, '' to disable")
+    parser.add_argument("--max_age", type=int, default=0, help="Cache lifetime (s) of non-hashed, non-HTML files")
+    args = parser.parse_args()
+
+    serve(Path(args.root) if args.root else YEARS_DIR / args.year, host=args.host, port=args.port,
+          log_path=Path(args.log) if args.log else None, max_age=args.max_age)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import hashlib
+import geopandas as gpd
+
+from typing import Union
+from pathlib import Path
+
+from src.utils.logger import get_logger
+from src.utils.helpers import _update_key, _write_artifact, _read_artifact, _evict_artifacts
+from src.utils.choropleth_animation import project_geometries
+
+logger = get_logger(__name__)
+
+
+PROJECTION_CACHE_DIR = Path(".cache/projected")
+# Total size of the projected-geometry cache before the least recently used entries are evicted
+PROJECTION_CACHE_MAX_BYTES = 1024**3
+# Bump when the projection code changes in a way that invalidates stored geometries
+PROJECTION_CACHE_VERSION = 1
+
+
+def projection_key(projection) -> str:
+    """Stable description of a cartopy projection: class, proj4 definition, domain and threshold."""
+    bounds = ",".join(f"{value:.6f}" for value in projection.bounds)
+    return f"{type(projection).__name__}|{projection.proj4_init}|{bounds}|{projection.threshold:.6f}"
+
+def project_dataset(dataset: Union[gpd.GeoDataFrame, gpd.GeoSeries], projection, simplify_tolerance: float = 0.0,
+                    cache_dir: Path = PROJECTION_CACHE_DIR,
+                    max_bytes: int = PROJECTION_CACHE_MAX_BYTES) -> Union[gpd.GeoDataFrame, gpd.GeoSeries]:
+    """
+    Geometries in the coordinates of a cartopy projection, cached on disk as GeoParquet.
+
+    Geographic data is projected with cartopy (see project_geometries), so polygons crossing the
+    antimeridian or the edge of the projection are cut like cartopy draws them instead of being
+    smeared across the map as with to_crs. The result is keyed by the content of the dataset
+    (geometries and attributes), the projection parameters and the simplification tolerance;
+    a repeated render reads it back without projecting anything. Draw the result on a GeoAxes
+    of the same projection without a `transform`.
+
+    Parameters
+    ----------
+    dataset : gpd.GeoDataFrame | gpd.GeoSeries
+        Data to project, attributes and index are kept.
+    projection : cartopy.crs.Projection
+        Projection of the GeoAxes the data is drawn on.
+    simplify_tolerance : float, optional
+        Simplify geometries with this tolerance (in the dataset's CRS units) before projecting, 0 keeps them.
+    cache_dir : Path, optional
+        Folder of the cache, by default .cache/projected.
+    max_bytes : int, optional
+        Total size of the cache folder, least recently used entries are evicted beyond it.
+
+    Returns
+    -------
+    gpd.GeoDataFrame | gpd.GeoSeries
+        Same type as `dataset`, in the CRS of the projection (projection.proj4_init).
+    """
+    digest = hashlib.sha256(f"v{PROJECTION_CACHE_VERSION}|{projection_key(projection)}|{simplify_tolerance!r}".encode())
+    _update_key(digest, dataset, hash_files=False)
+    key = f"projected-{digest.hexdigest()[:24]}"
+    directory = Path(cache_dir)
+    artifact = directory / f"{key}.parquet"
+
+    if artifact.exists():
+        logger.info(f"Using cached projected geometries {artifact}")
+        result = _read_artifact(artifact)
+        os.utime(artifact)
+    else:
+        geometries = dataset.geometry
+        if simplify_tolerance > 0:
+            geometries = geometries.simplify(simplify_tolerance)
+        projected = project_geometries(geometries, projection)
+        if isinstance(dataset, gpd.GeoDataFrame):
+            result = dataset.set_geometry(projected.rename(dataset.geometry.name))
+        else:
+            result = gpd.GeoDataFrame(geometry=projected)
+        directory.mkdir(parents=True, exist_ok=True)
+        try:
+            _write_artifact(result, directory / key)
+            _evict_artifacts(directory, max_bytes)
+        except (ValueError, TypeError, OSError) as e:
+            # e.g. attribute columns Parquet cannot store, the projection is still returned
+            logger.warning(f"Projected geometries not cached: {e}")
+
+    if isinstance(dataset, gpd.GeoSeries):
+        return result.geometry.rename(dataset.name)
+    return result
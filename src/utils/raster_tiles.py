@@ -0,0 +1,230 @@
+import json
+import warnings
+import math
+import shutil
+import argparse
+import numpy as np
+import rasterio
+
+from typing import Iterator, Optional, Sequence, Tuple, Union
+from pathlib import Path
+from PIL import Image
+from affine import Affine
+from rasterio.enums import ColorInterp, Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
+from rasterio.transform import array_bounds, from_bounds
+
+from src.utils.logger import get_logger
+from src.utils.topology import TILE_SIZE
+from src.utils.vector_tiles import MERCATOR_HALF_WORLD, MAX_LATITUDE
+
+logger = get_logger(__name__)
+
+
+METADATA_FILE = "metadata.json"
+TILE_FORMATS = {"png": "PNG", "webp": "WEBP"}
+
+
+def tile_span(zoom: int) -> float:
+    """Width of a tile in Web Mercator meters at a zoom level."""
+    return 2 * MERCATOR_HALF_WORLD / 2 ** zoom
+
+def native_zoom(resolution: float) -> int:
+    """Lowest zoom whose tile pixels are at least as fine as `resolution` (Web Mercator meters)."""
+    return max(0, math.ceil(math.log2(2 * MERCATOR_HALF_WORLD / (TILE_SIZE * resolution))))
+
+def _open_source(src, bounds: Optional[Sequence[float]]) -> dict:
+    """Georeferencing of the source, from the file or from WGS84 `bounds` for plain images."""
+    if bounds is not None:
+        return {"src_crs": "EPSG:4326", "src_transform": from_bounds(*bounds, src.width, src.height)}
+    if src.crs is None:
+        raise ValueError(f"{src.name} is not georeferenced, pass bounds=[min_lon, min_lat, max_lon, max_lat]")
+    return {"src_crs": src.crs, "src_transform": src.transform}
+
+def _data_bands(src) -> list:
+    """Band indexes drawn, the first three non-alpha bands."""
+    return [i for i, interp in enumerate(src.colorinterp, 1) if interp != ColorInterp.alpha][:3]
+
+def value_range(src, bands: list) -> Tuple[float, float]:
+    """Minimum and maximum of the valid pixels, read block by block."""
+    vmin, vmax = math.inf, -math.inf
+    for _, window in src.block_windows(1):
+        data = src.read(bands, window=window, masked=True)
+        if data.count():
+            vmin, vmax = min(vmin, float(data.min())), max(vmax, float(data.max()))
+    return (vmin, vmax) if vmin <= vmax else (0.0, 1.0)
+
+def _to_image(data: np.ndarray, mask: np.ndarray, scale: Optional[Tuple[float, float]]) -> Image.Image:
+    """Bands x rows x cols pixels and a 0/255 mask as an RGBA (or LA for one band) tile."""
+    if scale is not None:
+        vmin, vmax = scale
+        data = (data.astype(np.float32) - vmin) * (255.0 / ((vmax - vmin) or 1.0))
+    pixels = np.clip(data, 0, 255).astype(np.uint8)
+    if len(pixels) == 1:
+        return Image.fromarray(np.dstack([pixels[0], mask]), mode="LA")
+    if len(pixels) == 2:
+        pixels = pixels[:1].repeat(3, axis=0)
+    return Image.fromarray(np.dstack([*pixels, mask]), mode="RGBA")
+
+def _save(image: Image.Image, path: Path, tile_format: str, quality: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if tile_format == "webp":
+        image.save(path, TILE_FORMATS[tile_format], quality=quality)
+    else:
+        image.save(path, TILE_FORMATS[tile_format])
+
+def _base_tiles(vrt: WarpedVRT, bands: list, x0: int, y0: int,
+                scale: Optional[Tuple[float, float]]) -> Iterator[Tuple[int, int, Image.Image]]:
+    """Tiles of the warped grid with data, read (bands and alpha together) one tile window at a time."""
+    alpha = vrt.colorinterp.index(ColorInterp.alpha) + 1
+    for row in range(vrt.height // TILE_SIZE):
+        for col in range(vrt.width // TILE_SIZE):
+            window = Window(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            data = vrt.read(bands + [alpha], window=window)
+            if not data[-1].any():
+                continue
+            mask = np.where(data[-1] > 0, 255, 0).astype(np.uint8)
+            yield x0 + col, y0 + row, _to_image(data[:-1], mask, scale)
+
+def _overview(tile_dir: Path, zoom: int, x: int, y: int, tile_format: str, mode: str) -> Optional[Image.Image]:
+    """Tile of `zoom` from its four children at zoom + 1, None when none of them exists."""
+    canvas, found = Image.new(mode, (2 * TILE_SIZE, 2 * TILE_SIZE)), False
+    for dx in (0, 1):
+        for dy in (0, 1):
+            child = tile_dir / str(zoom + 1) / str(2 * x + dx) / f"{2 * y + dy}.{tile_format}"
+            if child.exists():
+                with Image.open(child) as image:
+                    canvas.paste(image.convert(mode), (dx * TILE_SIZE, dy * TILE_SIZE))
+                found = True
+    return canvas.resize((TILE_SIZE, TILE_SIZE), Image.Resampling.LANCZOS) if found else None
+
+def read_tile_metadata(tile_dir: Union[str, Path]) -> dict:
+    """Metadata written by export_raster_tiles (bounds, zoom range, format)."""
+    return json.loads((Path(tile_dir) / METADATA_FILE).read_text())
+
+def export_raster_tiles(path: Union[str, Path], tile_dir: Union[str, Path],
+                        bounds: Optional[Sequence[float]] = None, min_zoom: int = 0,
+                        max_zoom: Optional[int] = None, tile_format: str = "png",
+                        resampling: str = "bilinear", stretch: bool = True, quality: int = 85,
+                        overwrite: bool = False) -> Path:
+    """
+    Cut a raster (GeoTIFF or a plain image with bounds) into an XYZ tile directory.
+
+    The deepest zoom is warped to Web Mercator one tile window at a time, so only the source
+    blocks under a tile are read; every lower zoom is built from the four tiles below it.
+    Memory stays at a few tiles whatever the size of the scan. The pyramid is skipped when
+    the source and the options did not change since the last export.
+
+    Parameters
+    ----------
+    path : str | Path
+        Raster readable by rasterio.
+    tile_dir : str | Path
+        Output directory, tiles are written as '<z>/<x>/<y>.<format>' with a metadata.json.
+    bounds : Sequence[float], optional
+        [min_lon, min_lat, max_lon, max_lat] of a raster without georeferencing.
+    min_zoom : int, optional
+        Lowest zoom of the pyramid.
+    max_zoom : int, optional
+        Deepest zoom, by default the zoom matching the raster resolution.
+    tile_format : str, optional
+        'png' or 'webp'.
+    resampling : str, optional
+        rasterio resampling used to warp the deepest zoom, e.g. 'nearest', 'bilinear'.
+    stretch : bool, optional
+        Stretch values from the raster minimum-maximum to 0-255 (one range for all bands).
+    quality : int, optional
+        WebP quality.
+    overwrite : bool, optional
+        Rebuild the pyramid even if it is up to date.
+
+    Returns
+    -------
+    Path
+        The tile directory.
+    """
+    path, tile_dir = Path(path), Path(tile_dir)
+    if tile_format not in TILE_FORMATS:
+        raise ValueError(f"Unknown tile format {tile_format!r}, use one of {list(TILE_FORMATS)}")
+    options = {"source": str(path.resolve()), "source_mtime": path.stat().st_mtime,
+               "source_size": path.stat().st_size, "bounds_in": list(bounds) if bounds is not None else None,
+               "format": tile_format, "resampling": resampling, "stretch": stretch,
+               "min_zoom": min_zoom, "max_zoom_in": max_zoom, "quality": quality}
+    metadata_path = tile_dir / METADATA_FILE
+    if not overwrite and metadata_path.exists():
+        metadata = read_tile_metadata(tile_dir)
+        if all(metadata.get(key) == value for key, value in options.items()):
+            logger.info(f"Tiles of {path.name} in {tile_dir} are up to date")
+            return tile_dir
+
+    with warnings.catch_warnings():
+        if bounds is not None:
+            # plain images are georeferenced by `bounds`
+            warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        src = rasterio.open(path)
+    with src:
+        georef = _open_source(src, bounds)
+        bands = _data_bands(src)
+        scale = value_range(src, bands) if stretch else None
+        src_bounds = array_bounds(src.height, src.width, georef["src_transform"])
+        west, south, east, north = transform_bounds(georef["src_crs"], "EPSG:4326", *src_bounds, densify_pts=21)
+        south, north = max(south, -MAX_LATITUDE), min(north, MAX_LATITUDE)
+        left, bottom, right, top = transform_bounds("EPSG:4326", "EPSG:3857", west, south, east, north)
+        if max_zoom is None:
+            resolution = min((right - left) / src.width, (top - bottom) / src.height)
+            max_zoom = max(native_zoom(resolution), min_zoom)
+
+        # Warped grid aligned on the tiles of max_zoom, every tile window lies inside it
+        span = tile_span(max_zoom)
+        x0, x1 = int((left + MERCATOR_HALF_WORLD) // span), math.ceil((right + MERCATOR_HALF_WORLD) / span)
+        y0, y1 = int((MERCATOR_HALF_WORLD - top) // span), math.ceil((MERCATOR_HALF_WORLD - bottom) / span)
+        for stale in tile_dir.glob("[0-9]*"):
+            shutil.rmtree(stale)
+        tile_dir.mkdir(parents=True, exist_ok=True)
+
+        count, mode, level = 0, "LA" if len(bands) == 1 else "RGBA", set()
+        add_alpha = ColorInterp.alpha not in src.colorinterp
+        with WarpedVRT(src, crs="EPSG:3857", resampling=Resampling[resampling], add_alpha=add_alpha,
+                       transform=Affine(span / TILE_SIZE, 0, x0 * span - MERCATOR_HALF_WORLD,
+                                        0, -span / TILE_SIZE, MERCATOR_HALF_WORLD - y0 * span),
+                       width=(x1 - x0) * TILE_SIZE, height=(y1 - y0) * TILE_SIZE, **georef) as vrt:
+            for x, y, image in _base_tiles(vrt, bands, x0, y0, scale):
+                _save(image, tile_dir / str(max_zoom) / str(x) / f"{y}.{tile_format}", tile_format, quality)
+                level.add((x, y))
+                count += 1
+
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        level = {(x // 2, y // 2) for x, y in level}
+        for x, y in level:
+            image = _overview(tile_dir, zoom, x, y, tile_format, mode)
+            if image is not None:
+                _save(image, tile_dir / str(zoom) / str(x) / f"{y}.{tile_format}", tile_format, quality)
+                count += 1
+
+    metadata = {**options, "max_zoom": max_zoom, "bounds": [west, south, east, north], "tiles": count}
+    metadata_path.write_text(json.dumps(metadata, indent=2))
+    logger.info(f"Wrote {count} tiles (zoom {min_zoom}-{max_zoom}) of {path.name} to {tile_dir}")
+    return tile_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Cut a raster into an XYZ PNG/WebP tile directory")
+    parser.add_argument("source", type=str, help="GeoTIFF, or any image rasterio can read with --bounds")
+    parser.add_argument("output", type=str, help="Output tile directory")
+    parser.add_argument("--bounds", type=float, nargs=4, default=None,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"), help="Bounds of a plain image")
+    parser.add_argument("--zoom", type=int, nargs=2, default=None, metavar=("MIN", "MAX"),
+                        help="Zoom range, by default 0 to the native zoom")
+    parser.add_argument("--format", type=str, default="png", choices=list(TILE_FORMATS), help="Tile format")
+    parser.add_argument("--overwrite", action="store_true", help="Rebuild even if up to date")
+    args = parser.parse_args()
+
+    min_zoom, max_zoom = args.zoom if args.zoom else (0, None)
+    export_raster_tiles(args.source, args.output, bounds=args.bounds, min_zoom=min_zoom, max_zoom=max_zoom,
+                        tile_format=args.format, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
-import requests
+import os
+import re
 import csv
-import time
+import asyncio
+import httpx
+import pandas as pd
 from bs4 import BeautifulSoup
 
+# Optional faster HTML backends, BeautifulSoup (html.parser) is the fallback
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+
+FIELDNAMES = ["Date", "Time (utc)", "Latitude", "Longitude", "Magnitude", "Depth (km)", "Region", "Mode", "Map"]
+# Columns identifying an event, used to detect events already stored
+EVENT_KEY = ("Date", "Time (utc)", "Latitude", "Longitude")
+USER_AGENT = "Mozilla/5.0 (compatible; Python scraper for NSMC events; +https://yourdomain.example)"
+# Polite defaults, at most this many requests in flight with a short pause after each one
+DEFAULT_CONCURRENCY = 4
+REQUEST_PAUSE_SEC = 0.25
+NUMERIC_COLUMNS = ["Latitude", "Longitude", "Magnitude", "Depth (km)"]
+
 
 def get_page(session, page_num: int, base_url: str = ""):
     """Fetch a given page number of events; returns BeautifulSoup of the page."""
@@ -50,28 +73,170 @@ def find_last_page(soup):
                 pass
     return max_page
 
-def scrape_all(output_csv: str, base_url: str = ""):
-    with requests.Session() as session:
-        # optional headers
-        session.headers.update({
-            "User-Agent": "Mozilla/5.0 (compatible; Python scraper for NSMC events; +https://yourdomain.example)"
-        })
+def _rows_bs4(html: str) -> list:
+    return [list(row.values()) for row in parse_table(BeautifulSoup(html, "html.parser"))]
+
+def _rows_lxml(html: str) -> list:
+    rows = []
+    for tr in lxml.html.fromstring(html).xpath("//table//tr")[1:]:
+        # same text as bs4 get_text(strip=True), stripped text pieces joined without separator
+        cols = ["".join(t.strip() for t in td.itertext()) for td in tr.findall("td")]
+        if len(cols) >= 9:
+            rows.append(cols[:9])
+    return rows
+
+def _rows_selectolax(html: str) -> list:
+    rows = []
+    for tr in HTMLParser(html).css("table tr")[1:]:
+        cols = [td.text(deep=True, separator="", strip=True) for td in tr.css("td")]
+        if len(cols) >= 9:
+            rows.append(cols[:9])
+    return rows
+
+PARSERS = {"bs4": _rows_bs4}
+if lxml is not None:
+    PARSERS["lxml"] = _rows_lxml
+if HTMLParser is not None:
+    PARSERS["selectolax"] = _rows_selectolax
+# Fastest available backend
+DEFAULT_PARSER = next(p for p in ("selectolax", "lxml", "bs4") if p in PARSERS)
+
+def parse_rows(html: str, parser: str = DEFAULT_PARSER) -> list:
+    """
+    Parse the events table of a page into row dicts (FIELDNAMES, text as shown on the page).
+
+    Parameters
+    ----------
+    html : str
+        Page source.
+    parser : str, optional
+        Backend from PARSERS: 'selectolax', 'lxml' (if installed) or 'bs4'.
+
+    Returns
+    -------
+    list
+        One dict per event row, same output as parse_table for every backend.
+    """
+    return [dict(zip(FIELDNAMES, cols)) for cols in PARSERS[parser](html)]
+
+def last_page_from_html(html: str) -> int:
+    """find_last_page on the page source, without building a parse tree."""
+    return max([1] + [int(n) for n in re.findall(r"(?<![\w-])page=(\d+)", html)])
+
+def events_to_frame(rows: list) -> pd.DataFrame:
+    """
+    Typed events table: floats for Latitude, Longitude, Magnitude and Depth (km) and a combined
+    'Datetime (utc)' column, unparsable values become NaN/NaT.
+    """
+    df = pd.DataFrame(rows, columns=FIELDNAMES)
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype(float)
+    df.insert(0, "Datetime (utc)", pd.to_datetime(df["Date"] + " " + df["Time (utc)"],
+                                                  utc=True, errors="coerce", format="mixed"))
+    return df
 
-        # determine how many pages
-        first_soup = get_page(session, 1, base_url)
-        last_page = find_last_page(first_soup)
+def parse_events(html: str, parser: str = DEFAULT_PARSER) -> pd.DataFrame:
+    """Parse a page straight into the typed events table, see parse_rows and events_to_frame."""
+    return events_to_frame(PARSERS[parser](html))
+
+def read_events_csv(path: str) -> pd.DataFrame:
+    """Load a CSV written by scrape_all as typed events table."""
+    return events_to_frame(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+def event_key(row: dict) -> tuple:
+    """Date + Time + Lat + Lon of an event row."""
+    return tuple(row[k].strip() for k in EVENT_KEY)
+
+def load_event_keys(output_csv: str) -> set:
+    """Keys of the events already stored in the CSV, empty if there is no CSV yet."""
+    if not os.path.exists(output_csv):
+        return set()
+    with open(output_csv, newline="", encoding="utf-8") as f:
+        return {event_key(row) for row in csv.DictReader(f)}
+
+async def get_page_async(client: httpx.AsyncClient, limit: asyncio.Semaphore, page_num: int, base_url: str = ""):
+    """Fetch a given page number of events, at most `limit` requests run at once; returns the page source."""
+    async with limit:
+        resp = await client.get(base_url, params={"page": page_num})
+        resp.raise_for_status()
+        # polite pause before the slot is released
+        await asyncio.sleep(REQUEST_PAUSE_SEC)
+    return resp.text
+
+async def scrape_all_async(output_csv: str, base_url: str = "",
+                           incremental: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                           parser: str = DEFAULT_PARSER):
+    """
+    Scrape the events table into a CSV over a pooled async HTTP client.
+
+    The full mode fetches page 1, detects the number of pages and fetches the remaining pages
+    concurrently, rows are written in page order. The incremental mode walks pages from the
+    newest events on and stops at the first page holding an event already in the CSV (keyed on
+    Date, Time, Latitude and Longitude), then puts the new events in front of the stored ones.
+    Without an existing CSV the incremental mode falls back to the full mode. Pages are parsed
+    with the given backend (see parse_rows).
+
+    Returns the number of events written (new events in incremental mode).
+    """
+    known = load_event_keys(output_csv) if incremental else set()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    limit = asyncio.Semaphore(concurrency)
+    transport = httpx.AsyncHTTPTransport(retries=2)
+
+    async with httpx.AsyncClient(headers={"User-Agent": USER_AGENT}, limits=limits,
+                                 transport=transport, timeout=20) as client:
+        first_html = await get_page_async(client, limit, 1, base_url)
+        last_page = last_page_from_html(first_html)
         print(f"Detected {last_page} pages of events.")
 
-        # open CSV and write header
-        with open(output_csv, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["Date","Time (utc)","Latitude","Longitude","Magnitude","Depth (km)","Region","Mode","Map"])
-            writer.writeheader()
-
-            # iterate each page
-            for page in range(1, last_page + 1):
-                print(f"Scraping page {page}/{last_page}")
-                soup = get_page(session, page, base_url)
-                for row in parse_table(soup):
-                    writer.writerow(row)
-                # polite pause
-                time.sleep(0.5)
+        if known:
+            new_rows = []
+            html, page = first_html, 1
+            while True:
+                rows = parse_rows(html, parser)
+                fresh = [row for row in rows if event_key(row) not in known]
+                new_rows.extend(fresh)
+                print(f"Page {page}/{last_page}: {len(fresh)} new events")
+                if len(fresh) < len(rows) or page >= last_page:
+                    break
+                page += 1
+                html = await get_page_async(client, limit, page, base_url)
+
+            if new_rows:
+                # New events go on top like on the website, the stored rows are copied over as is
+                tmp_csv = f"{output_csv}.{os.getpid()}.tmp"
+                with open(tmp_csv, mode="w", newline="", encoding="utf-8") as f, \
+                        open(output_csv, newline="", encoding="utf-8") as old:
+                    writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                    writer.writeheader()
+                    writer.writerows(new_rows)
+                    next(old)  # header
+                    f.writelines(old)
+                os.replace(tmp_csv, output_csv)
+            return len(new_rows)
+
+        tasks = [asyncio.create_task(get_page_async(client, limit, page, base_url))
+                 for page in range(2, last_page + 1)]
+        count = 0
+        try:
+            with open(output_csv, mode="w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                writer.writeheader()
+                # page 1 is reused from the page count request, the rest is awaited in order
+                for page, pending in enumerate([None] + tasks, start=1):
+                    html = first_html if pending is None else await pending
+                    print(f"Scraping page {page}/{last_page}")
+                    rows = parse_rows(html, parser)
+                    writer.writerows(rows)
+                    count += len(rows)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return count
+
+def scrape_all(output_csv: str, base_url: str = "",
+               incremental: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+               parser: str = DEFAULT_PARSER):
+    """Synchronous entry point for scrape_all_async."""
+    return asyncio.run(scrape_all_async(output_csv, base_url, incremental=incremental,
+                                        concurrency=concurrency, parser=parser))
@@ -0,0 +1,101 @@
+import math
+import warnings
+import numpy as np
+import plotly.graph_objects as go
+
+from typing import Optional, Sequence, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Vertices of one surface, plotly stays interactive well past this but the HTML grows with it
+DEFAULT_VERTEX_BUDGET = 250_000
+
+
+def lod_step(shape: Tuple[int, int], max_vertices: int = DEFAULT_VERTEX_BUDGET) -> int:
+    """Smallest decimation step keeping a rows x cols grid within `max_vertices`."""
+    rows, cols = shape
+    return max(1, math.ceil(math.sqrt(rows * cols / max_vertices)))
+
+def valid_bounds(grids: Sequence[np.ndarray]) -> Tuple[slice, slice]:
+    """Rows and columns holding data in any of the grids, NaN borders are cropped away."""
+    valid = np.any([~np.isnan(grid) for grid in grids], axis=0)
+    if not valid.any():
+        return slice(0, 0), slice(0, 0)
+    rows, cols = np.flatnonzero(valid.any(axis=1)), np.flatnonzero(valid.any(axis=0))
+    return slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1)
+
+def downsample(grid: np.ndarray, step: int) -> np.ndarray:
+    """Mean of step x step blocks ignoring NaNs, blocks without data stay NaN."""
+    if step == 1:
+        return grid.astype(np.float32)
+    rows, cols = grid.shape
+    padded = np.full((math.ceil(rows / step) * step, math.ceil(cols / step) * step), np.nan, dtype=np.float32)
+    padded[:rows, :cols] = grid
+    blocks = padded.reshape(padded.shape[0] // step, step, padded.shape[1] // step, step)
+    with warnings.catch_warnings():
+        # all-NaN blocks, expected outside the clipped area
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(blocks, axis=(1, 3)).astype(np.float32)
+
+def surface_animation(grids: Sequence[np.ndarray], labels: Sequence[str],
+                      max_vertices: int = DEFAULT_VERTEX_BUDGET, colorscale: str = "Viridis",
+                      frame_duration: int = 1000, transition_duration: int = 500,
+                      title: Optional[str] = None, z_title: Optional[str] = None) -> go.Figure:
+    """
+    A plotly 3D surface with one animation frame per grid.
+
+    The grids are cropped to their common data extent and block-averaged with the step fitting
+    `max_vertices`. The figure holds one Surface trace with 1-D x / y coordinates (grid rows and
+    columns, shared by every frame); frames only carry z, as float32 arrays that plotly writes
+    in its binary 'bdata' encoding. NaNs (no data) are kept and drawn as gaps.
+
+    Parameters
+    ----------
+    grids : Sequence[np.ndarray]
+        2-D grids of the same shape, NaN for no data.
+    labels : Sequence[str]
+        Frame names shown on the slider, one per grid.
+    max_vertices : int, optional
+        Vertex budget of the surface.
+    colorscale : str, optional
+        Plotly colorscale.
+    frame_duration, transition_duration : int, optional
+        Animation timing in milliseconds.
+    title, z_title : str, optional
+        Figure and z axis titles.
+
+    Returns
+    -------
+    go.Figure
+        The figure with its play button and slider.
+    """
+    labels = [str(label) for label in labels]
+    rows, cols = valid_bounds(grids)
+    grids = [np.asarray(grid, dtype=np.float32)[rows, cols] for grid in grids]
+    step = lod_step(grids[0].shape, max_vertices)
+    surfaces = [downsample(grid, step) for grid in grids]
+    # Grid indices of the block centres in the full-resolution raster
+    x = (cols.start + np.arange(surfaces[0].shape[1]) * step + (step - 1) / 2).astype(np.float32)
+    y = (rows.start + np.arange(surfaces[0].shape[0]) * step + (step - 1) / 2).astype(np.float32)
+    stack = np.stack(surfaces)
+    zmin, zmax = (float(np.nanmin(stack)), float(np.nanmax(stack))) if np.isfinite(stack).any() else (0.0, 1.0)
+    logger.info(f"Surface of {grids[0].shape} cells decimated by {step} to {surfaces[0].shape}")
+
+    fig = go.Figure(
+        data=[go.Surface(z=surfaces[0], x=x, y=y, colorscale=colorscale, cmin=zmin, cmax=zmax)],
+        frames=[go.Frame(data=[go.Surface(z=z)], traces=[0], name=label) for label, z in zip(labels, surfaces)],
+    )
+    animation = dict(mode='immediate', frame=dict(duration=frame_duration, redraw=True),
+                     transition=dict(duration=transition_duration))
+    fig.update_layout(
+        updatemenus=[dict(type='buttons', showactive=False,
+                          buttons=[dict(label='Play', method='animate', args=[None, dict(animation, fromcurrent=True)])])],
+        sliders=[dict(active=0, pad={"t": 50},
+                      steps=[dict(method='animate', label=label, args=[[label], animation]) for label in labels])],
+        title=title,
+        scene=dict(zaxis=dict(title=z_title, range=[zmin, zmax])),
+    )
+    return fig
@@ -0,0 +1,359 @@
+import time
+import sqlite3
+import argparse
+import threading
+import requests
+import mercantile
+import numpy as np
+import contextily as ctx
+import geopandas as gpd
+import xyzservices
+
+from typing import NamedTuple, Optional, Sequence, Tuple
+from collections import OrderedDict
+from pyproj import CRS, Transformer
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.logger import get_logger
+from src.utils.config import OFFLINE_TILES
+
+logger = get_logger(__name__)
+
+
+TILE_STORE_DIR = Path("data/tiles")
+USER_AGENT = "30DayMapChallenge-tile-store/0.1"
+# Guard against accidental bulk downloads, tile servers like OSM forbid scraping
+MAX_PREFETCH_TILES = 20000
+# Basemap mosaics kept in memory by fetch_basemap
+BASEMAP_CACHE_SIZE = 8
+
+
+class MBTiles:
+    """
+    Minimal MBTiles (SQLite) tile store, one file per tile provider.
+
+    Tiles are addressed with XYZ coordinates, rows are flipped to the TMS scheme MBTiles uses.
+    Every call opens its own connection so a store can be shared by server threads and by
+    days running in parallel.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+                         "tile_row INTEGER, tile_data BLOB)")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles "
+                         "(zoom_level, tile_column, tile_row)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                               (z, x, (1 << z) - 1 - y)).fetchone()
+        return row[0] if row else None
+
+    def missing_tiles(self, tiles: list) -> list:
+        """Subset of mercantile tiles not in the store yet."""
+        with self._connect() as conn:
+            stored = set(conn.execute("SELECT zoom_level, tile_column, tile_row FROM tiles"))
+        return [t for t in tiles if (t.z, t.x, (1 << t.z) - 1 - t.y) not in stored]
+
+    def put_tile(self, z: int, x: int, y: int, data: bytes):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", (z, x, (1 << z) - 1 - y, data))
+
+    def put_tiles(self, tiles) -> int:
+        """Store many (z, x, y, data) tuples in one transaction, returns the number of tiles."""
+        with self._connect() as conn:
+            cursor = conn.executemany("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                                      ((z, x, (1 << z) - 1 - y, data) for z, x, y, data in tiles))
+            return cursor.rowcount
+
+    def set_metadata(self, **values):
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                             [(k, str(v)) for k, v in values.items()])
+
+    def get_metadata(self) -> dict:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT name, value FROM metadata"))
+
+def store_path(provider: xyzservices.TileProvider, store_dir: Path = TILE_STORE_DIR) -> Path:
+    """MBTiles file of a provider, e.g. data/tiles/OpenStreetMap.Mapnik.mbtiles."""
+    return Path(store_dir) / f"{provider.name}.mbtiles"
+
+def fetch_tile(provider: xyzservices.TileProvider, z: int, x: int, y: int,
+               session: Optional[requests.Session] = None) -> bytes:
+    """Download a single tile from the provider's tile server."""
+    response = (session or requests).get(provider.build_url(x=x, y=y, z=z),
+                                         headers={"User-Agent": USER_AGENT}, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+def prefetch_tiles(provider: xyzservices.TileProvider,
+                   bbox: Tuple[float, float, float, float],
+                   min_zoom: int, max_zoom: int,
+                   store_dir: Path = TILE_STORE_DIR,
+                   max_tiles: int = MAX_PREFETCH_TILES,
+                   delay: float = 0.1) -> int:
+    """
+    Download all tiles of a bbox and zoom range into the provider's MBTiles store.
+
+    Parameters
+    ----------
+    provider : xyzservices.TileProvider
+        Tile provider, e.g. ctx.providers.OpenStreetMap.Mapnik.
+    bbox : Tuple[float, float, float, float]
+        (west, south, east, north) in degrees.
+    min_zoom, max_zoom : int
+        Zoom range, both included.
+    store_dir : Path, optional
+        Folder of the MBTiles files.
+    max_tiles : int, optional
+        Refuse to download more tiles than this in one go.
+    delay : float, optional
+        Seconds between requests, be polite to the tile server.
+
+    Returns
+    -------
+    int
+        Number of tiles downloaded, tiles already in the store are skipped.
+    """
+    west, south, east, north = bbox
+    tiles = list(mercantile.tiles(west, south, east, north, range(min_zoom, max_zoom + 1)))
+    store = MBTiles(store_path(provider, store_dir))
+    missing = store.missing_tiles(tiles)
+    logger.info(f"{len(tiles)} tiles in bbox for zoom {min_zoom}-{max_zoom}, {len(missing)} not in {store.path}")
+    if len(missing) > max_tiles:
+        raise ValueError(f"{len(missing)} tiles to download exceeds max_tiles={max_tiles}, "
+                         f"use a smaller bbox/zoom range or raise the limit")
+
+    with requests.Session() as session:
+        for i, tile in enumerate(missing, start=1):
+            store.put_tile(tile.z, tile.x, tile.y, fetch_tile(provider, tile.z, tile.x, tile.y, session))
+            if i % 100 == 0:
+                logger.info(f"Downloaded {i}/{len(missing)} tiles")
+            time.sleep(delay)
+
+    # Keep the MBTiles metadata describing the union of everything prefetched so far
+    metadata = store.get_metadata()
+    if "bounds" in metadata:
+        old = [float(v) for v in metadata["bounds"].split(",")]
+        west, south = min(west, old[0]), min(south, old[1])
+        east, north = max(east, old[2]), max(north, old[3])
+        min_zoom = min(min_zoom, int(metadata["minzoom"]))
+        max_zoom = max(max_zoom, int(metadata["maxzoom"]))
+    store.set_metadata(name=provider.name, type="baselayer", version="1.1",
+                       format="jpg" if ".jp" in provider.url else "png",
+                       attribution=provider.get("attribution", ""),
+                       bounds=f"{west},{south},{east},{north}", minzoom=min_zoom, maxzoom=max_zoom)
+    return len(missing)
+
+class _TileHandler(BaseHTTPRequestHandler):
+    """Serve '/<provider name>/<z>/<x>/<y>' from the MBTiles stores of _LocalTileServer."""
+    server: "_LocalTileServer"
+
+    def do_GET(self):
+        try:
+            name, z, x, y = self.path.strip("/").split("/")
+            z, x, y = int(z), int(x), int(y)
+            provider, store = self.server.stores[name]
+        except (ValueError, KeyError):
+            self.send_error(400, "Expected /<provider>/<z>/<x>/<y>")
+            return
+
+        data = store.get_tile(z, x, y)
+        if data is None and not self.server.offline:
+            # Read-through, tiles fetched while online are available offline afterwards
+            try:
+                data = fetch_tile(provider, z, x, y)
+                store.put_tile(z, x, y, data)
+            except requests.RequestException as e:
+                logger.warning(f"Fetching tile {name}/{z}/{x}/{y} failed - {e}")
+        if data is None:
+            logger.warning(f"Tile {name}/{z}/{x}/{y} not in {store.path}, prefetch it with src.utils.tile_store")
+            self.send_error(404, "Tile not in local store")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png" if data[:4] == b"\x89PNG" else "image/jpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+class _LocalTileServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, offline: bool):
+        super().__init__(("127.0.0.1", 0), _TileHandler)
+        self.offline = offline
+        self.stores = {}
+
+_server: Optional[_LocalTileServer] = None
+_server_lock = threading.Lock()
+
+def basemap_source(provider: xyzservices.TileProvider,
+                   store_dir: Path = TILE_STORE_DIR,
+                   offline: bool = OFFLINE_TILES) -> xyzservices.TileProvider:
+    """
+    Local stand-in for a contextily tile provider, backed by the provider's MBTiles store.
+
+    Tiles are served by a small HTTP server on localhost started on first use, so contextily
+    keeps doing the zoom selection, merging and warping. Tiles missing from the store are
+    downloaded and added to it, unless offline (OFFLINE_TILES in the environment) in which case
+    they fail, making renders deterministic and network free.
+
+    Parameters
+    ----------
+    provider : xyzservices.TileProvider
+        Tile provider, e.g. ctx.providers.OpenStreetMap.Mapnik.
+    store_dir : Path, optional
+        Folder of the MBTiles files.
+    offline : bool, optional
+        Only serve tiles already in the store.
+
+    Returns
+    -------
+    xyzservices.TileProvider
+        Provider to pass as source to ctx.add_basemap.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = _LocalTileServer(offline)
+            threading.Thread(target=_server.serve_forever, name="tile-store", daemon=True).start()
+            logger.debug(f"Local tile server listening on port {_server.server_port}")
+        if provider.name not in _server.stores:
+            _server.stores[provider.name] = (provider, MBTiles(store_path(provider, store_dir)))
+
+    local = xyzservices.TileProvider(provider)
+    local["url"] = f"http://127.0.0.1:{_server.server_port}/{provider.name}/{{z}}/{{x}}/{{y}}"
+    return local
+
+class Basemap(NamedTuple):
+    """Basemap mosaic ready for imshow: RGB(A) pixels, (left, right, bottom, top) extent and attribution."""
+    image: np.ndarray
+    extent: Tuple[float, float, float, float]
+    attribution: Optional[str]
+
+_basemaps: "OrderedDict[tuple, Basemap]" = OrderedDict()
+
+def fetch_basemap(extent: Sequence[float], zoom="auto", source: Optional[xyzservices.TileProvider] = None,
+                  crs="EPSG:3857") -> Basemap:
+    """
+    Basemap mosaic covering an extent, fetched once per process and kept in memory.
+
+    Same tiles and warping as ctx.add_basemap, but the mosaic is returned instead of drawn, so an
+    animation fetches and decodes its tiles once and draws the array on every frame
+    (draw_basemap). The last BASEMAP_CACHE_SIZE mosaics are kept, a second call with the same
+    extent, zoom, provider and CRS returns the stored one. The Basemap is a plain tuple of arrays
+    and can be handed to frame workers (see render_frames).
+
+    Parameters
+    ----------
+    extent : Sequence[float]
+        (xmin, xmax, ymin, ymax) to cover, in `crs`, e.g. ax.axis().
+    zoom : int | str, optional
+        Tile zoom level, 'auto' picks it from the extent like contextily.
+    source : xyzservices.TileProvider, optional
+        Tile provider, by default the local store of OpenStreetMap Mapnik (see basemap_source).
+    crs : optional
+        CRS of the extent and of the returned mosaic, by default Web Mercator.
+
+    Returns
+    -------
+    Basemap
+        image, extent (left, right, bottom, top) in `crs` and the provider attribution.
+    """
+    if source is None:
+        source = basemap_source(ctx.providers.OpenStreetMap.Mapnik)
+    crs = CRS.from_user_input(crs)
+    xmin, xmax, ymin, ymax = (float(value) for value in extent)
+    key = (xmin, xmax, ymin, ymax, zoom, source.get("url") if isinstance(source, dict) else str(source), crs.to_wkt())
+    if key in _basemaps:
+        _basemaps.move_to_end(key)
+        return _basemaps[key]
+
+    web_mercator = CRS.from_epsg(3857)
+    if crs != web_mercator:
+        left, bottom, right, top = Transformer.from_crs(crs, web_mercator, always_xy=True).transform_bounds(
+            xmin, ymin, xmax, ymax)
+    else:
+        left, bottom, right, top = xmin, ymin, xmax, ymax
+    image, image_extent = ctx.bounds2img(left, bottom, right, top, zoom=zoom, source=source, ll=False)
+    if crs != web_mercator:
+        image, image_extent = ctx.warp_tiles(image, image_extent, t_crs=crs)
+    logger.debug(f"Fetched a {image.shape[1]}x{image.shape[0]} basemap at zoom {zoom}")
+
+    basemap = Basemap(image, tuple(image_extent), source.get("attribution") if isinstance(source, dict) else None)
+    _basemaps[key] = basemap
+    if len(_basemaps) > BASEMAP_CACHE_SIZE:
+        _basemaps.popitem(last=False)
+    return basemap
+
+def draw_basemap(ax, basemap: Basemap, interpolation: str = "bilinear", attribution: bool = True, **kwargs):
+    """
+    Draw a fetched Basemap on an axes like ctx.add_basemap would, without touching its limits.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes in the CRS of the basemap.
+    basemap : Basemap
+        Mosaic from fetch_basemap.
+    interpolation : str, optional
+        Interpolation of the image.
+    attribution : bool, optional
+        Add the provider attribution text.
+    **kwargs
+        Passed to ax.imshow, e.g. alpha or zorder.
+
+    Returns
+    -------
+    matplotlib.image.AxesImage
+        The basemap image.
+    """
+    limits = ax.axis()
+    image = basemap.image[:, :, 0] if basemap.image.shape[2] == 1 else basemap.image
+    artist = ax.imshow(image, extent=basemap.extent, interpolation=interpolation, aspect=ax.get_aspect(), **kwargs)
+    ax.axis(limits)
+    if attribution and basemap.attribution:
+        ctx.add_attribution(ax, basemap.attribution)
+    return artist
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch basemap tiles into a local MBTiles store")
+    parser.add_argument("--provider", type=str, default="OpenStreetMap.Mapnik",
+                        help="xyzservices provider name, e.g. 'CartoDB.VoyagerNoLabels'")
+    bbox_group = parser.add_mutually_exclusive_group(required=True)
+    bbox_group.add_argument("--bbox", type=float, nargs=4, metavar=("WEST", "SOUTH", "EAST", "NORTH"),
+                            help="Bounding box in degrees")
+    bbox_group.add_argument("--bbox_from", type=str,
+                            help="Vector file whose total bounds are used as bounding box")
+    parser.add_argument("--zoom", type=int, nargs=2, metavar=("MIN", "MAX"), required=True,
+                        help="Zoom range, both included")
+    parser.add_argument("--store_dir", type=str, default=str(TILE_STORE_DIR), help="Folder of the MBTiles files")
+    parser.add_argument("--max_tiles", type=int, default=MAX_PREFETCH_TILES,
+                        help="Refuse to download more tiles than this")
+    args = parser.parse_args()
+
+    provider = xyzservices.providers.query_name(args.provider)
+    bbox = args.bbox
+    if args.bbox_from:
+        bbox = tuple(gpd.read_file(args.bbox_from).to_crs(epsg=4326).total_bounds)
+
+    count = prefetch_tiles(provider, bbox, args.zoom[0], args.zoom[1],
+                           store_dir=Path(args.store_dir), max_tiles=args.max_tiles)
+    logger.info(f"Downloaded {count} tiles to {store_path(provider, Path(args.store_dir))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import json
+import numpy as np
+import pandas as pd
+import shapely
+import geopandas as gpd
+
+from typing import List, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Web Mercator tiles are 256 px wide and cover 360 degrees at zoom 0
+TILE_SIZE = 256
+TOPOLOGY_OBJECT = "data"
+
+
+def pixel_size(zoom: float) -> float:
+    """Width of one screen pixel in degrees of longitude at a web map zoom level."""
+    return 360 / (TILE_SIZE * 2 ** zoom)
+
+def _json_properties(dataset: gpd.GeoDataFrame, properties: Optional[List[str]]) -> list:
+    """Attribute rows as JSON-safe dicts (NaN as null, timestamps as ISO strings)."""
+    columns = [c for c in dataset.columns if c != dataset.geometry.name] if properties is None else properties
+    if not columns:
+        return [{} for _ in range(len(dataset))]
+    return json.loads(pd.DataFrame(dataset[columns]).to_json(orient="records", date_format="iso"))
+
+def _junctions(rings: list, lines: list) -> np.ndarray:
+    """
+    Point keys where arcs have to be cut: points visited with different neighbours by different
+    rings or lines (where borders split or end) and line end points.
+    """
+    points, lows, highs = [], [], []
+    for ring in rings:
+        # open ring, neighbours wrap around
+        points.append(ring)
+        lows.append(np.minimum(np.roll(ring, 1), np.roll(ring, -1)))
+        highs.append(np.maximum(np.roll(ring, 1), np.roll(ring, -1)))
+    for line in lines:
+        inner = line[1:-1]
+        points.append(inner)
+        lows.append(np.minimum(line[:-2], line[2:]))
+        highs.append(np.maximum(line[:-2], line[2:]))
+    if not points:
+        ends = np.array([], dtype=np.int64)
+    else:
+        visits = np.unique(np.column_stack([np.concatenate(points), np.concatenate(lows),
+                                            np.concatenate(highs)]), axis=0)
+        keys, counts = np.unique(visits[:, 0], return_counts=True)
+        ends = keys[counts > 1]
+    line_ends = [line[[0, -1]] for line in lines]
+    return np.unique(np.concatenate([ends] + line_ends)) if line_ends else ends
+
+class _ArcIndex:
+    """Unique arcs by their point keys, an arc and its reverse are stored once."""
+
+    def __init__(self):
+        self.index = {}
+        self.arcs = []
+
+    def add(self, positions: np.ndarray, keys: np.ndarray) -> int:
+        forward = keys.tobytes()
+        if forward in self.index:
+            return self.index[forward]
+        backward = keys[::-1].tobytes()
+        if backward in self.index:
+            return ~self.index[backward]
+        self.index[forward] = len(self.arcs)
+        self.arcs.append(positions)
+        return len(self.arcs) - 1
+
+def _cut_ring(ring: np.ndarray, keys: np.ndarray, is_junction: np.ndarray, arcs: _ArcIndex) -> list:
+    """Arc references of a closed ring given as open point arrays."""
+    cuts = np.flatnonzero(is_junction)
+    if len(cuts) == 0:
+        # ring shares no border partially, start at its smallest point so a ring shared as a
+        # whole (enclaves) gets the same arc, or its reverse, in both polygons
+        cuts = np.array([int(np.argmin(keys))])
+    ring = np.roll(ring, -cuts[0], axis=0)
+    keys = np.roll(keys, -cuts[0])
+    cuts = np.append(cuts - cuts[0], len(keys))
+    closed, closed_keys = np.vstack([ring, ring[:1]]), np.append(keys, keys[0])
+    return [arcs.add(closed[a:b + 1], closed_keys[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+def _cut_line(line: np.ndarray, keys: np.ndarray, is_junction: np.ndarray, arcs: _ArcIndex) -> list:
+    """Arc references of a line string."""
+    cuts = np.flatnonzero(is_junction[1:-1]) + 1
+    cuts = np.concatenate([[0], cuts, [len(keys) - 1]])
+    return [arcs.add(line[a:b + 1], keys[a:b + 1]) for a, b in zip(cuts[:-1], cuts[1:])]
+
+def _simplify_arcs(arcs: list, tolerance: float) -> list:
+    """Douglas-Peucker on every arc once, end points are kept so shared borders stay shared."""
+    if tolerance <= 0 or not arcs:
+        return arcs
+    lines = shapely.linestrings(np.vstack(arcs), indices=np.repeat(np.arange(len(arcs)), [len(a) for a in arcs]))
+    simplified = shapely.simplify(lines, tolerance, preserve_topology=False)
+    coords, index = shapely.get_coordinates(simplified, return_index=True)
+    parts = np.split(coords.astype(np.int64), np.flatnonzero(np.diff(index)) + 1)
+    # closed arcs (whole rings) need 4 points to stay a ring
+    return [part if len(part) >= (4 if (arc[0] == arc[-1]).all() else 2) else arc
+            for arc, part in zip(arcs, parts)]
+
+def to_topojson(dataset: gpd.GeoDataFrame, max_zoom: float = 10, pixel_tolerance: float = 1.0,
+                quantize_pixels: float = 0.25, properties: Optional[List[str]] = None) -> dict:
+    """
+    Encode a GeoDataFrame as TopoJSON simplified for display up to a given zoom level.
+
+    Coordinates are snapped to a grid of `quantize_pixels` screen pixels at `max_zoom` and stored
+    as delta-encoded integers. Polygon rings and lines are cut into arcs wherever borders split,
+    every arc is stored and simplified once, so borders shared by neighbouring areas stay
+    identical (no gaps or slivers) and take half the space.
+
+    Parameters
+    ----------
+    dataset : gpd.GeoDataFrame
+        Polygons, lines or points, reprojected to EPSG:4326 if needed.
+    max_zoom : float, optional
+        Deepest zoom level the layer should look exact at.
+    pixel_tolerance : float, optional
+        Simplification tolerance in screen pixels at `max_zoom`, 0 disables simplification.
+    quantize_pixels : float, optional
+        Grid size of the stored coordinates in screen pixels at `max_zoom`.
+    properties : List[str], optional
+        Attribute columns to embed, by default all columns.
+
+    Returns
+    -------
+    dict
+        Topology with a single GeometryCollection object named TOPOLOGY_OBJECT.
+    """
+    if dataset.crs is not None and dataset.crs.to_epsg() != 4326:
+        dataset = dataset.to_crs(epsg=4326)
+
+    step = pixel_size(max_zoom) * quantize_pixels
+    minx, miny, maxx, maxy = dataset.total_bounds
+    if not np.isfinite(minx):
+        minx = miny = maxx = maxy = 0.0
+    stride = int(np.ceil((maxy - miny) / step)) + 1
+
+    def quantize(coords):
+        q = np.round((coords[:, :2] - (minx, miny)) / step).astype(np.int64)
+        # drop points that fall on the same grid cell as their predecessor
+        keep = np.ones(len(q), dtype=bool)
+        keep[1:] = (np.diff(q, axis=0) != 0).any(axis=1)
+        return q[keep]
+
+    # Pass 1: quantized rings and lines of every row
+    shapes, rings, lines = [], [], []
+    for geom in dataset.geometry.values:
+        if geom is None or geom.is_empty:
+            shapes.append(None)
+            continue
+        kind = geom.geom_type
+        if kind in ("Polygon", "MultiPolygon"):
+            polygons = []
+            for polygon in shapely.get_parts(geom):
+                ring_ids = []
+                for ring in shapely.get_rings(polygon):
+                    q = quantize(shapely.get_coordinates(ring))
+                    if len(q) < 4:
+                        # collapsed below the grid size, a lost exterior drops the polygon
+                        if not ring_ids:
+                            break
+                        continue
+                    ring_ids.append(len(rings))
+                    rings.append(q[:-1])
+                if ring_ids:
+                    polygons.append(ring_ids)
+            shapes.append(("Polygon", polygons) if polygons else None)
+        elif kind in ("LineString", "MultiLineString"):
+            line_ids = []
+            for part in shapely.get_parts(geom):
+                q = quantize(shapely.get_coordinates(part))
+                if len(q) >= 2:
+                    line_ids.append(len(lines))
+                    lines.append(q)
+            shapes.append(("LineString", line_ids) if line_ids else None)
+        elif kind in ("Point", "MultiPoint"):
+            q = np.round((shapely.get_coordinates(geom) - (minx, miny)) / step).astype(np.int64)
+            shapes.append(("Point", q.tolist()))
+        else:
+            logger.warning(f"Unsupported geometry type {kind} left out of the topology")
+            shapes.append(None)
+
+    # Pass 2: cut at junctions and deduplicate arcs
+    ring_keys = [r[:, 0] * stride + r[:, 1] for r in rings]
+    line_keys = [line[:, 0] * stride + line[:, 1] for line in lines]
+    junctions = _junctions(ring_keys, line_keys)
+    arcs = _ArcIndex()
+    ring_arcs = [_cut_ring(r, k, np.isin(k, junctions), arcs) for r, k in zip(rings, ring_keys)]
+    line_arcs = [_cut_line(line, k, np.isin(k, junctions), arcs) for line, k in zip(lines, line_keys)]
+
+    # Pass 3: simplify each arc once and delta-encode it
+    simplified = _simplify_arcs(arcs.arcs, pixel_tolerance / quantize_pixels)
+    encoded = [np.vstack([arc[:1], np.diff(arc, axis=0)]).tolist() for arc in simplified]
+
+    geometries = []
+    for shape, props in zip(shapes, _json_properties(dataset, properties)):
+        if shape is None:
+            geometry = {"type": None}
+        elif shape[0] == "Polygon":
+            polygons = [[ring_arcs[r] for r in ring_ids] for ring_ids in shape[1]]
+            geometry = ({"type": "Polygon", "arcs": polygons[0]} if len(polygons) == 1
+                        else {"type": "MultiPolygon", "arcs": polygons})
+        elif shape[0] == "LineString":
+            parts = [line_arcs[i] for i in shape[1]]
+            geometry = ({"type": "LineString", "arcs": parts[0]} if len(parts) == 1
+                        else {"type": "MultiLineString", "arcs": parts})
+        else:
+            geometry = ({"type": "Point", "coordinates": shape[1][0]} if len(shape[1]) == 1
+                        else {"type": "MultiPoint", "coordinates": shape[1]})
+        geometry["properties"] = props
+        geometries.append(geometry)
+
+    logger.debug(f"TopoJSON: {len(geometries)} features, {len(encoded)} arcs, "
+                 f"{sum(len(a) for a in arcs.arcs)} -> {sum(len(a) for a in encoded)} points")
+    return {
+        "type": "Topology",
+        "transform": {"scale": [step, step], "translate": [float(minx), float(miny)]},
+        "objects": {TOPOLOGY_OBJECT: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded,
+    }
+
+def _decode_ring(refs: list, arcs: list) -> np.ndarray:
+    parts = [arcs[r] if r >= 0 else arcs[~r][::-1] for r in refs]
+    return np.vstack([parts[0]] + [p[1:] for p in parts[1:]])
+
+def topojson_to_geodataframe(topology: dict, object_name: str = TOPOLOGY_OBJECT) -> gpd.GeoDataFrame:
+    """
+    Decode a topology written by to_topojson back into an EPSG:4326 GeoDataFrame.
+
+    Coordinates are rounded to the decimals the quantization grid resolves, so the GeoJSON
+    written from it stays short.
+    """
+    scale, translate = np.array(topology["transform"]["scale"]), np.array(topology["transform"]["translate"])
+    decimals = max(int(np.ceil(-np.log10(scale.min()))), 0)
+
+    def position(q):
+        return np.round(np.asarray(q, dtype=float).reshape(-1, 2) * scale + translate, decimals)
+
+    arcs = [position(np.cumsum(arc, axis=0)) for arc in topology["arcs"]]
+    geoms, rows = [], []
+    for obj in topology["objects"][object_name]["geometries"]:
+        kind = obj["type"]
+        if kind == "Polygon":
+            geom = shapely.Polygon(_decode_ring(obj["arcs"][0], arcs),
+                                   [_decode_ring(r, arcs) for r in obj["arcs"][1:]])
+        elif kind == "MultiPolygon":
+            geom = shapely.MultiPolygon([(_decode_ring(p[0], arcs), [_decode_ring(r, arcs) for r in p[1:]])
+                                         for p in obj["arcs"]])
+        elif kind == "LineString":
+            geom = shapely.LineString(_decode_ring(obj["arcs"], arcs))
+        elif kind == "MultiLineString":
+            geom = shapely.MultiLineString([_decode_ring(part, arcs) for part in obj["arcs"]])
+        elif kind == "Point":
+            geom = shapely.Point(position(obj["coordinates"])[0])
+        elif kind == "MultiPoint":
+            geom = shapely.MultiPoint(position(obj["coordinates"]))
+        else:
+            geom = None
+        geoms.append(geom)
+        rows.append(obj.get("properties", {}))
+    return gpd.GeoDataFrame(pd.DataFrame(rows), geometry=geoms, crs="EPSG:4326")
@@ -0,0 +1,492 @@
+import os
+import gzip
+import json
+import math
+import hashlib
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+import shapely
+import geopandas as gpd
+
+from typing import Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+
+from src.utils.logger import get_logger
+from src.utils.tile_store import MBTiles
+
+logger = get_logger(__name__)
+
+
+# Half the width of the Web Mercator world in meters
+MERCATOR_HALF_WORLD = 20037508.342789244
+# Latitude limit of the Web Mercator tile grid
+MAX_LATITUDE = 85.0511287798
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+# Layers with more features than this are better served as vector tiles than as inline GeoJSON/TopoJSON
+VECTOR_TILES_MIN_FEATURES = 20000
+# PMTiles v3: header size, the header plus the root directory must fit the first 16 KiB
+PMTILES_HEADER_SIZE = 127
+PMTILES_ROOT_MAX_BYTES = 16384 - PMTILES_HEADER_SIZE
+PMTILES_GZIP = 2
+PMTILES_MVT = 1
+# MVT geometry types and commands
+MVT_POINT, MVT_LINESTRING, MVT_POLYGON = 1, 2, 3
+MVT_MOVE_TO, MVT_LINE_TO, MVT_CLOSE_PATH = 1, 2, 7
+
+
+# Protocol buffer encoding, only what the vector tile schema needs
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited field (strings, messages, packed repeated values)."""
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+def _field_varint(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+def _packed(number: int, values: List[int]) -> bytes:
+    return _field(number, b"".join(_varint(v) for v in values))
+
+def _mvt_value(value) -> Optional[bytes]:
+    """Encoded Value message, None for missing values."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return _field_varint(7, int(value))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        return _field_varint(5, value) if value >= 0 else _field_varint(6, _zigzag(value))
+    if isinstance(value, (float, np.floating)):
+        return _varint((3 << 3) | 1) + np.float64(value).tobytes()
+    return _field(1, str(value).encode("utf-8"))
+
+# Geometry encoding, coordinates are integer tile pixels with y pointing down
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+def _encode_path(coords: np.ndarray, cursor: list, close: bool) -> list:
+    deltas = np.diff(np.vstack([cursor, coords]), axis=0)
+    cursor[:] = coords[-1]
+    params = [_zigzag(int(v)) for v in deltas.ravel()]
+    out = [_command(MVT_MOVE_TO, 1)] + params[:2]
+    if len(coords) > 1:
+        out += [_command(MVT_LINE_TO, len(coords) - 1)] + params[2:]
+    if close:
+        out.append(_command(MVT_CLOSE_PATH, 1))
+    return out
+
+def _encode_geometry(geom) -> Tuple[int, list]:
+    """MVT geometry type and command stream, (None, []) if nothing is left to draw."""
+    kind = geom.geom_type
+    cursor = [0, 0]
+    if kind in ("Point", "MultiPoint"):
+        coords = shapely.get_coordinates(geom).astype(np.int64)
+        deltas = np.diff(np.vstack([cursor, coords]), axis=0)
+        return MVT_POINT, [_command(MVT_MOVE_TO, len(coords))] + [_zigzag(int(v)) for v in deltas.ravel()]
+    if kind in ("LineString", "MultiLineString"):
+        stream = []
+        for line in shapely.get_parts(geom):
+            coords = shapely.get_coordinates(line).astype(np.int64)
+            if len(coords) >= 2:
+                stream += _encode_path(coords, cursor, close=False)
+        return (MVT_LINESTRING, stream) if stream else (None, [])
+    if kind in ("Polygon", "MultiPolygon"):
+        stream = []
+        for polygon in shapely.get_parts(geom):
+            # exterior rings need a positive area in tile coordinates, holes a negative one
+            polygon = shapely.geometry.polygon.orient(polygon, sign=1.0)
+            for ring in shapely.get_rings(polygon):
+                coords = shapely.get_coordinates(ring).astype(np.int64)[:-1]
+                if len(coords) >= 3:
+                    stream += _encode_path(coords, cursor, close=True)
+        return (MVT_POLYGON, stream) if stream else (None, [])
+    if kind == "GeometryCollection":
+        # clipping can return mixed parts, keep the ones of the dominant type
+        for part_type in ("Polygon", "LineString", "Point"):
+            parts = [g for g in shapely.get_parts(geom) if g.geom_type.endswith(part_type)]
+            if parts:
+                return _encode_geometry(shapely.union_all(parts) if part_type != "Point"
+                                        else shapely.MultiPoint(parts))
+    return None, []
+
+def _snap_to_grid(geometries: np.ndarray) -> np.ndarray:
+    """
+    Geometries repaired and rounded to the integer tile grid.
+
+    Simplified and clipped polygons are not always valid and GEOS can fail to snap them, such a
+    feature is dropped from the tile (returned empty) with a warning instead of aborting the export.
+    """
+    try:
+        return shapely.set_precision(shapely.make_valid(geometries), 1.0)
+    except shapely.errors.GEOSException:
+        snapped = np.empty(len(geometries), dtype=object)
+        for i, geom in enumerate(geometries):
+            try:
+                snapped[i] = shapely.set_precision(shapely.make_valid(geom), 1.0)
+            except shapely.errors.GEOSException as e:
+                logger.warning(f"Dropping a feature that cannot be snapped to the tile grid: {e}")
+                snapped[i] = shapely.GeometryCollection()
+        return snapped
+
+def encode_tile(layer_name: str, geometries: np.ndarray, properties: List[dict],
+                ids: np.ndarray, extent: int = TILE_EXTENT) -> bytes:
+    """
+    Encode one layer of geometries in tile pixel coordinates as a Mapbox Vector Tile (v2).
+
+    Parameters
+    ----------
+    layer_name : str
+        Name of the tile layer (the `dataLayer` of the style rules).
+    geometries : np.ndarray
+        Shapely geometries with integer coordinates in [0, extent), y pointing down.
+    properties : List[dict]
+        Attributes of every geometry.
+    ids : np.ndarray
+        Feature ids, the same feature keeps its id across tiles.
+    extent : int, optional
+        Tile size in coordinate units.
+
+    Returns
+    -------
+    bytes
+        The uncompressed tile.
+    """
+    keys, values, features = {}, {}, []
+    for geom, props, fid in zip(geometries, properties, ids):
+        geom_type, stream = _encode_geometry(geom)
+        if geom_type is None:
+            continue
+        tags = []
+        for key, value in props.items():
+            encoded = _mvt_value(value)
+            if encoded is None:
+                continue
+            tags += [keys.setdefault(key, len(keys)), values.setdefault(encoded, len(values))]
+        feature = _field_varint(1, int(fid)) + _field_varint(3, geom_type) + _packed(4, stream)
+        if tags:
+            feature += _packed(2, tags)
+        features.append(_field(2, feature))
+    if not features:
+        return b""
+    layer = (_field_varint(15, 2) + _field(1, layer_name.encode("utf-8")) + b"".join(features)
+             + b"".join(_field(3, k.encode("utf-8")) for k in keys)
+             + b"".join(_field(4, v) for v in values)
+             + _field_varint(5, extent))
+    return _field(3, layer)
+
+# Tiling
+
+def _tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    size = 2 * MERCATOR_HALF_WORLD / (1 << z)
+    minx = -MERCATOR_HALF_WORLD + x * size
+    maxy = MERCATOR_HALF_WORLD - y * size
+    return minx, maxy - size, minx + size, maxy
+
+def _tile_range(bounds: np.ndarray, z: int) -> np.ndarray:
+    """Tile columns/rows [x0, y0, x1, y1] covered by Mercator bounding boxes."""
+    size = 2 * MERCATOR_HALF_WORLD / (1 << z)
+    ranges = np.column_stack([(bounds[:, 0] + MERCATOR_HALF_WORLD) / size,
+                              (MERCATOR_HALF_WORLD - bounds[:, 3]) / size,
+                              (bounds[:, 2] + MERCATOR_HALF_WORLD) / size,
+                              (MERCATOR_HALF_WORLD - bounds[:, 1]) / size])
+    return np.clip(np.floor(ranges), 0, (1 << z) - 1).astype(np.int64)
+
+def generate_tiles(dataset: gpd.GeoDataFrame, min_zoom: int = 0, max_zoom: int = 12,
+                   layer_name: str = "layer", properties: Optional[List[str]] = None,
+                   feature_min_zoom: Optional[Union[str, pd.Series]] = None,
+                   pixel_tolerance: float = 1.0, min_pixel_area: float = 1.0,
+                   extent: int = TILE_EXTENT, buffer: int = TILE_BUFFER) -> Iterator[Tuple[int, int, int, bytes]]:
+    """
+    Cut a GeoDataFrame into vector tiles, zoom by zoom.
+
+    Every zoom level gets its own generalization: geometries are simplified with a tolerance of
+    `pixel_tolerance` screen pixels and polygons/lines smaller than `min_pixel_area` pixels
+    (or shorter than a pixel) are dropped, so low zoom tiles stay small.
+
+    Parameters
+    ----------
+    dataset : gpd.GeoDataFrame
+        Points, lines or polygons in any CRS.
+    min_zoom, max_zoom : int, optional
+        Zoom range of the pyramid, the map over-zooms max_zoom tiles beyond it.
+    layer_name : str, optional
+        Name of the tile layer.
+    properties : List[str], optional
+        Attribute columns written to the tiles, by default all. Fewer columns, smaller tiles.
+    feature_min_zoom : str | pd.Series, optional
+        Column (or values) with the first zoom level each feature appears at, e.g. motorways
+        from zoom 4 and primary roads from zoom 7.
+    pixel_tolerance : float, optional
+        Simplification tolerance in screen pixels.
+    min_pixel_area : float, optional
+        Polygons smaller than this many square pixels are left out of a zoom level.
+    extent, buffer : int, optional
+        Tile coordinate size and the margin kept around each tile, in tile units.
+
+    Yields
+    ------
+    Tuple[int, int, int, bytes]
+        z, x, y and the gzip-compressed tile, tiles without features are skipped.
+    """
+    dataset = dataset.to_crs(epsg=3857) if dataset.crs is not None else dataset.set_crs(epsg=3857)
+    dataset = dataset[~(dataset.geometry.isna() | dataset.geometry.is_empty)].reset_index(drop=True)
+    columns = [c for c in dataset.columns if c != dataset.geometry.name] if properties is None else properties
+    rows = json.loads(pd.DataFrame(dataset[columns]).to_json(orient="records", date_format="iso")) if columns \
+        else [{} for _ in range(len(dataset))]
+    rows = np.array(rows, dtype=object)
+    ids = np.arange(len(dataset)) + 1
+    first_zoom = np.full(len(dataset), min_zoom) if feature_min_zoom is None else \
+        np.asarray(dataset[feature_min_zoom] if isinstance(feature_min_zoom, str) else feature_min_zoom)
+
+    geoms = np.asarray(dataset.geometry.values)
+    type_ids = shapely.get_type_id(geoms)
+    is_polygon = np.isin(type_ids, (3, 6))
+    is_line = np.isin(type_ids, (1, 2, 5))
+
+    for z in range(min_zoom, max_zoom + 1):
+        pixel = 2 * MERCATOR_HALF_WORLD / (256 << z)
+        visible = first_zoom <= z
+        visible &= ~(is_polygon & (shapely.area(geoms) < min_pixel_area * pixel ** 2))
+        visible &= ~(is_line & (shapely.length(geoms) < pixel))
+        index = np.flatnonzero(visible)
+        if not len(index):
+            continue
+        simplified = shapely.simplify(geoms[index], pixel * pixel_tolerance, preserve_topology=True)
+        tree = shapely.STRtree(simplified)
+        ranges = _tile_range(shapely.bounds(simplified), z)
+        tiles = set()
+        for x0, y0, x1, y1 in ranges:
+            tiles.update((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+
+        size = 2 * MERCATOR_HALF_WORLD / (1 << z)
+        margin = size * buffer / extent
+        count = 0
+        for x, y in sorted(tiles):
+            minx, miny, maxx, maxy = _tile_bounds(z, x, y)
+            hits = tree.query(shapely.box(minx - margin, miny - margin, maxx + margin, maxy + margin))
+            if not len(hits):
+                continue
+            clipped = shapely.clip_by_rect(simplified[hits], minx - margin, miny - margin,
+                                           maxx + margin, maxy + margin)
+            # Mercator meters to tile units, y pointing down, snapped to the integer grid
+            clipped = shapely.transform(clipped, lambda c: np.column_stack(
+                [(c[:, 0] - minx) / size * extent, (maxy - c[:, 1]) / size * extent]))
+            clipped = _snap_to_grid(clipped)
+            keep = ~shapely.is_empty(clipped)
+            if not keep.any():
+                continue
+            data = encode_tile(layer_name, clipped[keep], rows[index[hits][keep]], ids[index[hits][keep]], extent)
+            if data:
+                count += 1
+                yield z, x, y, gzip.compress(data, mtime=0)
+        logger.debug(f"Zoom {z}: {len(index)} features, {count} tiles")
+
+# PMTiles v3 container
+
+def zxy_to_tile_id(z: int, x: int, y: int) -> int:
+    """PMTiles tile id: tiles of all lower zoom levels, then the Hilbert curve index."""
+    tile_id = ((1 << (2 * z)) - 1) // 3
+    for a in range(z - 1, -1, -1):
+        s = 1 << a
+        rx, ry = s & x, s & y
+        tile_id += ((3 * rx) ^ ry) << a
+        if ry == 0:
+            if rx:
+                x, y = s - 1 - x, s - 1 - y
+            x, y = y, x
+    return tile_id
+
+def _serialize_directory(entries: list) -> bytes:
+    """Entries are [tile_id, offset, length, run_length], gzip compressed like the tiles."""
+    out = [_varint(len(entries))]
+    last_id = 0
+    for tile_id, _, _, _ in entries:
+        out.append(_varint(tile_id - last_id))
+        last_id = tile_id
+    out += [_varint(e[3]) for e in entries]
+    out += [_varint(e[2]) for e in entries]
+    for i, (_, offset, _, _) in enumerate(entries):
+        contiguous = i > 0 and offset == entries[i - 1][1] + entries[i - 1][2]
+        out.append(_varint(0 if contiguous else offset + 1))
+    return gzip.compress(b"".join(out), mtime=0)
+
+def _build_directories(entries: list) -> Tuple[bytes, bytes]:
+    """Root directory and leaf directories, leaves are used when the root would not fit 16 KiB."""
+    root = _serialize_directory(entries)
+    if len(root) <= PMTILES_ROOT_MAX_BYTES:
+        return root, b""
+    leaf_size = 4096
+    while True:
+        root_entries, leaves = [], bytearray()
+        for start in range(0, len(entries), leaf_size):
+            leaf = _serialize_directory(entries[start:start + leaf_size])
+            root_entries.append([entries[start][0], len(leaves), len(leaf), 0])
+            leaves += leaf
+        root = _serialize_directory(root_entries)
+        if len(root) <= PMTILES_ROOT_MAX_BYTES:
+            return root, bytes(leaves)
+        leaf_size *= 2
+
+def clamp_bounds(bounds) -> list:
+    """WGS84 [west, south, east, north] with the latitudes clamped to the Web Mercator limit."""
+    west, south, east, north = (float(v) for v in bounds)
+    return [west, max(south, -MAX_LATITUDE), east, min(north, MAX_LATITUDE)]
+
+def _pmtiles_header(offsets: dict, counts: dict, min_zoom: int, max_zoom: int, bounds: np.ndarray) -> bytes:
+    e7 = [int(round(v * 1e7)) for v in clamp_bounds(bounds)]
+    center = [(e7[0] + e7[2]) // 2, (e7[1] + e7[3]) // 2]
+    fields = [offsets["root"], offsets["root_length"], offsets["metadata"], offsets["metadata_length"],
+              offsets["leaves"], offsets["leaves_length"], offsets["tiles"], offsets["tiles_length"],
+              counts["addressed"], counts["entries"], counts["contents"]]
+    header = b"PMTiles" + bytes([3]) + b"".join(int(v).to_bytes(8, "little") for v in fields)
+    header += bytes([1, PMTILES_GZIP, PMTILES_GZIP, PMTILES_MVT, min_zoom, max_zoom])
+    header += b"".join(v.to_bytes(4, "little", signed=True) for v in e7)
+    header += bytes([min_zoom]) + b"".join(v.to_bytes(4, "little", signed=True) for v in center)
+    assert len(header) == PMTILES_HEADER_SIZE
+    return header
+
+def _vector_layers(dataset: gpd.GeoDataFrame, layer_name: str, properties: Optional[List[str]],
+                   min_zoom: int, max_zoom: int) -> list:
+    columns = [c for c in dataset.columns if c != dataset.geometry.name] if properties is None else properties
+    fields = {}
+    for column in columns:
+        dtype = dataset[column].dtype
+        fields[column] = "Boolean" if pd.api.types.is_bool_dtype(dtype) else \
+            "Number" if pd.api.types.is_numeric_dtype(dtype) else "String"
+    return [{"id": layer_name, "fields": fields, "minzoom": min_zoom, "maxzoom": max_zoom}]
+
+def write_pmtiles(tiles: Iterator[Tuple[int, int, int, bytes]], path: Path, metadata: dict,
+                  min_zoom: int, max_zoom: int, bounds: np.ndarray) -> int:
+    """
+    Write gzip-compressed MVT tiles to a PMTiles v3 archive.
+
+    Identical tiles (e.g. the interior of a large polygon) are stored once and consecutive ones
+    are run-length encoded in the directory. Returns the number of tiles written.
+    """
+    path = Path(path)
+    tmp_tiles = path.with_suffix(f".{os.getpid()}.tiles.tmp")
+    entries, offsets_by_hash = [], {}
+    data_length = 0
+    try:
+        with open(tmp_tiles, "wb") as f:
+            # tiles come zoom by zoom, only one zoom level is held to sort it in tile id (Hilbert) order
+            for _, level in itertools.groupby(tiles, key=lambda t: t[0]):
+                for tile_id, data in sorted((zxy_to_tile_id(z, x, y), data) for z, x, y, data in level):
+                    digest = hashlib.sha256(data).digest()
+                    if digest in offsets_by_hash:
+                        offset = offsets_by_hash[digest]
+                    else:
+                        offset = offsets_by_hash[digest] = data_length
+                        f.write(data)
+                        data_length += len(data)
+                    last = entries[-1] if entries else None
+                    if last and last[1] == offset and last[0] + last[3] == tile_id:
+                        last[3] += 1
+                    else:
+                        entries.append([tile_id, offset, len(data), 1])
+
+        root, leaves = _build_directories(entries)
+        meta = gzip.compress(json.dumps(metadata).encode("utf-8"), mtime=0)
+        offsets = {"root": PMTILES_HEADER_SIZE, "root_length": len(root)}
+        offsets.update(metadata=offsets["root"] + len(root), metadata_length=len(meta))
+        offsets.update(leaves=offsets["metadata"] + len(meta), leaves_length=len(leaves))
+        offsets.update(tiles=offsets["leaves"] + len(leaves), tiles_length=data_length)
+        counts = {"addressed": sum(e[3] for e in entries), "entries": len(entries),
+                  "contents": len(offsets_by_hash)}
+
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as out, open(tmp_tiles, "rb") as f:
+            out.write(_pmtiles_header(offsets, counts, min_zoom, max_zoom, bounds))
+            out.write(root + meta + leaves)
+            while chunk := f.read(1 << 20):
+                out.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_tiles.unlink(missing_ok=True)
+    return counts["addressed"]
+
+def export_vector_tiles(dataset: gpd.GeoDataFrame, path: Union[str, Path],
+                        min_zoom: int = 0, max_zoom: int = 12, layer_name: Optional[str] = None,
+                        properties: Optional[List[str]] = None,
+                        feature_min_zoom: Optional[Union[str, pd.Series]] = None,
+                        pixel_tolerance: float = 1.0, min_pixel_area: float = 1.0) -> Path:
+    """
+    Export a GeoDataFrame as a vector tile pyramid, a PMTiles archive or an MBTiles database.
+
+    A PMTiles file next to the HTML map can be read by the browser tile by tile (HTTP range
+    requests), see folium_layers.add_vector_tile_layer. The format follows the file suffix.
+
+    Parameters
+    ----------
+    dataset : gpd.GeoDataFrame
+        Layer to export.
+    path : str | Path
+        Output file, '.pmtiles' or '.mbtiles'.
+    min_zoom, max_zoom : int, optional
+        Zoom range of the pyramid.
+    layer_name : str, optional
+        Name of the tile layer, by default the file name without suffix.
+    properties, feature_min_zoom, pixel_tolerance, min_pixel_area
+        Attribute filtering and generalization, see generate_tiles.
+
+    Returns
+    -------
+    Path
+        The written file.
+    """
+    path = Path(path)
+    layer_name = layer_name or path.stem
+    path.parent.mkdir(parents=True, exist_ok=True)
+    bounds = clamp_bounds(dataset.to_crs(epsg=4326).total_bounds if dataset.crs is not None else dataset.total_bounds)
+    tiles = generate_tiles(dataset, min_zoom, max_zoom, layer_name, properties, feature_min_zoom,
+                           pixel_tolerance, min_pixel_area)
+    vector_layers = _vector_layers(dataset, layer_name, properties, min_zoom, max_zoom)
+
+    if path.suffix == ".pmtiles":
+        count = write_pmtiles(tiles, path, {"name": layer_name, "vector_layers": vector_layers},
+                              min_zoom, max_zoom, bounds)
+    elif path.suffix == ".mbtiles":
+        path.unlink(missing_ok=True)
+        store = MBTiles(path)
+        count = store.put_tiles(tiles)
+        store.set_metadata(name=layer_name, format="pbf", minzoom=min_zoom, maxzoom=max_zoom,
+                           bounds=",".join(f"{v:.6f}" for v in bounds),
+                           center=f"{(bounds[0] + bounds[2]) / 2:.6f},{(bounds[1] + bounds[3]) / 2:.6f},{min_zoom}",
+                           json=json.dumps({"vector_layers": vector_layers}))
+    else:
+        raise ValueError(f"Unknown vector tile format {path.suffix!r}, use .pmtiles or .mbtiles")
+
+    logger.info(f"Wrote {count} tiles (zoom {min_zoom}-{max_zoom}) to {path}, "
+                f"{path.stat().st_size / 1e6:.1f} MB")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a vector layer as PMTiles/MBTiles vector tiles")
+    parser.add_argument("source", type=str, help="Any file GeoPandas can read")
+    parser.add_argument("output", type=str, help="Output .pmtiles or .mbtiles file")
+    parser.add_argument("--layer", type=str, default=None, help="Layer of a multi-layer source (gpkg/gdb)")
+    parser.add_argument("--zoom", type=int, nargs=2, default=[0, 12], metavar=("MIN", "MAX"), help="Zoom range")
+    parser.add_argument("--properties", type=str, nargs="*", default=None, help="Attribute columns to keep")
+    args = parser.parse_args()
+
+    dataset = gpd.read_file(args.source, layer=args.layer)
+    export_vector_tiles(dataset, args.output, min_zoom=args.zoom[0], max_zoom=args.zoom[1],
+                        properties=args.properties)
+
+
+if __name__ == "__main__":
+    main()
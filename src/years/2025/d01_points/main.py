@@ -9,30 +9,29 @@ from branca.element import Template, MacroElement
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
 from src.utils.map_helpers import provincial_colors
+from src.utils.folium_layers import add_geojson_layer, add_point_layer
+from src.utils.folium_sidecars import save_map
 
 logger = get_logger(__name__)
 
 
 # Define a function to compute radius based on attributes
-def compute_radius(row, min_radius=4, max_radius=20, scale_factor=1.0):
+def compute_radius(dataset, min_radius=4, max_radius=20, scale_factor=1.0):
     """
-    Compute radius in pixels (for CircleMarker) or meters (for Circle).
+    Compute radius in pixels (for CircleMarker) or meters (for Circle) for every row.
     """
-    # Choose attribute
-    val = None
-    if pd.notna(row.get('beds')):
-        val = row['beds']
-    elif pd.notna(row.get('rooms')):
-        val = row['rooms']
-    # Default if neither
-    if val is None:
-        return min_radius
+    # Choose attribute, beds first then rooms
+    val = pd.Series(float('nan'), index=dataset.index)
+    for column in ('rooms', 'beds'):
+        if column in dataset:
+            val = pd.to_numeric(dataset[column], errors='coerce').fillna(val)
     # Scale val to reasonable radius
     # Simple linear scaling: e.g., radius = min_radius + (val * scale_factor)
     radius = min_radius + (val * scale_factor)
-    # Cap it at max_radius
-    return min(radius, max_radius)
+    # Default if neither, cap it at max_radius
+    return radius.fillna(min_radius).clip(upper=max_radius)
 
 # Define a function to pick circle color based on amenity
 def amenity_color(value: str | None) -> str:
@@ -59,8 +58,11 @@ def create_html(admin, dataset, output_path):
     basemap = folium.Map(location=[center_lat, center_lon], zoom_start=5, tiles='OpenStreetMap')
 
     # Add the administrative boundaries layer
-    folium.GeoJson(
+    add_geojson_layer(
+        basemap,
         admin,
+        max_zoom=9,
+        properties=['NAME_1', 'count_institutes'],
         name='Administrative Boundaries',
         style_function=lambda feature: {
             'fillColor': provincial_colors.get(feature['properties']['NAME_1'], 'gray'),
@@ -72,30 +74,25 @@ def create_html(admin, dataset, output_path):
             fields=['NAME_1', 'count_institutes'], 
             aliases=['Province:', 'Educational Institues:']
         )
-    ).add_to(basemap)
-
-    # Iterate and add each point to the map
-    for _, row in dataset.iterrows():
-        lat = row.geometry.y
-        lon = row.geometry.x
-        pop_text = (
-            f"{row.get('name_en', 'Unknown')} <br>"
-            f"Type: {row.get('amenity', '')} <br>"
-            f"Name Ur: {row.get('name_ur', 'Unknown')} <br>"
-            f"OSM Type: {row.get('osm_type', 'Unknown')} <br>"
-            f"Hours: {row.get('opening_ho', '12:00')} <br>"
-            f"Address: {row.get('addr_full', row.get('NAME_1', 'Unknown'))} <br>"
-        )
-        radius = compute_radius(row, min_radius=4, max_radius=25, scale_factor=0.5)
-        folium.CircleMarker(
-            location=[lat, lon],
-            radius=radius,
-            color=amenity_color(row.get('amenity')),
-            fill=True,
-            fill_color=amenity_color(row.get('amenity')),
-            fill_opacity=0.6,
-            popup=folium.Popup(pop_text, max_width=300)
-        ).add_to(basemap)
+    )
+
+    # Add all points as one layer, popup fields are filled with defaults where missing
+    points = dataset.copy()
+    popup_defaults = {'name_en': 'Unknown', 'amenity': '', 'name_ur': 'Unknown',
+                      'osm_type': 'Unknown', 'opening_ho': '12:00'}
+    for column, default in popup_defaults.items():
+        points[column] = points[column].fillna(default) if column in points else default
+    fallback_address = points['NAME_1'] if 'NAME_1' in points else 'Unknown'
+    points['address'] = points['addr_full'].fillna(fallback_address) if 'addr_full' in points else fallback_address
+    add_point_layer(
+        basemap,
+        points,
+        radius=compute_radius(points, min_radius=4, max_radius=25, scale_factor=0.5).to_numpy(),
+        color=points['amenity'].map(amenity_color).to_numpy(),
+        popup_fields=list(popup_defaults) + ['address'],
+        popup_aliases=['Name:', 'Type:', 'Name Ur:', 'OSM Type:', 'Hours:', 'Address:'],
+        name='Educational Institutes',
+    )
     
     # Add title and legends
     # Build the dynamic HTML fragments separately
@@ -137,7 +134,7 @@ def create_html(admin, dataset, output_path):
     # Allows toggling between layers interactively
     folium.LayerControl().add_to(basemap)
     # Save the map to an HTML file
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
     
 
 def create_png(admin, dataset, output_path):
@@ -199,13 +196,11 @@ def generate_poi_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}!")
 
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_1.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
+    admin_gdf = load_admin_boundaries(level=1, columns=['COUNTRY', 'NAME_1', 'geometry'])
 
     # Ensure the CRS is WGS84 (EPSG:4326) so it works with Folium
     if admin_gdf is not None and admin_gdf.crs.to_string() != "EPSG:4326":
         admin_gdf = admin_gdf.to_crs(epsg=4326)
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'geometry']]
     
     # Load GeoJSON data for points of interest
     poi_shapefile_path = 'data/hotosm/hotosm_pak_points_of_interest_points_shp.shp'    
@@ -8,6 +8,10 @@ from matplotlib.patches import Patch
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.vector_tiles import export_vector_tiles, VECTOR_TILES_MIN_FEATURES
+from src.utils.folium_layers import add_vector_tile_layer, add_geojson_layer
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -27,24 +31,46 @@ def create_html(admin, dataset, output_path):
     # Create the Folium map, centered on Pakistan (admin boundaries center)
     basemap = folium.Map(location=[center_lat, center_lon], zoom_start=6, tiles='OpenStreetMap')
 
-    # Add hydro/rivers layer to map
-    folium.GeoJson(
-        dataset,
-        name='Railways and Highways - Pakistan',
-        style_function=lambda feature: {
-            'fillColor': 'none',
-            'color': 'purple' if feature['properties']['type'] == 'rail' else 'red',
-            'weight': 1,
-        },
-        highlight_function=lambda feature: {
-            "weight": 3,
-            "color": "red"
-        }
-    ).add_to(basemap)
+    # Add the rail/road network to the map
+    if len(dataset) >= VECTOR_TILES_MIN_FEATURES:
+        # Too many lines to embed, write vector tiles next to the html instead (no highlight,
+        # serve the folder over HTTP to open the map)
+        tiles_path = export_vector_tiles(dataset, f"{output_path}_railroad.pmtiles", min_zoom=4, max_zoom=12,
+                                         layer_name='railroad', properties=['type'])
+        add_vector_tile_layer(
+            basemap,
+            url=tiles_path.name,
+            data_layer='railroad',
+            geometry_type='line',
+            color='red',
+            color_property='type',
+            color_map={'rail': 'purple', 'road': 'red'},
+            max_data_zoom=12,
+            name='Railways and Highways - Pakistan'
+        )
+    else:
+        # GeoJSON (not TopoJSON) so the layer keeps its highlight on hover
+        add_geojson_layer(
+            basemap,
+            dataset,
+            encoding='geojson',
+            max_zoom=12,
+            properties=['type'],
+            name='Railways and Highways - Pakistan',
+            style_function=lambda feature: {
+                'fillColor': 'none',
+                'color': 'purple' if feature['properties']['type'] == 'rail' else 'red',
+                'weight': 1,
+            },
+            highlight_function=lambda feature: {
+                "weight": 3,
+                "color": "red"
+            }
+        )
 
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
     
 
 def create_png(admin, dataset, output_path):
@@ -111,9 +137,7 @@ def generate_lines_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
 
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_1.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'geometry']]
+    admin_gdf = load_admin_boundaries(level=1, columns=['COUNTRY', 'NAME_1', 'geometry'])
 
     # Load rails and roads layer from geopackage
     rail_gpkg_path = "data/PAK_misc/openstreetmap/openstreetmap_rail__PAK.gpkg"
@@ -11,6 +11,9 @@ from shapely.geometry import MultiPolygon, GeometryCollection, Polygon
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.folium_layers import add_geojson_layer
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -34,8 +37,11 @@ def create_folium_map(admin, dataset, output_path):
     basemap = folium.Map(location=[center_lat, center_lon], zoom_start=5, tiles='OpenStreetMap')
     
     # Add the administrative boundaries layer
-    folium.GeoJson(
+    add_geojson_layer(
+        basemap,
         admin,
+        max_zoom=9,
+        properties=['NAME_1'],
         name='Administrative Boundaries',
         style_function=lambda feature: {
             'fillColor': None,
@@ -47,11 +53,15 @@ def create_folium_map(admin, dataset, output_path):
             fields=['NAME_1'], 
             aliases=['Province:']
         )
-    ).add_to(basemap)
+    )
 
     # Add IPC polygons to the map
-    folium.GeoJson(
+    add_geojson_layer(
+        basemap,
         dataset,
+        max_zoom=9,
+        properties=['color', 'Area', 'Level 1', 'overall_phase', 'estimated_population', 'Percentage',
+                    'confidence_level', 'Date of analysis'],
         name='Acute Food Insecurity Areas Pakistan',
         style_function=lambda feature: {
             'fillColor': feature['properties']['color'],
@@ -66,7 +76,7 @@ def create_folium_map(admin, dataset, output_path):
                     'Confidence Level:', 'Date of Analysis:'],
             localize=True
         )
-    ).add_to(basemap)
+    )
 
     # Add legend for phases/colors
     title_html = '''
@@ -112,7 +122,7 @@ def create_folium_map(admin, dataset, output_path):
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
     # Save the map to an HTML file
-    basemap.save(output_path)
+    save_map(basemap, output_path)
 
 def create_png_map(admin, dataset, output_path):
     """
@@ -183,9 +193,7 @@ def generate_polygon_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
 
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_1.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'geometry']]
+    admin_gdf = load_admin_boundaries(level=1, columns=['COUNTRY', 'NAME_1', 'geometry'])
     
     # Load IPC Acute Food Insecurity layer dataset
     file_ipc_food_insecurity = "data/PAK_misc/AcuteFoodInsecurity_ipc_pak_area_long_latest.csv"
@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -68,7 +69,7 @@ def create_html(trips, output_path):
 
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
 
 # def create_png(trips, output_path):
 
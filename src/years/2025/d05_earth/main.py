@@ -9,6 +9,11 @@ from matplotlib.patches import Patch
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.tile_store import basemap_source
+from src.utils.folium_layers import add_geojson_layer, add_vector_tile_layer
+from src.utils.vector_tiles import export_vector_tiles, VECTOR_TILES_MIN_FEATURES
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -30,20 +35,31 @@ def create_html(admin, dataset, output_path):
     
     # TODO: join with admin boundaries to get names and areas for each admin unit
     # Add flood layer to map
-    folium.GeoJson(
-        dataset,
-        name='Flood Extents 2025',
-        style_function=lambda feature: {
-            'fillColor': 'blue',
-            'color': 'blue',
-            'weight': 1,
-        },
-        tooltip=folium.GeoJsonTooltip(
-            fields=['Area_ha', 'Area_m2', 'Sensor_ID', 'Sensor_Date'], 
-            aliases=['Area in Hectares', 'Area in meters', 'Sensor', 'Date'],
-            localize=True
-            )
-    ).add_to(basemap)
+    if len(dataset) >= VECTOR_TILES_MIN_FEATURES:
+        # Too many polygons to embed, write vector tiles next to the html instead (no tooltips,
+        # serve the folder over HTTP to open the map)
+        tiles_path = export_vector_tiles(dataset, f"{output_path}_floods.pmtiles", min_zoom=4, max_zoom=12,
+                                         layer_name='floods', properties=['Area_ha', 'Sensor_ID'])
+        add_vector_tile_layer(basemap, url=tiles_path.name, data_layer='floods', color='blue',
+                              weight=1, fill_opacity=0.5, max_data_zoom=12, name='Flood Extents 2025')
+    else:
+        add_geojson_layer(
+            basemap,
+            dataset,
+            max_zoom=11,
+            properties=['Area_ha', 'Area_m2', 'Sensor_ID', 'Sensor_Date'],
+            name='Flood Extents 2025',
+            style_function=lambda feature: {
+                'fillColor': 'blue',
+                'color': 'blue',
+                'weight': 1,
+            },
+            tooltip=folium.GeoJsonTooltip(
+                fields=['Area_ha', 'Area_m2', 'Sensor_ID', 'Sensor_Date'], 
+                aliases=['Area in Hectares', 'Area in meters', 'Sensor', 'Date'],
+                localize=True
+                )
+        )
 
     # Add title — can be done via Html in map
     title_html = f"""
@@ -53,7 +69,7 @@ def create_html(admin, dataset, output_path):
 
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
 
 def create_png(admin, dataset, output_path):
     """
@@ -80,7 +96,7 @@ def create_png(admin, dataset, output_path):
     )
     # add basemap (will respect current axis extent)
     # logger.debug(f"CTX providers - {ctx.providers.OpenStreetMap.keys()}")
-    ctx.add_basemap(ax, crs=admin.crs, source=ctx.providers.OpenStreetMap.Mapnik)
+    ctx.add_basemap(ax, crs=admin.crs, source=basemap_source(ctx.providers.OpenStreetMap.Mapnik))
     
     # plot polygons with colors
     dataset.plot(
@@ -123,12 +139,10 @@ def generate_earth_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
 
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_3.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
+    admin_gdf = load_admin_boundaries(level=3, columns=['COUNTRY', 'NAME_1', 'NAME_3','geometry'])
     # Ensure the CRS is WGS84 (EPSG:4326) so it works with Folium
     if admin_gdf is not None and admin_gdf.crs.to_string() != "EPSG:4326":
         admin_gdf = admin_gdf.to_crs(epsg=4326)
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'NAME_3','geometry']]
 
     # Geodatabase path
     gdb_path = "data/PAK_misc/FL20250818PAK.gdb"
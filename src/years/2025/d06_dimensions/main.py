@@ -1,19 +1,19 @@
 import numpy as np
 import rasterio
-import geopandas as gpd
-import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 
 from pathlib import Path
 from rasterio.mask import mask
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.surfaces import DEFAULT_VERTEX_BUDGET, surface_animation
 
 
 logger = get_logger(__name__)
 
 
-def create_html(dataset,output_path):
+def create_html(dataset, output_path, max_vertices=DEFAULT_VERTEX_BUDGET):
     """
     """
     # Create plotly figure for a single year
@@ -35,51 +35,14 @@ def create_html(dataset,output_path):
     # fig.show()
 
 
-    # Create X, Y grid
-    nrows, ncols = dataset[0].shape
-    x = np.arange(ncols)
-    y = np.arange(nrows)
-    X, Y = np.meshgrid(x, y)
-
-    # Create frames for all years
-    fig = go.Figure()
-    for year, sub in zip([2015, 2020, 2025, 2030], dataset):
-        fig.add_trace(go.Surface(
-            z=sub,
-            x=X,
-            y=Y,
-            colorscale='Viridis',
-            visible=(year==2015)
-        ))
-    # create frames
-    frames = []
-    for i, (year, sub) in enumerate(zip([2015, 2020, 2025, 2030], dataset)):
-        frames.append(go.Frame(data=[go.Surface(z=sub, x=X, y=Y, colorscale='Viridis')], name=str(year)))
-    fig.frames = frames
-
-    # slider
-    steps = []
-    for i, year in enumerate([2015, 2020, 2025, 2030]):
-        steps.append(dict(method='animate',
-                    label=str(year),
-                    args=[[str(year)],
-                            dict(mode='immediate', frame=dict(duration=1000, redraw=True),
-                                transition=dict(duration=500))]))
-    fig.update_layout(
-        updatemenus=[dict(type='buttons',
-                        showactive=False,
-                        buttons=[dict(label='Play',
-                                        method='animate',
-                                        args=[None, dict(frame=dict(duration=1000, redraw=True), 
-                                                        transition=dict(duration=500),
-                                                        fromcurrent=True,
-                                                        mode='immediate')])])],
-        sliders=[dict(active=1, pad={"t": 50}, steps=steps)]
-    )
-
-    fig.update_layout(
+    # One surface trace animated through the years, decimated to fit the vertex budget
+    fig = surface_animation(
+        dataset,
+        labels=[2015, 2020, 2025, 2030],
+        max_vertices=max_vertices,
+        colorscale='Viridis',
         title='Pakistan Population Density: 2015 → 2030 (3D)',
-        scene=dict(zaxis_title='Density per grid cell')
+        z_title='Density per grid cell'
     )
     # fig.show()
     fig.write_html(f"{output_path}.html")
@@ -90,16 +53,13 @@ def generate_dimensions_map(path_dir: str, filename: str):
     """
     logger.info(f"Generating {path_dir}")
     
-    # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_3.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
+    # Load pakistan admin boundaries, only for a district to focus the map and plot population density over time
+    isb_gdf = load_admin_boundaries(level=3, columns=['NAME_3', 'geometry'],
+                                    filters={'NAME_3': 'Shikarpur'})
 
     # Ensure the CRS is WGS84 (EPSG:4326) so it works with Folium
-    if admin_gdf is not None and admin_gdf.crs.to_string() != "EPSG:4326":
-        admin_gdf = admin_gdf.to_crs(epsg=4326)
-
-    # Filter for a district to focus the map and plot population density over time    
-    isb_gdf = admin_gdf[admin_gdf['NAME_3'] == 'Shikarpur']
+    if isb_gdf is not None and isb_gdf.crs.to_string() != "EPSG:4326":
+        isb_gdf = isb_gdf.to_crs(epsg=4326)
 
     # Load population density raster data for Islamabad# 2. Load population density raster for year 2015 and 2020
     r2015 = rasterio.open("data/PAK_misc/pak_pop_2015_CN_100m_R2025A_v1.tif")
@@ -113,26 +73,19 @@ def generate_dimensions_map(path_dir: str, filename: str):
     out_image2025, _ = mask(r2025, isb_gdf.geometry, crop=True)
     out_image2030, _ = mask(r2030, isb_gdf.geometry, crop=True)
 
-    # Prepare data for 3D surface
-    # Use downsample to make manageable size
-    data2015 = out_image2015[0]
-    data2020 = out_image2020[0]
-    data2025 = out_image2025[0]
-    data2030 = out_image2030[0]
+    # Prepare data for 3D surface, create_html picks the downsampling from its vertex budget
+    data2015 = out_image2015[0].astype(np.float32)
+    data2020 = out_image2020[0].astype(np.float32)
+    data2025 = out_image2025[0].astype(np.float32)
+    data2030 = out_image2030[0].astype(np.float32)
     # Mask no-data
     data2015 = np.where(data2015 < 0, np.nan, data2015)
     data2020 = np.where(data2020 < 0, np.nan, data2020)
     data2025 = np.where(data2025 < 0, np.nan, data2025)
     data2030 = np.where(data2030 < 0, np.nan, data2030)
-    # Downsample for speed
-    step = 10
-    sub2015 = data2015[::step, ::step]
-    sub2020 = data2020[::step, ::step]
-    sub2025 = data2025[::step, ::step]
-    sub2030 = data2030[::step, ::step]
     
     # generate an iterable dataset
-    dataset = [sub2015, sub2020, sub2025, sub2030]
+    dataset = [data2015, data2020, data2025, data2030]
 
     # Generate and Save 3D mapping
     output_path = f"{Path(path_dir).parent}/{filename}"
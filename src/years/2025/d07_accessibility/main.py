@@ -10,6 +10,7 @@ from shapely.ops import linemerge, unary_union
 from rasterio.plot import reshape_as_image
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -117,7 +118,7 @@ def create_html(route, output_path):
                             """)
     ).add_to(basemap)
 
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
 
 def create_png(route_gdf, output_path):
     """Create the figure and save to PNG."""
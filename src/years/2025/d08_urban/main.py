@@ -6,7 +6,10 @@ from pathlib import Path
 from shapely.geometry import box
 from rasterio.plot import reshape_as_image
 from src.utils.logger import get_logger
-from src.utils.helpers import get_relative_path
+from src.utils.helpers import get_relative_path, cache_artifact
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.folium_layers import add_geojson_layer
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -32,8 +35,11 @@ def create_html(admin, dataset, output_path):
     
     # Add admin boundaries to the map
      # Add urban area polygons to the map
-    folium.GeoJson(
+    add_geojson_layer(
+        basemap,
         admin,
+        max_zoom=11,
+        properties=['NAME_3', 'green_pct'],
         name="Urban Areas",
         style_function=lambda feature: {
             'fillColor': 'black',
@@ -45,11 +51,14 @@ def create_html(admin, dataset, output_path):
             aliases=['Urban Area:', 'Green Area Percentage:'],
             localize=True
         )
-    ).add_to(basemap)
+    )
     
     # Add natural green spaces to the map
-    folium.GeoJson(
+    add_geojson_layer(
+        basemap,
         dataset,
+        max_zoom=13,
+        properties=['name', 'type', 'NAME_3'],
         name="Natural Green Spaces",
         style_function=lambda feature: {
             'fillColor': 'green',
@@ -62,12 +71,12 @@ def create_html(admin, dataset, output_path):
             aliases=['Name:', 'Type:', 'District:'],
             localize=True
         )
-    ).add_to(basemap)
+    )
 
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
     # Save and exit
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
 
 def create_png(admin, dataset, output_path):
     """
@@ -77,20 +86,24 @@ def create_png(admin, dataset, output_path):
     center_lat = (bounds[1] + bounds[3]) / 2
     center_lon = (bounds[0] + bounds[2]) / 2
 
+@cache_artifact()
+def intersect_layers(layer, mask):
+    """
+    Intersection overlay of two layers, cached on both inputs as it dominates the runtime
+    """
+    return gpd.overlay(layer, mask, how="intersection")
+
 def generate_urban_map(path_dir: str, filename: str):
     """    
     """
     logger.info(f"Generating {path_dir}")
     
     # Load the shapefile for pakistan admin boundaries
-    admin_shp_path = "data/pakistan_admin/gadm41_PAK_3.shp"
-    admin_gdf = gpd.read_file(admin_shp_path)
-
     # Filter for urban areas of interest: Islamabad, Lahore, Karachi
     admin_of_interest = ['Islamabad', 'Lahore', 'Karachi']
-    admin_gdf = admin_gdf[admin_gdf['NAME_2'].isin(admin_of_interest)]
-    admin_gdf = admin_gdf.reset_index(drop=True)
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'NAME_2', 'NAME_3', 'TYPE_3', 'geometry']]
+    admin_gdf = load_admin_boundaries(level=3,
+                                      columns=['COUNTRY', 'NAME_1', 'NAME_2', 'NAME_3', 'TYPE_3', 'geometry'],
+                                      filters={'NAME_2': admin_of_interest})
 
     # Load the natural spaces shapefile
     natural_shp_path = "data/PAK_misc/natural.shp"
@@ -106,7 +119,7 @@ def generate_urban_map(path_dir: str, filename: str):
     gdf_green = green_gdf.to_crs(epsg=32643)
 
     # Compute intersection between admin units and green areas
-    gdf_intersection = gpd.overlay(gdf_admin, gdf_green, how="intersection")
+    gdf_intersection = intersect_layers(gdf_admin, gdf_green)
 
     # Compute area (in square meters)
     gdf_admin["admin_area_m2"] = gdf_admin.geometry.area
@@ -136,7 +149,7 @@ def generate_urban_map(path_dir: str, filename: str):
     # --------------------------------------------------------------------------------------
 
     # Clip natural green spaces to urban areas
-    green_urban_gdf = gpd.overlay(green_gdf, admin_gdf, how='intersection')
+    green_urban_gdf = intersect_layers(green_gdf, admin_gdf)
     green_urban_gdf = green_urban_gdf.reset_index(drop=True)
 
     # Generate and save maps
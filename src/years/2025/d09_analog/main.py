@@ -1,14 +1,15 @@
 import folium
 import rasterio
-import numpy as np
-import geopandas as gpd
 import matplotlib.pyplot as plt
 
 from pathlib import Path
-from rasterio.plot import reshape_as_image
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.folium_layers import add_geojson_layer, add_raster_tile_layer
+from src.utils.raster_tiles import export_raster_tiles
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -28,20 +29,15 @@ def create_html(admin, maps_info, output_path):
         
         with rasterio.open(map['path']) as src:
             bounds = src.bounds
-            img = src.read()
             crs = src.crs
         
         # logger.info(f"Raster CRS: {crs}")
         # logger.info(f"Raster bounds: {bounds}")
-        # logger.info(f"Raster img shape: {img.shape}")
-        
-        # Reshape the image for proper display (bands, rows, cols) -> (rows, cols, bands)
-        img = reshape_as_image(img)
-        # logger.info(f"Raster reshaped shape: {img.shape}")
 
-        # Normalize image values to 0–1 for display
-        img = img.astype(float)
-        img = (img - np.nanmin(img)) / (np.nanmax(img) - np.nanmin(img))
+        # Cut the raster into XYZ tiles next to the html, read block by block and streamed
+        # by the browser at the zoom being viewed instead of one embedded image
+        tile_dir = export_raster_tiles(map['path'], f"{output_path}_tiles/{Path(map['path']).stem}",
+                                       bounds=map.get('bounds'), min_zoom=3)
 
         # Calculate a center for the map, e.g., the mean of the bounds
         center_lat = (bounds[1] + bounds[3]) / 2
@@ -50,19 +46,21 @@ def create_html(admin, maps_info, output_path):
             # Create base folium map 
             basemap = folium.Map(location=[center_lat, center_lon], zoom_start=6, tiles='OpenStreetMap')
 
-        folium.raster_layers.ImageOverlay(
+        add_raster_tile_layer(
+            basemap,
+            tile_dir,
+            url=f"{Path(output_path).name}_tiles/{tile_dir.name}",
             name="Ancient India Map",
-            image=img,
-            bounds=[[bounds[1], bounds[0]], [bounds[3], bounds[2]]],  # [[lat_min, lon_min], [lat_max, lon_max]]
             opacity=0.7,
-            interactive=True,
-            cross_origin=False,
-            zindex=1
-        ).add_to(basemap)
+            z_index=1
+        )
 
     # Add the administrative boundaries layer
-    folium.GeoJson(
+    add_geojson_layer(
+        basemap,
         admin,
+        max_zoom=9,
+        properties=[],
         name='Administrative Boundaries',
         style_function=lambda feature: {
             'fillColor': 'none',
@@ -70,12 +68,12 @@ def create_html(admin, maps_info, output_path):
             'weight': 1,
             'dashArray': '5, 5'
         }
-    ).add_to(basemap)
+    )
 
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
     # Save and exit
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
 
 def create_png(admin, raster_map, output_path):
     """
@@ -121,9 +119,7 @@ def generate_analog_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
 
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_1.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'geometry']]
+    admin_gdf = load_admin_boundaries(level=1, columns=['COUNTRY', 'NAME_1', 'geometry'])
 
     # List of analog maps with approximate name/time label
     # if the maps are not georeferenced then define boundingbbox
@@ -9,15 +9,57 @@ import branca.colormap as cm
 import matplotlib.colors as mcolors
 
 from io import BytesIO
-from folium import plugins
 from pathlib import Path
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.tile_store import basemap_source, fetch_basemap, draw_basemap
+from src.utils.folium_sidecars import save_map
+from src.utils.folium_layers import add_time_choropleth
+from src.utils.frame_pool import render_frames
 
 
 logger = get_logger(__name__)
 
 
+def setup_frame_figure(base_geom, basemap):
+    """
+    Figure reused for every frame of the animation, built once per frame worker.
+    """
+    fig, ax = plt.subplots(figsize=(8,6))
+    return fig, ax, base_geom, basemap
+
+def draw_frame(state, frame):
+    """
+    Draw one (geometry, colour, title) frame over the basemap and return the saved image.
+    """
+    fig, ax, base_geom, basemap = state
+    geometry, color, title = frame
+    ax.clear()
+
+    # Set axis limits to your geometry bounds
+    # minx, miny, maxx, maxy = base_geom.bounds
+    # ax.set_xlim(minx-1000, maxx+1000)  # small buffer
+    # ax.set_ylim(miny-1000, maxy+1000)
+
+    # Plot base polygon
+    gpd.GeoSeries(base_geom).plot(ax=ax, color='lightgrey', edgecolor='black', zorder=2)
+    # Plot AQI polygon
+    gpd.GeoSeries(geometry).plot(ax=ax, color=color, zorder=3)
+
+    # Now add the basemap fetched once for the animation (respects the current axis extent)
+    draw_basemap(ax, basemap)
+
+    ax.set_title(title, fontsize=14)
+    ax.axis('off')
+
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=150)
+    buf.seek(0)
+    image = imageio.v2.imread(buf)
+    buf.close()
+    return image
+
 def create_animation(dataset, column, output_path, freq='Q', use_cache=False):
     """
     Creates a GIF animation of a GeoDataFrame column over time with optional aggregation and caching.
@@ -51,7 +93,7 @@ def create_animation(dataset, column, output_path, freq='Q', use_cache=False):
     # Assign a source map provider
     # logger.info(f"CTX Providers: {ctx.providers.keys()}")
     # logger.info(f"CTX Providers: {ctx.providers.OpenStreetMap.keys()}")
-    map_provider = ctx.providers.OpenStreetMap.Mapnik
+    map_provider = basemap_source(ctx.providers.OpenStreetMap.Mapnik)
 
     # Normalize for colormap
     vmin = dataset[column].min()
@@ -61,46 +103,30 @@ def create_animation(dataset, column, output_path, freq='Q', use_cache=False):
 
     # Base geometry
     base_geom = dataset.geometry.iloc[0]
+    # Basemap tiles of the area are fetched once and drawn on every frame, the extent matches
+    # the axis limits of a frame (geometry bounds plus matplotlib's default margins)
+    minx, miny, maxx, maxy = dataset.total_bounds
+    pad_x, pad_y = (maxx - minx) * plt.rcParams["axes.xmargin"], (maxy - miny) * plt.rcParams["axes.ymargin"]
+    basemap = fetch_basemap((minx - pad_x, maxx + pad_x, miny - pad_y, maxy + pad_y), zoom=11, source=map_provider)
 
     # Optional cache folder
     if use_cache:
-        cache_dir = os.path.join(out_path, '.cache')
+        cache_dir = os.path.join(output_path, '.cache')
         os.makedirs(cache_dir, exist_ok=True)
         temp_files = []
 
     frames = []
-
-    for i, row in dataset.iterrows():
-        fig, ax = plt.subplots(figsize=(8,6))
-
-        # Set axis limits to your geometry bounds
-        # minx, miny, maxx, maxy = base_geom.bounds
-        # ax.set_xlim(minx-1000, maxx+1000)  # small buffer
-        # ax.set_ylim(miny-1000, maxy+1000)
-
-        # Plot base polygon
-        gpd.GeoSeries(base_geom).plot(ax=ax, color='lightgrey', edgecolor='black', zorder=2)
-        # Plot AQI polygon
-        gpd.GeoSeries(row.geometry).plot(ax=ax, color=cmap(norm(row[column])), zorder=3)
-
-        # Now add basemap (will respect current axis extent)
-        ctx.add_basemap(ax, source=map_provider, zoom=11)
-
-        ax.set_title(f"{column} on {row['Date'].strftime('%Y-%m-%d')}", fontsize=14)
-        ax.axis('off')
-
+    # One (geometry, colour, title) per row, rendered in parallel on warm figures (see render_frames)
+    frame_args = [(row.geometry, cmap(norm(row[column])), f"{column} on {row['Date'].strftime('%Y-%m-%d')}")
+                  for _, row in dataset.iterrows()]
+    rendered = render_frames(setup_frame_figure, draw_frame, frame_args, setup_args=(base_geom, basemap))
+    for i, frame in enumerate(rendered):
         if use_cache:
             filename = os.path.join(cache_dir, f"frame_{i}.png")
-            plt.savefig(filename, bbox_inches='tight', dpi=150)
+            imageio.v2.imwrite(filename, frame)
             temp_files.append(filename)
-            plt.close()
         else:
-            buf = BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-            plt.close(fig)
-            buf.seek(0)
-            frames.append(imageio.v2.imread(buf))
-            buf.close()
+            frames.append(frame)
 
     # Save GIF
     gif_name = os.path.join(output_path, f"Average_{column}_timeseries_{freq}.gif")
@@ -134,49 +160,26 @@ def create_heatmap_folium(dataset, index_column, path_dir, file_html, center_lat
         center_lat = dataset.geometry.centroid.y
         center_lon = dataset.geometry.centroid.x
 
-    # Create a GeoJSON FeatureCollection for TimestampedGeoJson
-    # Create features for TimestampedGeoJson
-    features = []
-    for _, row in dataset.iterrows():
-        # Convert polygon to GeoJSON-like mapping
-        geom = row['geometry'].__geo_interface__
-
-        feature = {
-            'type': 'Feature',
-            'geometry': geom,
-            'properties': {
-                'time': row['Date'].strftime('%Y-%m-%d'),
-                'style': {
-                    'fillColor': colormap(row[index_column]),
-                    'color': 'black',
-                    'weight': 1,
-                    'fillOpacity': 0.7
-                },
-                'popup': f"{index_column}I: {row[index_column]:.1f}"
-            }
-        }
-        features.append(feature)
-
-    geojson = {
-        'type': 'FeatureCollection',
-        'features': features
-    }
-    
     # Center the map on the city
     basemap = folium.Map(location=[center_lat, center_lon], zoom_start=10, tiles='OpenStreetMap')
 
-    # Add TimestampedGeoJson
-    plugins.TimestampedGeoJson(
-        geojson,
+    # Time slider choropleth, the polygon is stored once and restyled for each day
+    add_time_choropleth(
+        basemap,
+        dataset,
+        time_column='Date',
+        value_column=index_column,
+        colormap=colormap,
+        key_column='NAME_3',
+        name=f"Daily {index_column}",
         period='P1D',       # each step = 1 day
-        add_last_point=True,
         auto_play=True,
         loop=False,
         max_speed=1,
         loop_button=True,
         date_options='YYYY-MM-DD',
         time_slider_drag_update=True
-    ).add_to(basemap)
+    )
 
     # Add color legend
     colormap.caption = f"Daily {index_column} over {dataset.iloc[0]['NAME_3']}"
@@ -185,7 +188,7 @@ def create_heatmap_folium(dataset, index_column, path_dir, file_html, center_lat
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
     # Save the map to an HTML file
-    basemap.save(f"{Path(path_dir).parent}/{file_html}_{index_column}.html")
+    save_map(basemap, f"{Path(path_dir).parent}/{file_html}_{index_column}.html")
     logger.info(f"Map created – open '{file_html}_{index_column}.html' to view.")
 
 def generate_air_map(path_dir: str, filename: str):
@@ -194,13 +197,11 @@ def generate_air_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
     
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_3.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
     # Filter for urban areas of interest: Lahore, maybe Multan
     admin_of_interest = ['Lahore']
-    admin_gdf = admin_gdf[admin_gdf['NAME_3'].isin(admin_of_interest)]
-    admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'NAME_2', 'NAME_3', 'TYPE_3', 'geometry']]
-    admin_gdf = admin_gdf.reset_index(drop=True)
+    admin_gdf = load_admin_boundaries(level=3,
+                                      columns=['COUNTRY', 'NAME_1', 'NAME_2', 'NAME_3', 'TYPE_3', 'geometry'],
+                                      filters={'NAME_3': admin_of_interest})
 
     # Read historical air pollution dataset for lahore
     lhr_ap_df = pd.read_csv("data/PAK_misc/historical_air_pollution_all_lahore.csv")
@@ -7,6 +7,8 @@ from pathlib import Path
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.tile_store import basemap_source
 
 
 logger = get_logger(__name__)
@@ -56,7 +58,7 @@ def create_png(admin, dataset, output_path):
     )
 
     # Add basemap from contextily
-    ctx.add_basemap(ax, crs=admin.crs.to_string(), source=ctx.providers.CartoDB.VoyagerNoLabels)
+    ctx.add_basemap(ax, crs=admin.crs.to_string(), source=basemap_source(ctx.providers.CartoDB.VoyagerNoLabels))
 
     # Beautify
     ax.set_title("Power Plants in Pakistan (WRI)", fontsize=14, fontweight="bold")
@@ -93,7 +95,7 @@ def generate_minimal_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
 
     # Load admin boundaries
-    admin_gdf = gpd.read_file("data/pakistan_admin/gadm41_PAK_0.shp")
+    admin_gdf = load_admin_boundaries(level=0)
     admin_gdf = admin_gdf.to_crs(epsg=3857)
 
     # Load powerplant dataset
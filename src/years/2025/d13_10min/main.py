@@ -4,10 +4,11 @@ import matplotlib.pyplot as plt
 
 from pathlib import Path
 from pypalettes import load_cmap
-from pyfonts import load_font
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.fonts import load_font
+from src.utils.projection_cache import project_dataset
 
 
 logger = get_logger(__name__)
@@ -16,14 +17,12 @@ logger = get_logger(__name__)
 def create_png(dataset, column_to_use, output_path):
     """
     """
-    # Create a Mercator project
+    # Create a Mercator project, projected geometries are cached between runs
     proj = ccrs.Mercator()
-    dataset = dataset.to_crs(proj.proj4_init)
+    dataset = project_dataset(dataset, proj)
     
     # Load plot beautifications
-    font = load_font(
-        "https://github.com/BornaIz/markazitext/blob/master/fonts/ttf/MarkaziText-Regular.ttf?raw=true"
-    )
+    font = load_font("MarkaziText-Regular")
     cmap = load_cmap("Acadia", keep=[False, False, True, False, True, True])
     background_color = "#fffdf3"
 
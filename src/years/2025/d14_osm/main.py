@@ -8,6 +8,9 @@ import matplotlib.colors as mcolors
 from pathlib import Path
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.folium_layers import add_point_layer
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -93,20 +96,17 @@ def create_html(dataset, column_to_use, output_path):
     center = [dataset.geometry.y.mean(), dataset.geometry.x.mean()]
     basemap = folium.Map(location=center, zoom_start=6, tiles="CartoDB positron")
 
-    # Add points with color by usage
-    for idx, row in dataset.iterrows():
-        usage = row[column_to_use]
-        color = colors.get(usage, "gray")
-        tooltip = f"<b>Usage:</b> {usage}<br><b>Amenity:</b> {row.get('amenity')}<br><b>Shop:</b> {row.get('shop')}"
-        
-        folium.CircleMarker(
-            location=[row.geometry.y, row.geometry.x],
-            radius=4,
-            color=color,
-            fill=True,
-            fill_opacity=0.8,
-            tooltip=tooltip
-        ).add_to(basemap)
+    # Add points with color by usage, as a single layer
+    add_point_layer(
+        basemap,
+        dataset,
+        radius=4,
+        color=dataset[column_to_use].map(colors).fillna("gray").to_numpy(),
+        tooltip_fields=[column_to_use, 'amenity', 'shop'],
+        tooltip_aliases=['Usage:', 'Amenity:', 'Shop:'],
+        name='Amenities',
+        fill_opacity=0.8,
+    )
 
     # Add a legend
     legend_html = """
@@ -129,7 +129,7 @@ def create_html(dataset, column_to_use, output_path):
     basemap.get_root().html.add_child(folium.Element(legend_html))
     folium.LayerControl().add_to(basemap)
     # Save the map to an HTML file
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
 
 # def create_png(admin, dataset, output_path, cmap, colors):
     # """
@@ -175,10 +175,8 @@ def generate_map(path_dir: str, filename: str):
     logger.info(f"Generating {path_dir}")
     
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_2.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
-    admin_gdf = admin_gdf.loc[admin_gdf['NAME_2'] == 'Karachi',
-                              ['NAME_2', 'geometry']]
+    admin_gdf = load_admin_boundaries(level=2, columns=['NAME_2', 'geometry'],
+                                      filters={'NAME_2': 'Karachi'})
     
     
     # Calculate bounds to only read necessary osm data, file too big
@@ -1,28 +1,36 @@
 import os
 import imageio
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 
 from pathlib import Path
+from matplotlib import colors
 from io import BytesIO
 from shapely import make_valid
 
 from src.utils.logger import get_logger
-from src.utils.helpers import get_relative_path
+from src.utils.helpers import get_relative_path, cache_artifact
+from src.utils.choropleth_animation import ChoroplethAnimator
+from src.utils.frame_pool import render_frames
+from src.utils.frame_sink import FrameSink
+from src.utils.projection_cache import project_dataset
 
 
 logger = get_logger(__name__)
 
 
-def explore_and_repivot_dataset(out_shp: str):
+@cache_artifact()
+def explore_and_repivot_dataset(effis_shp: str, fire_class: str = 'FireSeason') -> gpd.GeoDataFrame:
     """
-    Convert individual fire events into a dissolved fire map over years and per country
+    Convert individual fire events into a dissolved fire map over years and per country.
+    Cached on the source shapefile and fire_class, reruns only repeat the dissolve when either changes.
     """
-    effis_gdf = gpd.read_file("data/effis_layer/modis.ba.poly.shp")
+    effis_gdf = gpd.read_file(effis_shp)
     # Filter out relevant data
-    effis_gdf = effis_gdf.loc[effis_gdf['CLASS'] == 'FireSeason', 
+    effis_gdf = effis_gdf.loc[effis_gdf['CLASS'] == fire_class, 
                               ['id', 'FIREDATE', 'COUNTRY', 'AREA_HA', 'geometry']]
     effis_gdf['FIREDATE'] = pd.to_datetime(effis_gdf['FIREDATE'], format='mixed')
     # Make year column to base our analysis on
@@ -40,7 +48,36 @@ def explore_and_repivot_dataset(out_shp: str):
                                     #    "FIREDATE": "first"       # keep first date (or "min" if you want earliest)
                                        }
                                        ).reset_index()
-    effis_gdf.to_file(out_shp)
+    return effis_gdf
+
+def setup_frame_figure(admin, fires, proj, background_color):
+    """
+    Map with the admin areas, grid lines and every fire polygon, built once per frame worker.
+    """
+    fig, ax = plt.subplots(figsize=(12, 6), subplot_kw={"projection": proj})
+    fig.set_facecolor(background_color)
+    admin.plot(ax=ax, color="lightgrey", edgecolor="black", lw=0.2)
+    fires = ChoroplethAnimator(ax, fires, cmap=colors.ListedColormap(["red"]),
+                               missing_color="none", hide_missing_edges=True, edgecolor="red", linewidth=0.4)
+    ax.gridlines(draw_labels=True, color="grey", linestyle="--", lw=0.5)
+    title = ax.set_title("", fontsize=14)
+    return fig, fires, title
+
+def draw_frame(state, frame):
+    """
+    Show only the fires of one (year, values) frame and return the saved image.
+    """
+    fig, fires, title = state
+    v, values = frame
+    fires.update(values)
+    title.set_text(f"WILDFIRES EU - {v}")
+
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=500)
+    buf.seek(0)
+    image = imageio.v2.imread(buf)
+    buf.close()
+    return image
 
 def create_animation(admin, dataset, column_to_use, output_path):
     """
@@ -51,56 +88,36 @@ def create_animation(admin, dataset, column_to_use, output_path):
     # proj = ccrs.InterruptedGoodeHomolosine()
     background_color = "#fffdf3"
     
-    # set correct projection for the dataset, to be used with ccrs
-    admin = admin.to_crs(proj.proj4_init)
-    dataset = dataset.to_crs(proj.proj4_init)
+    # set correct projection for the dataset, to be used with ccrs (cached between runs)
+    admin = project_dataset(admin, proj)
+    dataset = project_dataset(dataset, proj)
     
     # get range of years in the dataset
     min_value = dataset[column_to_use].min()
     max_value = dataset[column_to_use].max()
     
-    # For each year map the wild fires
-    frames = []
-    for v in range(min_value, max_value+1):
-        # filter out the desired data
-        subset = dataset.loc[dataset[column_to_use]==v]
-        
-        # plot for the given series
-        fig, ax = plt.subplots(figsize=(12, 6), subplot_kw={"projection": proj})
-        fig.set_facecolor(background_color)
-        # add admin as in (in our case EU) and our fire shapefile for that particular subset (year)
-        admin.plot(ax=ax, color="lightgrey", edgecolor="black", lw=0.2)
-        subset.plot(ax=ax, color="red", edgecolor="red", lw=0.4)
-        # grid lines and title
-        ax.gridlines(draw_labels=True, color="grey", linestyle="--", lw=0.5)
-        ax.set_title(f"WILDFIRES EU - {v}", fontsize=14)
-        
-        # Save figure in list
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=500)
-        plt.close(fig)
-        buf.seek(0)
-        frames.append(imageio.v2.imread(buf))
-        buf.close()
-
-        # Store images locally if wanted
-        # plt.savefig(f"{out_dir}/{file_out}_{y}.png", dpi=500, bbox_inches="tight")
-
-    # Create an animation with the images from each year
-    imageio.mimsave(f"{output_path}.gif", frames, duration=2.0, loop=0)
+    # For each year map the wild fires, every frame shows only the fires of its year.
+    # Years are rendered in parallel, each worker draws the map once (see render_frames)
+    years = range(min_value, max_value+1)
+    frame_args = [(v, np.where(dataset[column_to_use] == v, 1.0, np.nan)) for v in years]
+    rendered = render_frames(setup_frame_figure, draw_frame, frame_args,
+                             setup_args=(admin, dataset.geometry, proj, background_color))
+
+    # Store images locally if wanted
+    # plt.savefig(f"{out_dir}/{file_out}_{y}.png", dpi=500, bbox_inches="tight")
+
+    # Create an animation with the images from each year, each one is encoded as soon as it is rendered
+    with FrameSink(gif_path=f"{output_path}.gif", duration=2.0, loop=0) as sink:
+        for frame in rendered:
+            sink.write(frame)
     
 def generate_map(path_dir: str, filename: str):
     """    
     """
     logger.info(f"Generating {path_dir}")
 
-    # Read wildfires dataset
-    shp_file = Path("data/effis_layer/effis_pc_by_year.shp")
-    if not shp_file.exists():
-        explore_and_repivot_dataset(str(shp_file))
-    
     # Read wildfires dataset (per year for countries)
-    effis_gdf = gpd.read_file(shp_file)
+    effis_gdf = explore_and_repivot_dataset("data/effis_layer/modis.ba.poly.shp")
 
     # Merge with country codes to get actual country name
     countrycodes = pd.read_csv("data/country-codes-list.csv")
@@ -7,7 +7,8 @@ from pathlib import Path
 from rasterstats import zonal_stats
 
 from src.utils.logger import get_logger
-from src.utils.helpers import get_relative_path
+from src.utils.helpers import get_relative_path, cache_artifact
+from src.utils.admin_boundaries import load_admin_boundaries
 
 
 logger = get_logger(__name__)
@@ -35,8 +36,10 @@ def create_png(dataset, column_to_use, output_path):
     ax.axis("off")
     plt.savefig(output_path, dpi=500, bbox_inches="tight")
 
-def generate_zonal_stats(admin, raster_path, output_path=None):
+@cache_artifact()
+def generate_zonal_stats(admin, raster_path):
     """
+    Zonal statistics of the raster per admin unit, cached on the admin units and the raster file
     """
     # Read raster and create statistics per district
     with rasterio.open(raster_path) as src:
@@ -74,10 +77,6 @@ def generate_zonal_stats(admin, raster_path, output_path=None):
     stats_gdf["area_km"] = stats_gdf.geometry.to_crs(epsg=32643).area / 1e6
     # Density = pop_sum / area
     stats_gdf["stat_density"] = stats_gdf["stat_sum"]/stats_gdf["area_km"]
-    
-    # Save output
-    if output_path:
-        stats_gdf.to_file(f"{output_path}.geojson", driver="GeoJSON")
 
     return stats_gdf
 
@@ -90,13 +89,12 @@ def generate_cellular_map(path_dir: str, filename: str):
     pop2025_tif_file = "data/PAK_misc/pak_pop_2025_CN_100m_R2025A_v1.tif"
     
     # Load the shapefile for pakistan admin boundaries
-    shapefile_path = "data/pakistan_admin/gadm41_PAK_3.shp"
-    admin_gdf = gpd.read_file(shapefile_path)
     # Keep only necessary columns
-    admin_gdf = admin_gdf.loc[:,['COUNTRY', 'NAME_1', 'NAME_2', 'NAME_3', 'geometry']]
+    admin_gdf = load_admin_boundaries(level=3, columns=['COUNTRY', 'NAME_1', 'NAME_2', 'NAME_3', 'geometry'])
 
-    pop_stats_gdf = generate_zonal_stats(admin=admin_gdf, raster_path=pop2025_tif_file, 
-                                         output_path='data/PAK_misc/pak_population_2025_stats')    
+    pop_stats_gdf = generate_zonal_stats(admin=admin_gdf, raster_path=pop2025_tif_file)
+    # Save output, outside the cached function so it is written on cache hits as well
+    pop_stats_gdf.to_file('data/PAK_misc/pak_population_2025_stats.geojson', driver="GeoJSON")
 
     # Save as image
     output_path = Path(path_dir).parent / f"{filename}"
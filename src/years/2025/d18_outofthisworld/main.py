@@ -6,10 +6,11 @@ import geopandas as gpd
 
 from pathlib import Path
 from shapely import Point
-from folium.plugins import MarkerCluster
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.folium_sidecars import save_map
+from src.utils.folium_layers import add_cluster_layer
 
 
 logger = get_logger(__name__)
@@ -159,43 +160,26 @@ def create_html(dataset, output_path):
     basemap = folium.Map([center_lat, center_lon], zoom_start=3, tiles='CartoDB Positron')
 
     # Add desired data to the basemap
-    # Initialize a marker cluster layer
-    marker_cluster = MarkerCluster(name="Meteor Clusters").add_to(basemap)
-    for _, row in dataset.iterrows():
-        lat = row.geometry.y
-        lon = row.geometry.x
-
-        # Build popup HTML
-        popup_html = f"""
-        <b>Name:</b> {row.get('name', 'Unknown')}<br>
-        <b>Year:</b> {row.get('year', 'N/A')}<br>
-        <b>Mass:</b> {row.get('mass', 'N/A')} grams<br>
-        <b>Type:</b> {row.get('recclass', 'N/A')}<br>
-        <b>Found/Fell:</b> {row.get('fall', 'N/A')}
-        """
-        # Build tooltip - simpler and shorter
-        tooltip_f = folium.Tooltip(
-            f"{row.get('meteor_name', 'meteor')} ({row.get('year')})",
-            sticky=True,  # tooltip follows the mouse
-            style="font-size: 12px; color: black;"
-        )
-        # try:
-        #     icon_color = class_color[row['recclass']]
-        # except:
-        #     #Catch nans
-        #     icon_color = 'black'
-        icon_f = folium.Icon(color="black",icon='meteor',prefix='fa')
-
-        folium.Marker(
-            location=[lat, lon],
-            icon=icon_f,
-            popup=folium.Popup(popup_html, max_width=300),
-            tooltip=tooltip_f
-        ).add_to(marker_cluster)
+    # Clusters are computed here per zoom level, popups are built on click from the attribute table
+    points = dataset.copy()
+    popup_defaults = {'name': 'Unknown', 'year': 'N/A', 'mass': 'N/A', 'recclass': 'N/A', 'fall': 'N/A'}
+    for column, default in popup_defaults.items():
+        points[column] = points[column].fillna(default) if column in points else default
+    points['mass'] = points['mass'].astype(str) + ' grams'
+    add_cluster_layer(
+        basemap,
+        points,
+        popup_fields=['name', 'year', 'mass', 'recclass', 'fall'],
+        popup_aliases=['Name:', 'Year:', 'Mass:', 'Type:', 'Found/Fell:'],
+        tooltip_template=('{meteor_name}' if 'meteor_name' in points else 'meteor') + ' ({year})',
+        icon={'icon': 'meteor', 'prefix': 'fa', 'markerColor': 'black'},
+        name='Meteor Clusters',
+        max_zoom=10
+    )
     
     # Allows toggling between layers interactively 
     folium.LayerControl().add_to(basemap)
-    basemap.save(f"{output_path}.html")
+    save_map(basemap, f"{output_path}.html")
     
 def generate_map(path_dir: str, filename: str):
     """
@@ -13,6 +13,7 @@ from rasterio.warp import transform_bounds
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.frame_pool import render_frames, render_frame
 
 
 logger = get_logger(__name__)
@@ -50,12 +51,48 @@ def read_rasters(tif_files: List[str]) -> Tuple[np.ndarray, dict | None, rasteri
    data = np.stack(img_arr, axis=0)
    return data, meta, transform
 
+def setup_frame_figure(extent, shape, cmap, norm):
+   """
+   Map of the raster extent with an empty image and the colorbar, built once per frame worker.
+   """
+   left, right, bottom, top = extent
+   fig = plt.figure(figsize=(8, 5))
+   # Use a geographic projection
+   ax = plt.axes(projection=ccrs.PlateCarree())
+   ax.set_extent([left, right, bottom, top], crs=ccrs.PlateCarree())
+   # Add basemap features (coastlines, borders)
+   ax.add_feature(cfeature.COASTLINE, linewidth=0.5)
+   ax.add_feature(cfeature.BORDERS, linewidth=0.5)
+   ax.add_feature(cfeature.LAND, facecolor="lightgray", zorder=0)
+   # add an image with the correct extent/transform, every frame only replaces its data
+   im = ax.imshow(np.full(shape, np.nan, dtype=np.float32),
+                  cmap=cmap, 
+                  norm=norm,
+                  extent=(left, right, bottom, top),
+                  origin="upper",
+                  transform=ccrs.PlateCarree(),
+                  zorder=1,
+                  )
+   # Beautify the map
+   ax.set_axis_off()
+   cb = fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+   cb.set_label("Percipitation")
+   return fig, ax, im
+
+def draw_frame(state, frame):
+   """
+   Show one (month index, raster) frame and return its pixels.
+   """
+   fig, ax, im = state
+   t, band = frame
+   im.set_data(band)
+   ax.set_title(f"Month {t+1}")
+   return render_frame(fig)
+
 def create_monthly_animation(dataset, meta, transform, output_path: str, 
                              cmap: str = 'Blues', duration: float = 0.5):
    """
    """
-   imgs = []
-   
    # compute bounds (left, bottom, right, top) and src crs
    src_crs = meta.get("crs", None)
    if src_crs is None:
@@ -67,43 +104,10 @@ def create_monthly_animation(dataset, meta, transform, output_path: str,
    vmax = np.nanmax(dataset)
    norm = plt.Normalize(vmin=vmin,vmax=vmax)
 
-   # for each time input create a separate img
-   for t in range(dataset.shape[0]):
-      fig = plt.figure(figsize=(8, 5))
-      # Use a geographic projection
-      ax = plt.axes(projection=ccrs.PlateCarree())
-      ax.set_extent([left, right, bottom, top], crs=ccrs.PlateCarree())
-      # Add basemap features (coastlines, borders)
-      ax.add_feature(cfeature.COASTLINE, linewidth=0.5)
-      ax.add_feature(cfeature.BORDERS, linewidth=0.5)
-      ax.add_feature(cfeature.LAND, facecolor="lightgray", zorder=0)
-      # add our dataset to the map with the correct extent/transform
-      im = ax.imshow(dataset[t, :, :],
-                     cmap=cmap, 
-                     norm=norm,
-                     extent=(left, right, bottom, top),
-                     origin="upper",
-                     transform=ccrs.PlateCarree(),
-                     zorder=1,
-                     )
-      # Beautify the map
-      ax.set_title(f"Month {t+1}")
-      ax.set_axis_off()
-      cb = fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-      cb.set_label("Percipitation")
-
-      # save fig to a buffer list for animation
-      fig.canvas.draw()
-      # Use buffer_rgba (returns an RGBA buffer)
-      buf = fig.canvas.renderer.buffer_rgba()
-      # Convert to a NumPy array
-      img_arr = np.asarray(buf, dtype=np.uint8)
-      # img_arr will have shape (height, width, 4) because of RGBA
-      # If you only need RGB, you can drop the alpha channel:
-      # img_rgb = img_arr[:, :, :3]
-      imgs.append(img_arr)
-
-      plt.close(fig=fig)
+   # for each time input render an image, in parallel on warm figures (see render_frames)
+   imgs = list(render_frames(setup_frame_figure, draw_frame,
+                             [(t, dataset[t, :, :]) for t in range(dataset.shape[0])],
+                             setup_args=((left, right, bottom, top), dataset.shape[1:], cmap, norm)))
 
    # save animation
    imageio.mimsave(f"{output_path}.gif", imgs, duration=duration, loop=0)
@@ -11,6 +11,10 @@ from matplotlib.patches import Patch
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.tile_store import basemap_source
+from src.utils.folium_layers import add_geojson_layer
+from src.utils.folium_sidecars import save_map
 
 
 logger = get_logger(__name__)
@@ -35,8 +39,11 @@ def create_html(admin, dataset, output_path):
                         tiles='OpenStreetMap')
 
    # Add the administrative boundaries layer
-   folium.GeoJson(
+   add_geojson_layer(
+         basemap,
          admin,
+         max_zoom=11,
+         properties=['NAME_1'],
          name='Administrative Boundaries',
          style_function=lambda feature: {
             'fillColor': None,
@@ -48,7 +55,7 @@ def create_html(admin, dataset, output_path):
             fields=['NAME_1'], 
             aliases=['Province:']
          )
-   ).add_to(basemap)
+   )
 
    # Add dataset
    folium.GeoJson(
@@ -110,7 +117,7 @@ def create_html(admin, dataset, output_path):
    # Allows toggling between layers interactively 
    folium.LayerControl().add_to(basemap)
    # Save and exit
-   basemap.save(f"{output_path}.html")
+   save_map(basemap, f"{output_path}.html")
    
 def create_png(admin, dataset, output_path):
    """
@@ -153,7 +160,7 @@ def create_png(admin, dataset, output_path):
    ax.set_xlim(bounds[0] - padding, bounds[2] + padding)
    ax.set_ylim(bounds[1] - padding, bounds[3] + padding)
    # Add basemap tiles
-   ctx.add_basemap(ax, source=ctx.providers.OpenStreetMap.Mapnik, crs=admin.crs.to_string())
+   ctx.add_basemap(ax, source=basemap_source(ctx.providers.OpenStreetMap.Mapnik), crs=admin.crs.to_string())
    
    for type, group in dataset.groupby("type"):
        logger.debug(f"type - {type}: {len(group)}")
@@ -231,9 +238,7 @@ def generate_map(path_dir: str, filename: str):
    logger.info(f"Generating {path_dir}")
    
    # Load the shapefile for boundaries or admin units
-   shapefile_path = "data/pakistan_admin/gadm41_PAK_1.shp"
-   admin_gdf = gpd.read_file(shapefile_path)
-   admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'geometry']]
+   admin_gdf = load_admin_boundaries(level=1, columns=['COUNTRY', 'NAME_1', 'geometry'])
 
    # Drone and Suicide attacks csvs
    fp_suicide = "data/PAK_misc/zusmani_pakistansuicideattacks/PakistanSuicideAttacks Ver 11 (30-November-2017).csv"
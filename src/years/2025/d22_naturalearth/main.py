@@ -4,7 +4,6 @@ import geopandas as gpd
 import matplotlib.pyplot as plt
 
 from pathlib import Path
-from pyfonts import load_font
 from pypalettes import load_cmap
 import matplotlib.patheffects as path_effects
 from matplotlib.patches import Patch
@@ -1,6 +1,5 @@
 import rasterio
 import numpy as np
-import geopandas as gpd
 import contextily as ctx
 import matplotlib.pyplot as plt
 
@@ -11,7 +10,9 @@ from pypalettes import load_cmap
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
 from src.utils.map_helpers import copernicus_lulc_flags
+from src.utils.tile_store import basemap_source
 
 
 logger = get_logger(__name__)
@@ -75,7 +76,7 @@ def create_png(admin,
             facecolor="none",
             linewidth=1
          )
-         ctx.add_basemap(ax=ax, source=ctx.providers.OpenStreetMap.Mapnik)
+         ctx.add_basemap(ax=ax, source=basemap_source(ctx.providers.OpenStreetMap.Mapnik))
          ax.set_title(
             "Region of Interest",
             fontsize=18,
@@ -165,9 +166,7 @@ def generate_map(path_dir: str, filename: str):
    ]   
 
    # Load the shapefile for boundaries or admin units
-   shapefile_path = "data/pakistan_admin/gadm41_PAK_1.shp"
-   admin_gdf = gpd.read_file(shapefile_path)
-   admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'geometry']]
+   admin_gdf = load_admin_boundaries(level=1, columns=['COUNTRY', 'NAME_1', 'geometry'])
 
    # Read tif files and store
    lc_img = None
@@ -4,87 +4,75 @@ import cartopy.crs as ccrs
 import matplotlib.pyplot as plt
 
 from pathlib import Path
-from matplotlib import animation, colors, patches
-from shapely.geometry import Polygon, MultiPolygon
+from matplotlib import animation, colors
 from tqdm import tqdm
-from PIL import Image
 from pypalettes import load_cmap
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.choropleth_animation import ChoroplethAnimator, frame_values
+from src.utils.projection_cache import project_dataset
+from src.utils.frame_pool import render_frames, render_frame
+from src.utils.frame_sink import FrameSink
 
 
 logger = get_logger(__name__)
 
 
+def setup_frame_figure(geometries, cmap, norm):
+   """
+   Figure of the animation without the yearly values, built once per frame worker.
+   """
+   fig, ax = plt.subplots(figsize=(14, 8), subplot_kw={'projection': ccrs.Robinson()})
+   ax.set_global()
+   ax.set_axis_off()
+   
+   # Colorbar (constant for all frames)
+   sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
+   sm._A = []  # required trick
+   cbar = fig.colorbar(sm, ax=ax, orientation="vertical", shrink=0.6)
+   cbar.set_label("Cantril Ladder Score")
+
+   # Countries without a score in a year are not drawn in that frame
+   countries = ChoroplethAnimator(ax, geometries, cmap=cmap, norm=norm, missing_color="none",
+                                  hide_missing_edges=True, edgecolor="black", linewidth=0.4)
+   title = ax.set_title("", fontsize=16)
+   return fig, countries, title
+
+def draw_frame(state, frame):
+   """
+   Recolour the countries with the scores of one (year, values) frame and return its pixels.
+   """
+   fig, countries, title = state
+   year, values = frame
+   # Only colours and title change between frames
+   countries.update(values)
+   title.set_text(f"Cantril Ladder Score – {year:.0f}")
+   return render_frame(fig)
+
 def create_animation_fast(world, output_path, cmap_name="Abbott", simplify_tolerance=0.1):
    """
-   Fast animation: pre-render each frame as an image and assemble GIF.
+   Fast animation: draw the countries once, recolour them for each year and assemble GIF.
+   The years are rendered in parallel (see render_frames), each worker keeping its own figure.
    """
     
    cmap = load_cmap(cmap_name, cmap_type="continuous")
    norm = colors.Normalize(vmin=0, vmax=10)
    years = sorted(world["Year"].dropna().unique())
 
-   # Simplify geometries for speed
-   if simplify_tolerance > 0:
-      world = world.copy()
-      world["geometry"] = world["geometry"].simplify(simplify_tolerance)
-    
-   frames = []
-   for year in tqdm(years, desc="Rendering frames"):
-      fig, ax = plt.subplots(figsize=(14, 8), subplot_kw={'projection': ccrs.Robinson()})
-      ax.set_global()
-      ax.set_axis_off()
-      
-      # Colorbar (constant for all frames)
-      sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
-      sm._A = []  # required trick
-      cbar = fig.colorbar(sm, ax=ax, orientation="vertical", shrink=0.6)
-      cbar.set_label("Cantril Ladder Score")
-
-      # # Use this if the fig+colorbar is outside the loop, Clear only the map data, leave colorbar,
-      # ax.collections.clear()
-      
-      # Filter for the specific year and plot
-      world_year = world[world["Year"] == year]
-      world_year.plot(
-         ax=ax,
-         column="Cantril ladder score",
-         cmap=cmap,
-         norm=norm,
-         edgecolor="black",
-         linewidth=0.4,
-         transform=ccrs.PlateCarree()
-      )
-      ax.set_title(f"Cantril Ladder Score – {year:.0f}", fontsize=16)
-        
-      # Capture the plot as an image, redraw to activate
-      fig.canvas.draw()
-      # Get RGBA buffer from the figure
-      buf = fig.canvas.buffer_rgba()
-      # Convert to PIL Image in RGB mode
-      image = Image.frombuffer(
-         'RGBA', 
-         fig.canvas.get_width_height(), 
-         buf, 
-         'raw', 
-         'RGBA', 
-         0, 
-         1
-      ).convert('RGB')
-      # Add to our frames list
-      frames.append(image)
-      plt.close(fig)
-    
-   # Save as GIF
-   frames[0].save(
-      f"{output_path}.gif",
-      save_all=True,
-      append_images=frames[1:],
-      duration=1000,
-      loop=0
-   )
+   # One geometry per country
+   geometries = world.drop_duplicates("NAME").set_index("NAME").geometry
+   # Score of every country for each year, in the order of the geometries
+   yearly_values = frame_values(world, "NAME", "Year", "Cantril ladder score", geometries.index)
+   # Simplified for speed and projected once here rather than in every worker, cached between runs
+   geometries = project_dataset(geometries, ccrs.Robinson(), simplify_tolerance=simplify_tolerance)
+
+   rendered = render_frames(setup_frame_figure, draw_frame, [(year, yearly_values[year]) for year in years],
+                            setup_args=(geometries, cmap, norm))
+   # Save as GIF, every frame is encoded as soon as it is rendered
+   with FrameSink(gif_path=f"{output_path}.gif", duration=1.0, loop=0) as sink:
+      for pixels in tqdm(rendered, total=len(years), desc="Rendering frames"):
+         sink.write(pixels)
     
 def create_animation(world, output_path, cmap_name='Abbott'):
    """
@@ -115,80 +103,16 @@ def create_animation(world, output_path, cmap_name='Abbott'):
         pad=20
     )
    
-   # Precompute geometries for all years to speed up animation ---
-   geoms = []
-   for year in years:
-      year_df = world[world["Year"] == year]
-      geoms.append(year_df)
-
-   # First frame: draw once and reuse artist ---
-   initial_frame = geoms[0]
-
-   # Create a single reusable artist collection
-   collection = initial_frame.plot(
-      ax=ax,
-      column="Cantril ladder score",
-      cmap=cmap,
-      norm=norm,
-      edgecolor="black",
-      linewidth=0.4,
-      transform=ccrs.PlateCarree(),
-      legend=False,
-   )
-
-   title = ax.set_title("", fontsize=16, pad=20)
-
-   
-   # Build a list of patches for each country instead of relying on GeoDataFrame plot collection
-   country_patches = []     # list of lists → each row may map to many patches
-
-   # Manually build patches for each country to allow efficient color updates but this is very slow
-   for geom in world.geometry:
-      row_patches = []
-
-      if isinstance(geom, Polygon):
-         polys = [geom]
-      elif isinstance(geom, MultiPolygon):
-         polys = geom.geoms
-      else:
-         continue
-
-      for poly in polys:
-         x, y = poly.exterior.xy
-         patch = patches.Polygon(
-                  xy=list(zip(x, y)),
-                  closed=True,
-                  linewidth=0.4,
-                  edgecolor="black",
-                  transform=ccrs.PlateCarree(),
-                  )
-         ax.add_patch(patch)
-         row_patches.append(patch)
-
-      country_patches.append(row_patches)
+   # Draw every country once as a single collection, frames only recolour it (grey for missing)
+   geometries = world.drop_duplicates("NAME").set_index("NAME").geometry
+   countries = ChoroplethAnimator(ax, geometries, cmap=cmap, norm=norm, edgecolor="black", linewidth=0.4)
    
    # create a list of values for each year to speed up updates
-   country_names = world["NAME"].tolist()
-   yearly_values = {}
-
-   for year in years:
-      year_df = world[world["Year"] == year].set_index("NAME")["Cantril ladder score"]
-      values = [year_df.get(cname, None) for cname in country_names]
-      yearly_values[year] = values
+   yearly_values = frame_values(world, "NAME", "Year", "Cantril ladder score", geometries.index)
 
    def update(i):
       year = years[i]
-      values = yearly_values[year]
-
-      # Update color of each country's patches
-      for val, row_patches in zip(values, country_patches):
-         if val is None:
-               color = (0.9, 0.9, 0.9, 1.0)  # grey for missing
-         else:
-               color = cmap(norm(val))
-         for p in row_patches:
-               p.set_facecolor(color)
-
+      countries.update(yearly_values[year])
       title.set_text(f"Cantril Ladder Score (Happiness Index) – {year:.0f}")
       return []
 
@@ -9,10 +9,10 @@ import matplotlib.patheffects as path_effects
 from pathlib import Path
 from matplotlib.patches import FancyBboxPatch
 from pypalettes import load_cmap
-from pyfonts import load_font
 
 from src.utils.logger import get_logger
-from src.utils.helpers import get_relative_path, load_and_flatten
+from src.utils.helpers import get_relative_path, load_and_flatten, cache_artifact
+from src.utils.fonts import load_font
 
 
 logger = get_logger(__name__)
@@ -36,13 +36,9 @@ def create_png(dataset, output_path):
    
    # Load colormap and fonts
    cmap = load_cmap("Exter", cmap_type="continuous")
-   lightfont = load_font(
-      "https://raw.githubusercontent.com/googlefonts/dynapuff/main/fonts/ttf/DynaPuff-Regular.ttf"
-   )
+   lightfont = load_font("DynaPuff-Regular")
 
-   mediumfont = load_font(
-      "https://raw.githubusercontent.com/googlefonts/dynapuff/main/fonts/ttf/DynaPuff-Bold.ttf"
-   )
+   mediumfont = load_font("DynaPuff-Bold")
 
    # Create percentile-based bin edges
    n_bins = 10
@@ -162,6 +158,13 @@ def create_png(dataset, output_path):
    plt.tight_layout()
    plt.savefig(output_path, dpi=300, bbox_inches="tight")
 
+@cache_artifact()
+def hex_resample(dataset, resolution):
+   """
+   Resample polygons onto an H3 hexagon grid, cached as polyfill is slow at finer resolutions
+   """
+   return dataset.h3.polyfill_resample(resolution)
+
 def generate_map(path_dir: str, filename: str):
    """    
    """
@@ -241,7 +244,7 @@ def generate_map(path_dir: str, filename: str):
    )
    
    # Create hexagonal tesselation over Sudan
-   sudan_crisis_gdf = sudan_crisis_gdf.h3.polyfill_resample(resolution=5)
+   sudan_crisis_gdf = hex_resample(sudan_crisis_gdf, resolution=5)
    logger.debug(f"sudan_crisis_gdf Shape: {sudan_crisis_gdf.shape}")
    logger.debug(f"sudan_crisis_gdf Columns: {sudan_crisis_gdf.columns}")
 
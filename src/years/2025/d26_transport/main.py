@@ -14,10 +14,10 @@ from shapely.geometry import LineString
 from rasterio.plot import plotting_extent
 
 from pypalettes import load_cmap
-from pyfonts import load_font
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.projection_cache import project_dataset
 
 
 logger = get_logger(__name__)
@@ -126,7 +126,6 @@ def create_png(ports, lanes, output_path):
    """
    # Set up the map with Cartopy
    proj = ccrs.Robinson()
-   proj4 = proj.proj4_init
 
    # create fig and axis
    fig = plt.figure(figsize=(12, 10), dpi=300)
@@ -139,8 +138,8 @@ def create_png(ports, lanes, output_path):
    ax.set_global()
 
    # Adding shipping lanes
-   # reproject lanes to ccrs map projection
-   lanes = lanes.to_crs(proj4)
+   # reproject lanes to ccrs map projection (cut at the antimeridian, cached between runs)
+   lanes = project_dataset(lanes, proj)
    # get colormap for lanes
    lane_cmap = load_cmap('Althoff', keep=[False, True, True, True, False], reverse=True)
    # map lane types to colors
@@ -159,7 +158,7 @@ def create_png(ports, lanes, output_path):
 
    # Add global ports
    # reproject ports to ccrs map projection
-   ports = ports.to_crs(proj4)
+   ports = project_dataset(ports, proj)
    # get colormap for ports
    port_cmap = load_cmap("Badlands", keep=[False, True, True, True, True])
    # map port sizes to colors
@@ -10,6 +10,7 @@ from matplotlib.lines import Line2D
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
 from src.utils.map_helpers import newworld_political_map
+from src.utils.projection_cache import project_dataset
 
 
 logger = get_logger(__name__)
@@ -34,6 +35,9 @@ def create_png(dataset, output_path):
    # Set global extent
    ax.set_global()
 
+   # Countries projected once (cut at the antimeridian) and cached between runs
+   dataset = project_dataset(dataset, proj)
+
    political_cats = sorted(dataset['world_order'].unique().tolist())
    cmap = add_cmap(colors=['#AC1F25FF', '#272727FF', "#5F984AFF", '#004F63FF', '#96804BFF', '#828788FF'], name='political_cats_cmap')
    # '#C969A1FF', '#CE4441FF', '#EE8577FF', '#EB7926FF', '#FFBB44FF', '#859B6CFF', '#62929AFF', '#004F63FF', '#122451FF'
@@ -50,7 +54,6 @@ def create_png(dataset, output_path):
             facecolor=cat_to_color[cat],
             edgecolor="white",
             linewidth=0.3,
-            transform=ccrs.PlateCarree(),  # your world_gdf is likely in lon/lat
             zorder=2,
         )
 
@@ -7,18 +7,77 @@ import cartopy.feature as cfeature
 
 from pathlib import Path
 from tqdm import tqdm
-from PIL import Image
 from pypalettes import load_cmap
 from matplotlib import animation, colors, patches
 from matplotlib.lines import Line2D
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.choropleth_animation import ChoroplethAnimator, frame_values
+from src.utils.projection_cache import project_dataset
+from src.utils.frame_pool import render_frames, render_frame
+from src.utils.frame_sink import FrameSink
 
 
 logger = get_logger(__name__)
 
 
+def setup_frame_figure(geometries, cmap, norm):
+   """
+   Map, colorbar and texts of the animation, built once per frame worker.
+   """
+   # create fig and axis once, every frame only recolours the countries
+   fig, ax = plt.subplots(figsize=(10, 6), 
+                          subplot_kw={'projection': ccrs.PlateCarree()})
+   # fig.set_facecolor('black')
+
+   # Add land and ocean with natural colors
+   ax.add_feature(cfeature.LAND, facecolor='#f0f0f0')
+   ax.add_feature(cfeature.OCEAN, facecolor='#acceff')
+   ax.add_feature(cfeature.COASTLINE, edgecolor='black', linewidth=0.8)
+   ax.add_feature(cfeature.BORDERS, edgecolor='gray', linewidth=0.4)
+
+   # Set global extent
+   ax.set_global()
+   ax.set_axis_off()
+   
+   # Colorbar (constant for all frames)
+   sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
+   sm._A = []  # required trick
+   cbar = fig.colorbar(sm, ax=ax, orientation="horizontal", shrink=0.6)
+   cbar.set_label("Number of Deaths")
+
+   # Countries without deaths recorded in a year are hidden in its frame
+   countries = ChoroplethAnimator(ax, geometries, cmap=cmap, norm=norm, missing_color="none",
+                                  hide_missing_edges=True, edgecolor="white", linewidth=0.4, zorder=10)
+
+   title = fig.text(
+      0.5, 0.95,
+      "",
+      horizontalalignment="center",
+      fontsize=16,
+      weight="bold",
+      # color='white'
+   )
+   fig.text(
+      0.5, 0.90,
+      "Based on data from HDX and Uppsala Conflict Data Program (UCDP)",
+      horizontalalignment="center",
+      fontsize=12,
+      # color='white'
+   )
+   return fig, countries, title
+
+def draw_frame(state, frame):
+   """
+   Recolour the countries with the deaths of one (year, values) frame and return its pixels.
+   """
+   fig, countries, title = state
+   year, values = frame
+   countries.update(values)
+   title.set_text(f"Deaths in armed conflict around the world – Year {year:.0f}")
+   return render_frame(fig)
+
 def create_png(world, output_path, simplify_tolerance=0.1):
    """
    """
@@ -39,91 +98,18 @@ def create_png(world, output_path, simplify_tolerance=0.1):
    #    world = world.copy()
    #    world["geometry"] = world["geometry"].simplify(simplify_tolerance)
 
-   frames = []
-   for year in tqdm(years, desc="Rendering frames"):
-      # create fig and axis
-      fig, ax = plt.subplots(figsize=(10, 6), 
-                             subplot_kw={'projection': ccrs.PlateCarree()})
-      # fig.set_facecolor('black')
-
-      # Add land and ocean with natural colors
-      ax.add_feature(cfeature.LAND, facecolor='#f0f0f0')
-      ax.add_feature(cfeature.OCEAN, facecolor='#acceff')
-      ax.add_feature(cfeature.COASTLINE, edgecolor='black', linewidth=0.8)
-      ax.add_feature(cfeature.BORDERS, edgecolor='gray', linewidth=0.4)
-
-      # Set global extent
-      ax.set_global()
-      ax.set_axis_off()
-      
-      # Colorbar (constant for all frames)
-      sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
-      sm._A = []  # required trick
-      cbar = fig.colorbar(sm, ax=ax, orientation="horizontal", shrink=0.6)
-      cbar.set_label("Number of Deaths")
-      
-      # Filter for the specific year and plot
-      world_year = world[world["Year"] == year]
-      world_year.plot(
-         ax=ax,
-         column="Best estimate",
-         cmap=cmap,
-         norm=norm,
-         edgecolor="white",
-         linewidth=0.4,
-         zorder=10,
-         transform=ccrs.PlateCarree()
-      )
-      # ax.set_title(f"Deaths in armed conflict – {year:.0f}", fontsize=16)
-
-      fig.text(
-         0.5, 0.95,
-         f"Deaths in armed conflict around the world – Year {year:.0f}",
-         horizontalalignment="center",
-         fontsize=16,
-         weight="bold",
-         # color='white'
-      )
-      fig.text(
-         0.5, 0.90,
-         "Based on data from HDX and Uppsala Conflict Data Program (UCDP)",
-         horizontalalignment="center",
-         fontsize=12,
-         # color='white'
-      )
-        
-      # Capture the plot as an image, redraw to activate
-      fig.canvas.draw()
-      # Get RGBA buffer from the figure
-      buf = fig.canvas.buffer_rgba()
-      # Convert to PIL Image in RGB mode
-      image = Image.frombuffer(
-         'RGBA', 
-         fig.canvas.get_width_height(), 
-         buf, 
-         'raw', 
-         'RGBA', 
-         0, 
-         1
-      ).convert('RGB')
-      # Add to our frames list
-      frames.append(image)
-      plt.close(fig)
-    
-   # Save frames as a GIF
-   frames[0].save(
-      f"{output_path}.gif",
-      save_all=True,
-      append_images=frames[1:],
-      duration=500,
-      loop=0
-   ) 
-   # Save as mp4
-   import imageio.v2 as imageio
-
-   with imageio.get_writer(f"{output_path}.mp4", fps=1, format="ffmpeg") as writer:
-      for frame in frames:
-         writer.append_data(np.array(frame))   # frame must be a NumPy array
+   # Countries drawn once by every worker, frames only recolour them
+   geometries = world.drop_duplicates("NAME").set_index("NAME").geometry
+   yearly_values = frame_values(world, "NAME", "Year", "Best estimate", geometries.index)
+   geometries = project_dataset(geometries, ccrs.PlateCarree())
+
+   rendered = render_frames(setup_frame_figure, draw_frame, [(year, yearly_values[year]) for year in years],
+                            setup_args=(geometries, cmap, norm))
+   # Save frames as a GIF and an mp4 together, each frame is encoded as soon as it is rendered
+   with FrameSink(gif_path=f"{output_path}.gif", mp4_path=f"{output_path}.mp4",
+                  duration=0.5, loop=0, fps=1) as sink:
+      for pixels in tqdm(rendered, total=len(years), desc="Rendering frames"):
+         sink.write(pixels)
 
 def generate_map(path_dir: str, filename: str):
    """    
@@ -4,11 +4,11 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 from matplotlib.patches import Patch
 from pypalettes import load_cmap
-from pyfonts import load_font
 from rasterio.plot import show
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.fonts import load_font
 
 
 logger = get_logger(__name__)
@@ -27,9 +27,7 @@ def create_raster_png(raster_path, output_path):
    cmap2 = load_cmap("blaziken", cmap_type="continuous", reverse=True)
    cmap3 = load_cmap("bobcats", cmap_type="continuous", reverse=True)
    cmap4 = load_cmap("bryce", cmap_type="continuous", reverse=True)
-   font = load_font(
-      "https://raw.githubusercontent.com/BornaIz/markazitext/master/fonts/ttf/MarkaziText-Regular.ttf"
-   )
+   font = load_font("MarkaziText-Regular")
 
    fig, mainax = plt.subplots(figsize=(9.7, 5))
    mainax.axis("off")
@@ -1,20 +1,123 @@
 import pandas as pd
-import geopandas as gpd
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as pe
 
 from pathlib import Path
 from matplotlib.patches import Patch
-from matplotlib.animation import FuncAnimation
 from pypalettes import add_cmap
-from pyfonts import load_font
 
 from src.utils.logger import get_logger
 from src.utils.helpers import get_relative_path
+from src.utils.admin_boundaries import load_admin_boundaries
+from src.utils.fonts import load_font
+from src.utils.frame_pool import render_frames, render_frame
+from src.utils.frame_sink import FrameSink
 
 logger = get_logger(__name__)
 
 
+def setup_frame_figure(params):
+   """
+   Figure and fonts of the animation, built once per frame worker.
+   """
+   # create fig and axis
+   # _, ax = plt.subplots(figsize=(12, 10))
+   fig, ax = plt.subplots(dpi=500)
+   fig.set_facecolor("#ffffff")
+   font = load_font("Urbanist-Medium")
+   boldfont = load_font("Urbanist-ExtraBold")
+   return dict(params, fig=fig, ax=ax, font=font, boldfont=boldfont)
+
+def draw_frame(state, year):
+   """
+   Draw the map, line graph and texts of one year and return its pixels.
+   """
+   ax, admin, subset, cmap = state["ax"], state["admin"], state["subset"], state["cmap"]
+   font, boldfont = state["font"], state["boldfont"]
+   subset_min, subset_max = state["subset_min"], state["subset_max"]
+   min_year, max_year = state["min_year"], state["max_year"]
+   y_axis_values, center_lat = state["y_axis_values"], state["center_lat"]
+   indicator_name = state["indicator_name"]
+   text_args = dict(
+      # va="top",
+      # ha="left",
+      transform=state["fig"].transFigure,
+   )
+
+   # Clear and set up axis
+   ax.clear()
+   ax.set_axis_off()
+   # Set map focus and limits
+   # ax.set_xlim(center_lon - 7, center_lon + 7)
+   ax.set_ylim(center_lat - 9, center_lat + 9)
+
+   subset_lty = subset.loc[subset["Year"] <= year]
+   value = subset.loc[subset["Year"] == year, "Value"].values[0]
+   # logger.debug(f"CPI: Year - {year}, Value - {value}")
+   color = cmap((value - subset_min) / (subset_max - subset_min))
+
+   # Plot Pakistan with colors 
+   admin.plot(ax=ax, color=color, edgecolor="black", linewidth=0.2)
+   lineax = ax.inset_axes(bounds=(-0.1, 0.62, 0.6, 0.22), transform=ax.transAxes)
+   lineax.set_ylim(subset_min, subset_max * 1.1)
+   lineax.axis("off")
+
+   lineax.scatter(
+      subset_lty["Year"],
+      subset_lty["Value"],
+      c=subset_lty["Value"],
+      cmap=cmap,
+      s=7,
+      zorder=5,
+   )
+
+   lineax.hlines(
+      y=y_axis_values,
+      xmin=min_year,
+      xmax=max_year,
+      color="black",
+      linewidth=0.3,
+      zorder=1,
+      alpha=0.4,
+   )
+   for y_value in y_axis_values:
+      lineax.text(
+         x=min_year,
+         y=y_value,
+         s=f"{y_value:.0f}%",
+         font=font,
+         size=5,
+         va="center",
+         ha="left",
+      )
+
+   ax.text(
+      x=0.5,
+      y=0.9,
+      s=f"Pakistan {indicator_name} - {str(year)[:4]}",
+      size=12,
+      font=font,
+      va="top",
+      ha="center",
+      **text_args
+   )
+   ax.text(
+      x=0.69,
+      y=0.40,
+      s=f"{value:.1f}%",
+      size=16,
+      color=color,
+      path_effects=[pe.Stroke(linewidth=1, foreground="black"), pe.Normal()],
+      font=boldfont,
+      va="top",
+      ha="left",
+      **text_args,
+   )
+   ax.text(
+      x=0.6, y=0.3, s=f"#30DayMapChallenge - WDI Inflation Indicators", size=5, font=boldfont, **text_args
+   )
+   return render_frame(state["fig"])
+
 def create_png(admin, dataset, indicator_code, output_path):
    """
    """
@@ -46,13 +149,6 @@ def create_png(admin, dataset, indicator_code, output_path):
    center_lat = (bounds[1] + bounds[3]) / 2
    center_lon = (bounds[0] + bounds[2]) / 2
 
-   font = load_font(
-    "https://raw.githubusercontent.com/coreyhu/Urbanist/main/fonts/ttf/Urbanist-Medium.ttf"
-   )
-   boldfont = load_font(
-      "https://raw.githubusercontent.com/coreyhu/Urbanist/main/fonts/ttf/Urbanist-ExtraBold.ttf"
-   )
-
    green = "#115740"
    white = "#FFFFFF"
    red = "#FF0000"
@@ -62,94 +158,16 @@ def create_png(admin, dataset, indicator_code, output_path):
    else:
       cmap = add_cmap(colors=[green, white, red], name="PakistanWithDanger", cmap_type="continuous")
 
-   # create fig and axis
-   # _, ax = plt.subplots(figsize=(12, 10))
-   fig, ax = plt.subplots(dpi=500)
-   fig.set_facecolor("#ffffff")
-
-   text_args = dict(
-      # va="top",
-      # ha="left",
-      transform=fig.transFigure,
+   # Everything the frames need, each frame worker draws its years on its own figure
+   params = dict(
+      admin=admin, subset=subset, indicator_name=indicator_name, subset_min=subset_min, subset_max=subset_max,
+      y_axis_values=y_axis_values, min_year=min_year, max_year=max_year, center_lat=center_lat,
+      cmap=cmap,
    )
-   
-   def update(year):
-      # Clear and set up axis
-      ax.clear()
-      ax.set_axis_off()
-      # Set map focus and limits
-      # ax.set_xlim(center_lon - 7, center_lon + 7)
-      ax.set_ylim(center_lat - 9, center_lat + 9)
-
-      subset_lty = subset.loc[subset["Year"] <= year]
-      value = subset.loc[subset["Year"] == year, "Value"].values[0]
-      # logger.debug(f"CPI: Year - {year}, Value - {value}")
-      color = cmap((value - subset_min) / (subset_max - subset_min))
-
-      # Plot Pakistan with colors 
-      admin.plot(ax=ax, color=color, edgecolor="black", linewidth=0.2)
-      lineax = ax.inset_axes(bounds=(-0.1, 0.62, 0.6, 0.22), transform=ax.transAxes)
-      lineax.set_ylim(subset_min, subset_max * 1.1)
-      lineax.axis("off")
-
-      lineax.scatter(
-         subset_lty["Year"],
-         subset_lty["Value"],
-         c=subset_lty["Value"],
-         cmap=cmap,
-         s=7,
-         zorder=5,
-      )
-
-      lineax.hlines(
-         y=y_axis_values,
-         xmin=min_year,
-         xmax=max_year,
-         color="black",
-         linewidth=0.3,
-         zorder=1,
-         alpha=0.4,
-      )
-      for y_value in y_axis_values:
-         lineax.text(
-            x=min_year,
-            y=y_value,
-            s=f"{y_value:.0f}%",
-            font=font,
-            size=5,
-            va="center",
-            ha="left",
-         )
-
-      ax.text(
-         x=0.5,
-         y=0.9,
-         s=f"Pakistan {indicator_name} - {str(year)[:4]}",
-         size=12,
-         font=font,
-         va="top",
-         ha="center",
-         **text_args
-      )
-      ax.text(
-         x=0.69,
-         y=0.40,
-         s=f"{value:.1f}%",
-         size=16,
-         color=color,
-         path_effects=[pe.Stroke(linewidth=1, foreground="black"), pe.Normal()],
-         font=boldfont,
-         va="top",
-         ha="left",
-         **text_args,
-      )
-      ax.text(
-         x=0.6, y=0.3, s=f"#30DayMapChallenge - WDI Inflation Indicators", size=5, font=boldfont, **text_args
-      )
-
-   # Save and exit
-   anim = FuncAnimation(fig, update, frames=years)
-   anim.save(f"{output_path}.gif", fps=5)
+   # Save and exit, 5 frames per second encoded as they are rendered
+   with FrameSink(gif_path=f"{output_path}.gif", duration=0.2, loop=0) as sink:
+      for pixels in render_frames(setup_frame_figure, draw_frame, years, setup_args=(params,)):
+         sink.write(pixels)
 
 def generate_map(path_dir: str, filename: str):
    """    
@@ -157,8 +175,7 @@ def generate_map(path_dir: str, filename: str):
    logger.info(f"Generating {path_dir}")
 
    # Load the shapefile for boundaries or admin units
-   admin_gdf = gpd.read_file("data/pakistan_admin/gadm41_PAK_3.shp")
-   admin_gdf = admin_gdf[['COUNTRY', 'NAME_1', 'NAME_3', 'geometry']]
+   admin_gdf = load_admin_boundaries(level=3, columns=['COUNTRY', 'NAME_1', 'NAME_3', 'geometry'])
    
    # Read WDI File for Pakistan
    wdi_df = pd.read_csv("data/WDI_CSV_10_08/WDICSV.csv")